@@ -10,13 +10,12 @@
 """
 
 import logging
-import atexit
 import os
 import sys
 import signal
 import asyncio
 import psutil
-import aiosqlite
+from html import escape
 from aiogram import Bot, Dispatcher, types
 from aiogram.contrib.middlewares.logging import LoggingMiddleware
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
@@ -24,15 +23,42 @@ from aiogram.utils import executor
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ParseMode, ReplyKeyboardMarkup, KeyboardButton
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime, timedelta
 
+# Пул соединений, постраничная выборка, таймер и логирование — общие с src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.database.database import ConnectionPool, get_ads_page
+from src.utils.timer_heap import TimerHeap
+from src.utils.log_queue import setup_queued_logging
+
 # === Константы и конфигурация ===
 LOCK_FILE = "bot.lock"
+# Своя база рядом со скриптом: схема scheduled_jobs здесь другая, чем в миграциях src,
+# поэтому файл не должен совпадать с DB_PATH из src/config/config.py
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'advertisements.db')
+DB_POOL_SIZE = 4
+VIEW_PAGE_SIZE = 10
+EDIT_PAGE_SIZE = 20
+JOB_TIME_FORMAT = "%Y-%m-%d %H:%M"
+JOB_CATCHUP_BATCH = 20
+JOB_CATCHUP_PAUSE = 1.0
 API_TOKEN = ''
 BOT_USERNAME = ''
 ADMIN_ID =''
 
+# Логирование: уровень, файл с ротацией по размеру ('' — только консоль),
+# сколько строк в секунду пропускать от LoggingMiddleware
+LOGGING_CONFIG = {
+    'level': 'INFO',
+    'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    'json': False,
+    'file': '',
+    'max_bytes': 10 * 1024 * 1024,
+    'backup_count': 5,
+    'rate_limited': ['aiogram.contrib.middlewares.logging'],
+    'rate_limit': 20,
+}
+
 # Допустимые условия рекламы
 VALID_CONDITIONS = {'24ч', '48ч', '72ч', '3дня', 'неделя', 'бессрочно'}
 
@@ -68,15 +94,12 @@ def cleanup():
         os.remove(LOCK_FILE)
 
 # === Bot Initialization ===
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+log_listener = setup_queued_logging(LOGGING_CONFIG)
 bot = Bot(token=API_TOKEN)
 storage = MemoryStorage()
 dp = Dispatcher(bot, storage=storage)
 dp.middleware.setup(LoggingMiddleware())
-scheduler = AsyncIOScheduler()
+timers = TimerHeap(lambda ad_ids: run_due_posts(ad_ids))
 
 # === Keyboard Layouts ===
 def get_main_menu():
@@ -133,10 +156,19 @@ def get_language_menu():
     return menu
 
 # === Database Management ===
+db_pool = ConnectionPool(DB_PATH, DB_POOL_SIZE)
+
 async def init_db():
     """Инициализация базы данных с необходимыми таблицами."""
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
+        await db_pool.open()
+        async with db_pool.acquire() as db:
+            async with db.execute('PRAGMA user_version') as cursor:
+                version = (await cursor.fetchone())[0]
+            if version:
+                raise RuntimeError(
+                    f"{db_pool.path} создана миграциями src (версия схемы {version}), укажите другой DB_PATH"
+                )
             await db.execute('''
             CREATE TABLE IF NOT EXISTS ads (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -152,6 +184,13 @@ async def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
             ''')
+            await db.execute('''
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                ad_id INTEGER PRIMARY KEY,
+                run_at TEXT NOT NULL
+            )
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_run_at ON scheduled_jobs (run_at)')
             await db.commit()
     except Exception as e:
         logging.error(f"Ошибка инициализации базы данных: {e}")
@@ -162,6 +201,10 @@ class AdForm(StatesGroup):
     """Состояния для формы рекламы."""
     waiting_for_data = State()
 
+class JumpForm(StatesGroup):
+    """Состояние ввода ID записи для перехода к редактированию."""
+    waiting_for_ad_id = State()
+
 # === Message Handlers ===
 @dp.message_handler(commands=['start'])
 async def send_welcome(message: types.Message):
@@ -181,26 +224,20 @@ async def add_ad(message: types.Message):
         reply_markup=get_ad_type_menu()
     )
 
-@dp.message_handler(lambda m: m.text == "Просмотреть БД")
-async def view_db_command(message: types.Message):
-    """Обработка команды просмотра базы данных."""
-    try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            async with db.execute('SELECT * FROM ads') as cursor:
-                ads = await cursor.fetchall()
-        
-        if not ads:
-            await message.answer("База данных пуста.", reply_markup=get_main_menu())
-            return
+async def fetch_ads_page(cursor_id=None, direction='next', limit=VIEW_PAGE_SIZE, columns='*'):
+    """Получение страницы реклам по ключу (keyset), от новых к старым."""
+    return await get_ads_page(cursor_id, direction, limit, columns, pool=db_pool)
 
-        message_text = ["📊 Все записи:"]
-        for ad in ads:
-            message_text.append(f"""
+def render_db_page(ads, has_prev, has_next):
+    """Подготовка текста и клавиатуры одной страницы БД."""
+    message_text = ["📊 Записи:"]
+    for ad in ads:
+        message_text.append(f"""
 <b>#{ad[0]}</b>
 Тип: {ad[1]}
 Дата: {ad[2]}
-Время: {ad[4]}
-Юзер: {ad[3]}
+Время: {escape(ad[4])}
+Юзер: {escape(ad[3])}
 Условия: {ad[5]}
 CPM: {ad[6] or '—'}
 Охват: {ad[7] or '—'}
@@ -208,15 +245,30 @@ CPM: {ad[6] or '—'}
 Статус: {ad[9]}
 {'='*20}
 """)
+
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    nav = []
+    if has_prev:
+        nav.append(InlineKeyboardButton("◀️ Новее", callback_data=f"dbpage_prev_{ads[0][0]}"))
+    if has_next:
+        nav.append(InlineKeyboardButton("Старее ▶️", callback_data=f"dbpage_next_{ads[-1][0]}"))
+    if nav:
+        keyboard.row(*nav)
+    keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data="open_menu"))
+    return '\n'.join(message_text), keyboard
+
+@dp.message_handler(lambda m: m.text == "Просмотреть БД")
+async def view_db_command(message: types.Message):
+    """Обработка команды просмотра базы данных."""
+    try:
+        ads, has_next = await fetch_ads_page()
         
-        keyboard = InlineKeyboardMarkup(row_width=1)
-        keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data="open_menu"))
-        
-        await message.answer(
-            '\n'.join(message_text),
-            parse_mode=ParseMode.HTML,
-            reply_markup=keyboard
-        )
+        if not ads:
+            await message.answer("База данных пуста.", reply_markup=get_main_menu())
+            return
+
+        text, keyboard = render_db_page(ads, False, has_next)
+        await message.answer(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
 
     except Exception as e:
         logging.error(f"Ошибка при просмотре базы данных: {e}")
@@ -225,6 +277,27 @@ CPM: {ad[6] or '—'}
             reply_markup=get_main_menu()
         )
 
+@dp.callback_query_handler(lambda c: c.data.startswith('dbpage_'))
+async def view_db_page(callback_query: types.CallbackQuery):
+    """Листание страниц базы данных."""
+    _, direction, cursor_id = callback_query.data.split('_')
+    try:
+        ads, has_more = await fetch_ads_page(int(cursor_id), direction)
+        if not ads:
+            await callback_query.answer("Больше записей нет.")
+            return
+
+        if direction == 'next':
+            text, keyboard = render_db_page(ads, True, has_more)
+        else:
+            text, keyboard = render_db_page(ads, has_more, True)
+        await callback_query.message.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+        await callback_query.answer()
+
+    except Exception as e:
+        logging.error(f"Ошибка при листании базы данных: {e}")
+        await callback_query.answer("❌ Произошла ошибка при загрузке страницы.", show_alert=True)
+
 @dp.message_handler(lambda m: m.text == "Помощь")
 async def show_help(message: types.Message):
     """Show help information."""
@@ -358,22 +431,20 @@ async def process_ad_data(message: types.Message, ad_type: str = None):
             return
 
         # Process and save data
-        async with aiosqlite.connect('advertisements.db') as db:
+        async with db_pool.acquire() as db:
             if ad_type == 'CPM':
                 cpm = float(value.replace(',', '.'))
-                await db.execute('''
+                cursor = await db.execute('''
                 INSERT INTO ads (ad_type, date, username, time, conditions, cpm, payment_status)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (ad_type, date, username, time, conditions, cpm, 'Не оплачено'))
                 
-                ad_id = (await (await db.execute('SELECT last_insert_rowid()')).fetchone())[0]
+                ad_id = cursor.lastrowid
                 post_time = datetime.strptime(f"{date} {time}", "%d.%m.%Y %H:%M")
-                
-                # Schedule post processing
-                scheduler.add_job(
-                    lambda: asyncio.create_task(parse_post(ad_id)),
-                    'date', 
-                    run_date=post_time + timedelta(hours=24)
+                run_at = post_time + timedelta(hours=24)
+                await db.execute(
+                    'INSERT OR REPLACE INTO scheduled_jobs (ad_id, run_at) VALUES (?, ?)',
+                    (ad_id, run_at.strftime(JOB_TIME_FORMAT))
                 )
             else:
                 profit = float(value.replace(',', '.'))
@@ -383,6 +454,10 @@ async def process_ad_data(message: types.Message, ad_type: str = None):
                 ''', (ad_type, date, username, time, conditions, profit, 'Оплачено'))
 
             await db.commit()
+
+        if ad_type == 'CPM':
+            # Schedule post processing
+            schedule_parse_post(ad_id, run_at)
             
         # Send confirmation message
         await message.reply(
@@ -437,6 +512,25 @@ async def handle_admin_menu(callback_query: types.CallbackQuery):
         reply_markup=get_admin_keyboard()
     )
 
+def render_edit_page(ads, has_prev, has_next):
+    """Создание клавиатуры выбора записи для редактирования (одна страница)."""
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    for row in ads:
+        keyboard.add(InlineKeyboardButton(
+            f"ID: {row['id']} | {row['ad_type']} | {row['username']}",
+            callback_data=f"edit_{row['id']}"
+        ))
+    nav = []
+    if has_prev:
+        nav.append(InlineKeyboardButton("◀️ Новее", callback_data=f"editpage_prev_{ads[0]['id']}"))
+    if has_next:
+        nav.append(InlineKeyboardButton("Старее ▶️", callback_data=f"editpage_next_{ads[-1]['id']}"))
+    if nav:
+        keyboard.row(*nav)
+    keyboard.add(InlineKeyboardButton("🔎 Перейти к ID", callback_data="jump_to_id"))
+    keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data="admin"))
+    return keyboard
+
 @dp.callback_query_handler(lambda c: c.data == 'edit_ads')
 async def edit_ads(callback_query: types.CallbackQuery):
     """Handle advertisement editing."""
@@ -445,32 +539,120 @@ async def edit_ads(callback_query: types.CallbackQuery):
         return
 
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute('SELECT id, ad_type, username FROM ads ORDER BY created_at DESC')
-            rows = await cursor.fetchall()
-
-            if not rows:
-                await callback_query.message.edit_text("База данных пуста.")
-                return
-
-            keyboard = InlineKeyboardMarkup(row_width=2)
-            for row in rows:
-                keyboard.add(InlineKeyboardButton(
-                    f"ID: {row['id']} | {row['ad_type']} | {row['username']}",
-                    callback_data=f"edit_{row['id']}"
-                ))
-            keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data="admin"))
-
-            await callback_query.message.edit_text(
-                "Выберите запись для редактирования:",
-                reply_markup=keyboard
-            )
+        rows, has_next = await fetch_ads_page(limit=EDIT_PAGE_SIZE, columns='id, ad_type, username')
+
+        if not rows:
+            await callback_query.message.edit_text("База данных пуста.")
+            return
+
+        await callback_query.message.edit_text(
+            "Выберите запись для редактирования:",
+            reply_markup=render_edit_page(rows, False, has_next)
+        )
 
     except Exception as e:
         logging.error(f"Error in edit_ads: {e}")
         await callback_query.message.edit_text("❌ Произошла ошибка при загрузке записей.")
 
+@dp.callback_query_handler(lambda c: c.data.startswith('editpage_'))
+async def edit_ads_page(callback_query: types.CallbackQuery):
+    """Handle paging through the advertisement picker."""
+    if callback_query.from_user.id != ADMIN_ID:
+        await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    _, direction, cursor_id = callback_query.data.split('_')
+    try:
+        rows, has_more = await fetch_ads_page(
+            int(cursor_id), direction, limit=EDIT_PAGE_SIZE, columns='id, ad_type, username'
+        )
+        if not rows:
+            await callback_query.answer("Больше записей нет.")
+            return
+
+        if direction == 'next':
+            keyboard = render_edit_page(rows, True, has_more)
+        else:
+            keyboard = render_edit_page(rows, has_more, True)
+        await callback_query.message.edit_text("Выберите запись для редактирования:", reply_markup=keyboard)
+        await callback_query.answer()
+
+    except Exception as e:
+        logging.error(f"Error in edit_ads_page: {e}")
+        await callback_query.answer("❌ Произошла ошибка при загрузке записей.", show_alert=True)
+
+@dp.callback_query_handler(lambda c: c.data == 'jump_to_id')
+async def jump_to_id(callback_query: types.CallbackQuery):
+    """Ask for an advertisement ID to open directly."""
+    if callback_query.from_user.id != ADMIN_ID:
+        await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    keyboard = InlineKeyboardMarkup(row_width=1)
+    keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data="edit_ads"))
+    await callback_query.message.edit_text("Введите ID записи:", reply_markup=keyboard)
+    await JumpForm.waiting_for_ad_id.set()
+
+@dp.callback_query_handler(lambda c: c.data == 'edit_ads', state=JumpForm.waiting_for_ad_id)
+async def cancel_jump_to_id(callback_query: types.CallbackQuery, state: FSMContext):
+    """Return to the picker without entering an ID."""
+    await state.finish()
+    await edit_ads(callback_query)
+
+@dp.message_handler(state=JumpForm.waiting_for_ad_id)
+async def process_jump_to_id(message: types.Message, state: FSMContext):
+    """Open the editor for the advertisement ID entered by the admin."""
+    if message.from_user.id != ADMIN_ID:
+        await state.finish()
+        return
+
+    if not message.text.strip().isdigit():
+        await message.reply("❌ ID должен быть числом. Попробуйте ещё раз.")
+        return
+
+    try:
+        async with db_pool.acquire() as db:
+            cursor = await db.execute('SELECT * FROM ads WHERE id = ?', (int(message.text.strip()),))
+            row = await cursor.fetchone()
+
+        if not row:
+            await message.reply("Запись не найдена. Введите другой ID.")
+            return
+
+        await state.finish()
+        response, keyboard = render_ad_editor(row)
+        await message.answer(response, reply_markup=keyboard)
+
+    except Exception as e:
+        logging.error(f"Error in process_jump_to_id: {e}")
+        await state.finish()
+        await message.answer("❌ Произошла ошибка при загрузке записи.")
+
+def render_ad_editor(row):
+    """Build the text and keyboard of the advertisement editor."""
+    ad_id = row['id']
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    keyboard.add(
+        InlineKeyboardButton("Изменить статус", callback_data=f"status_{ad_id}"),
+        InlineKeyboardButton("Удалить", callback_data=f"delete_{ad_id}"),
+        InlineKeyboardButton("⬅️ Назад", callback_data="edit_ads")
+    )
+
+    response = (
+        f"📝 Редактирование записи ID: {ad_id}\n\n"
+        f"Тип: {row['ad_type']}\n"
+        f"Дата: {row['date']}\n"
+        f"Пользователь: {row['username']}\n"
+        f"Время: {row['time']}\n"
+        f"Условия: {row['conditions']}\n"
+    )
+    if row['ad_type'] == 'CPM':
+        response += f"CPM: {row['cpm']}\n"
+    else:
+        response += f"Прибыль: {row['profit']}\n"
+    response += f"Статус: {row['payment_status']}"
+    return response, keyboard
+
 @dp.callback_query_handler(lambda c: c.data.startswith('edit_'))
 async def edit_ad(callback_query: types.CallbackQuery):
     """Handle individual advertisement editing."""
@@ -480,37 +662,16 @@ async def edit_ad(callback_query: types.CallbackQuery):
 
     ad_id = int(callback_query.data.split('_')[1])
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            db.row_factory = aiosqlite.Row
+        async with db_pool.acquire() as db:
             cursor = await db.execute('SELECT * FROM ads WHERE id = ?', (ad_id,))
             row = await cursor.fetchone()
 
-            if not row:
-                await callback_query.answer("Запись не найдена.", show_alert=True)
-                return
-
-            keyboard = InlineKeyboardMarkup(row_width=2)
-            keyboard.add(
-                InlineKeyboardButton("Изменить статус", callback_data=f"status_{ad_id}"),
-                InlineKeyboardButton("Удалить", callback_data=f"delete_{ad_id}"),
-                InlineKeyboardButton("⬅️ Назад", callback_data="edit_ads")
-            )
-
-            response = (
-                f"📝 Редактирование записи ID: {ad_id}\n\n"
-                f"Тип: {row['ad_type']}\n"
-                f"Дата: {row['date']}\n"
-                f"Пользователь: {row['username']}\n"
-                f"Время: {row['time']}\n"
-                f"Условия: {row['conditions']}\n"
-            )
-            if row['ad_type'] == 'CPM':
-                response += f"CPM: {row['cpm']}\n"
-            else:
-                response += f"Прибыль: {row['profit']}\n"
-            response += f"Статус: {row['payment_status']}"
+        if not row:
+            await callback_query.answer("Запись не найдена.", show_alert=True)
+            return
 
-            await callback_query.message.edit_text(response, reply_markup=keyboard)
+        response, keyboard = render_ad_editor(row)
+        await callback_query.message.edit_text(response, reply_markup=keyboard)
 
     except Exception as e:
         logging.error(f"Error in edit_ad: {e}")
@@ -525,14 +686,14 @@ async def change_status(callback_query: types.CallbackQuery):
 
     ad_id = int(callback_query.data.split('_')[1])
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
+        async with db_pool.acquire() as db:
             await db.execute(
                 'UPDATE ads SET payment_status = CASE WHEN payment_status = "Оплачено" THEN "Не оплачено" ELSE "Оплачено" END WHERE id = ?',
                 (ad_id,)
             )
             await db.commit()
-            await callback_query.answer("Статус успешно изменен!")
-            await edit_ad(callback_query)  # Refresh the view
+        await callback_query.answer("Статус успешно изменен!")
+        await edit_ad(callback_query)  # Refresh the view
 
     except Exception as e:
         logging.error(f"Error in change_status: {e}")
@@ -547,11 +708,13 @@ async def delete_ad(callback_query: types.CallbackQuery):
 
     ad_id = int(callback_query.data.split('_')[1])
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
+        async with db_pool.acquire() as db:
             await db.execute('DELETE FROM ads WHERE id = ?', (ad_id,))
+            await db.execute('DELETE FROM scheduled_jobs WHERE ad_id = ?', (ad_id,))
             await db.commit()
-            await callback_query.answer("Запись успешно удалена!")
-            await edit_ads(callback_query)  # Return to edit menu
+        timers.cancel(ad_id)
+        await callback_query.answer("Запись успешно удалена!")
+        await edit_ads(callback_query)  # Return to edit menu
 
     except Exception as e:
         logging.error(f"Error in delete_ad: {e}")
@@ -560,8 +723,7 @@ async def delete_ad(callback_query: types.CallbackQuery):
 async def parse_post(ad_id):
     """Process scheduled advertisement post."""
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            db.row_factory = aiosqlite.Row
+        async with db_pool.acquire() as db:
             cursor = await db.execute('SELECT * FROM ads WHERE id = ?', (ad_id,))
             ad = await cursor.fetchone()
             
@@ -572,12 +734,52 @@ async def parse_post(ad_id):
     except Exception as e:
         logging.error(f"Error processing post {ad_id}: {e}")
 
+async def run_parse_post_job(ad_id):
+    """Выполнение отложенной обработки поста и удаление задачи из базы."""
+    await parse_post(ad_id)
+    try:
+        async with db_pool.acquire() as db:
+            await db.execute('DELETE FROM scheduled_jobs WHERE ad_id = ?', (ad_id,))
+            await db.commit()
+    except Exception as e:
+        logging.error(f"Error deleting job for post {ad_id}: {e}")
+
+def schedule_parse_post(ad_id, run_at):
+    """Постановка сохранённой в базе задачи в таймер."""
+    timers.schedule(ad_id, run_at.timestamp())
+
+async def run_due_posts(ad_ids):
+    """Выполнение созревших задач пачками по JOB_CATCHUP_BATCH с паузой между ними."""
+    for start in range(0, len(ad_ids), JOB_CATCHUP_BATCH):
+        await asyncio.gather(*(run_parse_post_job(ad_id) for ad_id in ad_ids[start:start + JOB_CATCHUP_BATCH]))
+        if start + JOB_CATCHUP_BATCH < len(ad_ids):
+            await asyncio.sleep(JOB_CATCHUP_PAUSE)
+
+async def rehydrate_jobs():
+    """Восстановление отложенных задач после рестарта одним запросом."""
+    async with db_pool.acquire() as db:
+        cursor = await db.execute('SELECT ad_id, run_at FROM scheduled_jobs ORDER BY run_at')
+        rows = await cursor.fetchall()
+
+    now = datetime.now()
+    overdue = []
+    for row in rows:
+        run_at = datetime.strptime(row['run_at'], JOB_TIME_FORMAT)
+        if run_at <= now:
+            overdue.append(row['ad_id'])
+        else:
+            schedule_parse_post(row['ad_id'], run_at)
+    logging.info(f"Восстановлено задач: {len(rows) - len(overdue)}, просрочено: {len(overdue)}")
+    if overdue:
+        asyncio.create_task(run_due_posts(overdue))
+
 async def on_startup(dp):
     """Initialize bot on startup."""
     try:
         setup_process_lock()
         await init_db()
-        scheduler.start()
+        timers.start()
+        await rehydrate_jobs()
         logging.info("Bot started successfully")
     except Exception as e:
         logging.error(f"Error during startup: {e}")
@@ -589,7 +791,9 @@ async def shutdown(dispatcher: Dispatcher):
         await dispatcher.storage.close()
         await dispatcher.storage.wait_closed()
         await bot.session.close()
-        scheduler.shutdown()
+        await timers.stop()
+        logging.info(f"Статистика пула соединений: {db_pool.stats()}")
+        await db_pool.close()
         cleanup()
         logging.info("Bot shutdown completed")
     except Exception as e:
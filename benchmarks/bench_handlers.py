@@ -0,0 +1,202 @@
+"""
+Нагрузочный бенчмарк обработчиков: обновления через Dispatcher с ненастоящим Bot и временной базой
+
+Для каждого размера таблицы ads база заполняется заново, затем каждый
+обработчик получает --updates обновлений, из них одновременно обрабатываются
+до --concurrency. Результат — JSON (пропускная способность и p50/p95/p99
+на обработчик), его удобно сохранять (--output) и сравнивать между коммитами.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_handlers --rows 1000 100000 --updates 2000 --concurrency 50
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from time import perf_counter
+import aiogram
+from aiogram import Bot, Dispatcher, types
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from src.database import database
+from src.handlers import admin_handlers
+from src.handlers.states import AdForm
+from src.main import create_dispatcher
+from src.utils.callback_codec import pack
+
+TOKEN = '123456789:AAbenchmarkbenchmarkbenchmarkbenchma'
+ADMIN = 1000
+SEED_BATCH = 10000
+AD_LINE = "01.02.2025, @user{i}, 12:00, 24ч, ФИКС, 2500"
+
+class FakeBot(Bot):
+    """Bot без сети: каждый запрос к API сразу получает правдоподобный ответ.
+
+    latency — искусственная задержка ответа API в секундах.
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__(TOKEN, validate_token=False)
+        self.latency = latency
+        self.calls = {}
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method in ('sendMessage', 'editMessageText', 'sendDocument'):
+            return message_dict(int(data.get('chat_id') or ADMIN), data.get('text', ''))
+        return True
+
+class ErrorCounter(logging.Handler):
+    """Счётчик logging.error: обработчики ловят исключения сами и только пишут в лог."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+def message_dict(chat_id, text, message_id=1):
+    return {
+        'message_id': message_id,
+        'date': 0,
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+        'text': text,
+    }
+
+def message_update(update_id, user_id, text):
+    return types.Update(update_id=update_id, message=message_dict(user_id, text, update_id))
+
+def callback_update(update_id, user_id, data):
+    return types.Update(update_id=update_id, callback_query={
+        'id': str(update_id),
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'Bench'},
+        'chat_instance': '1',
+        'message': message_dict(user_id, 'menu', update_id),
+        'data': data,
+    })
+
+def build_dispatcher(bot):
+    """Тот же Dispatcher, что собирает src/main.py, но с хранилищем FSM в памяти."""
+    return create_dispatcher(bot, MemoryStorage())
+
+def scenarios(rows, updates):
+    """(название, функция номер -> Update, подготовка состояния FSM или None).
+
+    Пользователи (и чаты) не повторяются ни внутри сценария, ни между
+    сценариями: обновления не ждут друг друга на одном состоянии, а форма,
+    оставшаяся от ввода рекламы, не перехватывает кнопки следующего сценария.
+    Админ-обработчики получают ID существующих записей.
+    Удаление идёт последним, по разным ID, и только если записей хватает.
+    """
+    user = lambda scenario, i: ADMIN + 1 + scenario * updates + i
+    ad_id = lambda i: 1 + (i * 7919) % rows
+    result = [
+        ('send_welcome', lambda i: message_update(i, user(0, i), '/start'), None),
+        ('process_ad_data', lambda i: message_update(i, user(1, i), AD_LINE.format(i=i)), AdForm.waiting_for_data),
+        ('view_db_command', lambda i: message_update(i, user(2, i), 'Просмотреть БД'), None),
+        ('edit_ads', lambda i: callback_update(i, ADMIN, pack('edit_ads')), None),
+        ('edit_ad', lambda i: callback_update(i, ADMIN, pack('edit_', ad_id(i))), None),
+        ('change_status', lambda i: callback_update(i, ADMIN, pack('status_', ad_id(i))), None),
+    ]
+    if updates <= rows:
+        result.append(('delete_ad', lambda i: callback_update(i, ADMIN, pack('delete_', 1 + i)), None))
+    return result
+
+async def seed(rows):
+    ads = [{
+        'ad_type': 'CPM' if i % 2 else 'ФИКС', 'date': '01.02.2025', 'username': f'@seed{i}',
+        'time': '12:00', 'conditions': '24ч', 'value': '1.5' if i % 2 else '2500',
+        'payment_status': 'Не оплачено',
+    } for i in range(rows)]
+    for start in range(0, rows, SEED_BATCH):
+        await database.add_advertisements_bulk(ads[start:start + SEED_BATCH])
+
+async def run_scenario(dp, make_update, state, updates, concurrency, errors):
+    if state is not None:
+        for i in range(updates):
+            update = make_update(i)
+            await dp.storage.set_state(chat=update.message.chat.id, user=update.message.from_user.id, state=state)
+    prepared = [make_update(i) for i in range(updates)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def worker(update):
+        async with semaphore:
+            started = perf_counter()
+            await dp.process_update(update)
+            latencies.append(perf_counter() - started)
+
+    errors.count = 0
+    started = perf_counter()
+    await asyncio.gather(*(worker(update) for update in prepared))
+    elapsed = perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'updates': updates,
+        'seconds': round(elapsed, 4),
+        'updates_per_s': round(updates / elapsed, 1),
+        'p50_ms': round(quantiles[49] * 1000, 3),
+        'p95_ms': round(quantiles[94] * 1000, 3),
+        'p99_ms': round(quantiles[98] * 1000, 3),
+        'errors': errors.count,
+    }
+
+async def run_size(args, rows, errors):
+    bot = FakeBot(args.api_latency / 1000)
+    Bot.set_current(bot)
+    dp = build_dispatcher(bot)
+    Dispatcher.set_current(dp)
+    with tempfile.TemporaryDirectory() as tmp:
+        await database.init_db(os.path.join(tmp, 'bench.db'))
+        try:
+            await seed(rows)
+            handlers = {}
+            for name, make_update, state in scenarios(rows, args.updates):
+                handlers[name] = await run_scenario(dp, make_update, state, args.updates, args.concurrency, errors)
+                print(f"rows={rows} {name}: {handlers[name]['updates_per_s']} updates/s", file=sys.stderr)
+        finally:
+            await database.close_db()
+            await dp.storage.close()
+    return {'rows': rows, 'api_calls': bot.calls, 'handlers': handlers}
+
+async def run(args):
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+    logging.getLogger().setLevel(logging.ERROR)
+    # Проверка ADMIN_ID в обработчиках — на пользователя бенчмарка
+    admin_handlers.ADMIN_ID = ADMIN
+    return {
+        'python': sys.version.split()[0],
+        'aiogram': aiogram.__version__,
+        'updates': args.updates,
+        'concurrency': args.concurrency,
+        'api_latency_ms': args.api_latency,
+        'sizes': [await run_size(args, rows, errors) for rows in args.rows],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000], help='размеры таблицы ads')
+    parser.add_argument('--updates', type=int, default=2000, help='обновлений на обработчик')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--api-latency', type=float, default=0.0, help='задержка ответа API, мс')
+    parser.add_argument('--output', help='файл для JSON (по умолчанию stdout)')
+    args = parser.parse_args()
+
+    result = json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(result + '\n')
+    else:
+        print(result)
+
+if __name__ == '__main__':
+    main()
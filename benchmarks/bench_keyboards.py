@@ -0,0 +1,64 @@
+"""
+Бенчмарк клавиатур: сборка и сериализация markup на каждый ответ против кэша и шаблонов
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_keyboards --replies 20000
+"""
+
+import argparse
+import tracemalloc
+from time import perf_counter
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils.payload import prepare_arg
+from src.keyboards import keyboards
+from src.utils.callback_codec import pack
+
+def legacy_edit_page(ads, has_prev, has_next):
+    """Клавиатура выбора записи, собранная заново, как до кэширования."""
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    for ad in ads:
+        keyboard.add(InlineKeyboardButton(
+            f"ID: {ad['id']} | {ad['ad_type']} | {ad['username']}",
+            callback_data=pack('edit_', ad['id'])
+        ))
+    keyboard.row(
+        InlineKeyboardButton("◀️ Новее", callback_data=pack('editpage_', 'prev', ads[0]['id'])),
+        InlineKeyboardButton("Старее ▶️", callback_data=pack('editpage_', 'next', ads[-1]['id'])),
+    )
+    keyboard.add(InlineKeyboardButton("🔎 Перейти к ID", callback_data=pack('jump_to_id')))
+    keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data=pack('admin')))
+    return keyboard
+
+def measure(label, reply, replies):
+    """Время и пиковая память на один ответ; prepare_arg — то, что делает aiogram перед отправкой."""
+    reply(0)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    reply(0)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    started = perf_counter()
+    for i in range(replies):
+        reply(i)
+    elapsed = perf_counter() - started
+    print(f"{label:<32}{elapsed / replies * 1e6:8.1f} us/reply  peak {peak:8,d} B/reply")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--replies', type=int, default=20000)
+    parser.add_argument('--page', type=int, default=20, help='записей на странице выбора')
+    args = parser.parse_args()
+
+    ads = [{'id': i, 'ad_type': 'CPM', 'username': f'@user{i}'} for i in range(args.page, 0, -1)]
+
+    measure('main menu: build', lambda i: prepare_arg(keyboards._main_menu('ru')), args.replies)
+    measure('main menu: cached', lambda i: prepare_arg(keyboards.get_main_menu()), args.replies)
+    measure('ad editor: build', lambda i: prepare_arg(keyboards._ad_editor_keyboard(i)), args.replies)
+    measure('ad editor: template', lambda i: prepare_arg(keyboards.get_ad_editor_keyboard(i)), args.replies)
+    measure('edit page: build', lambda i: prepare_arg(legacy_edit_page(ads, True, True)), args.replies // 10)
+    measure('edit page: template', lambda i: prepare_arg(keyboards.get_edit_page_keyboard(ads, True, True)), args.replies // 10)
+
+if __name__ == '__main__':
+    main()
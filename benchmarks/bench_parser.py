@@ -0,0 +1,97 @@
+"""
+Бенчмарк разбора строки рекламы: прежний разбор (replace/split/strptime) против скомпилированного
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_parser --lines 100000
+"""
+
+import argparse
+from time import perf_counter
+from src.config.config import VALID_CONDITIONS
+from src.utils.ad_parser import parse_ad
+from src.utils.date_utils import to_scheduled_at
+
+VALID = [
+    "01.02.2025, @user, 12:00, {condition}, 1.5",
+    "15.03.2025,@channel,18:30 мск,{condition},ФИКС,2500",
+    "29.02.2024, @leap, 9:05, {condition}, cpm, 0.75",
+    "31.12.2025,  @spaces,   23:59,{condition},  100",
+]
+INVALID = [
+    "01.02.2025, @user, 12:00",                          # мало полей
+    "32.01.2025, @user, 12:00, {condition}, 1.5",         # нет такого дня
+    "29.02.2025, @user, 12:00, {condition}, 1.5",         # не високосный год
+    "01.02.2025, @user, 12:00, навсегда, 1.5",            # неверные условия
+    "01.02.2025, @user, 12:00, {condition}, БАРТЕР, 100", # неверный тип
+    "01.02.2025, @user, 12:00, {condition}, сто",         # не число
+]
+
+def legacy_parse(line):
+    """Разбор в том виде, каким он был до ad_parser: первая ошибка строкой."""
+    text = ' '.join(line.replace(',', ', ').split())
+    parts = text.split(', ')
+    if len(parts) not in (5, 6):
+        return None, 'format'
+    if len(parts) == 5:
+        date, username, time, conditions, value = parts
+        ad_type = 'CPM' if '.' in value else 'ФИКС'
+    else:
+        date, username, time, conditions, ad_type, value = parts
+        ad_type = ad_type.upper()
+    if ad_type not in ['CPM', 'ФИКС']:
+        return None, 'ad_type'
+    if conditions.lower() not in [c.lower() for c in VALID_CONDITIONS]:
+        return None, 'conditions'
+    scheduled_at = to_scheduled_at(date, time)
+    if scheduled_at is None:
+        return None, 'date'
+    try:
+        float(value)
+    except ValueError:
+        return None, 'value'
+    return {'ad_type': ad_type, 'date': date, 'username': username, 'time': time,
+            'conditions': conditions, 'value': value, 'scheduled_at': scheduled_at}, None
+
+def build_corpus(size, invalid_share):
+    """size строк, из них доля invalid_share — неверные, вперемешку по кругу."""
+    condition = sorted(VALID_CONDITIONS)[0]
+    valid = [line.format(condition=condition) for line in VALID]
+    invalid = [line.format(condition=condition) for line in INVALID]
+    invalid_count = round(size * invalid_share)
+    corpus = [invalid[i % len(invalid)] for i in range(invalid_count)]
+    corpus += [valid[i % len(valid)] for i in range(size - invalid_count)]
+    return corpus[::2] + corpus[1::2]
+
+def check(corpus):
+    """Оба разбора должны соглашаться: валидна ли строка, и одинаковы ли scheduled_at."""
+    for line in corpus:
+        old, old_error = legacy_parse(line)
+        new, errors = parse_ad(line)
+        assert (old is None) == (new is None), line
+        if new is not None:
+            assert old['scheduled_at'] == new['scheduled_at'], line
+        else:
+            assert old_error in {error.field for error in errors}, line
+
+def measure(label, parse, corpus, lines):
+    started = perf_counter()
+    for i in range(lines):
+        parse(corpus[i % len(corpus)])
+    elapsed = perf_counter() - started
+    print(f"{label:<12}{elapsed / lines * 1e6:8.2f} us/line  {lines / elapsed:12,.0f} lines/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--corpus', type=int, default=100, help='строк в корпусе')
+    parser.add_argument('--invalid', type=float, default=0.3, help='доля неверных строк в корпусе')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.corpus, args.invalid)
+    check(corpus)
+    print(f"corpus: {len(corpus)} lines, {args.invalid:.0%} invalid")
+    measure('legacy', legacy_parse, corpus, args.lines)
+    measure('compiled', parse_ad, corpus, args.lines)
+
+if __name__ == '__main__':
+    main()
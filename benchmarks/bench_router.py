@@ -0,0 +1,93 @@
+"""
+Бенчмарк маршрутизации: цепочка lambda-фильтров против словаря текстов и PrefixTrie
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_router --lookups 200000 --extra 100
+"""
+
+import random
+import argparse
+from time import perf_counter
+from src.utils.callback_codec import PrefixTrie, split_version
+
+# Тексты и callback-префиксы в порядке регистрации stable_main.py
+TEXTS = ["Добавить рекламу", "Просмотреть БД", "Помощь", "Настройки", "⬅️ Назад", "🔧 Админ-панель"]
+CALLBACKS = [
+    ('dbpage_', {'direction': str, 'cursor_id': int}),
+    ('open_menu', {}),
+    ('type_', {'ad_type': str}),
+    ('admin', {}),
+    ('edit_ads', {}),
+    ('editpage_', {'direction': str, 'cursor_id': int}),
+    ('jump_to_id', {}),
+    ('edit_', {'ad_id': int}),
+    ('status_', {'ad_id': int}),
+    ('delete_', {'ad_id': int}),
+]
+
+def build_chain(callbacks):
+    """Фильтры как в stable_main: равенство для статичных данных, startswith для данных с полями."""
+    chain = []
+    for prefix, fields in callbacks:
+        if fields:
+            chain.append((lambda data, p=prefix: data.startswith(p), prefix, len(fields)))
+        else:
+            chain.append((lambda data, p=prefix: data == p, prefix, 0))
+    return chain
+
+def chain_dispatch(chain, data):
+    for check, prefix, fields in chain:
+        if check(data):
+            return prefix, data.split('_')[1:] if fields else []
+    return None
+
+def build_trie(callbacks):
+    trie = PrefixTrie()
+    for prefix, fields in callbacks:
+        trie.insert(prefix, fields, prefix)
+    return trie
+
+def trie_dispatch(trie, data):
+    _, payload = split_version(data)
+    matches = trie.match(payload)
+    return matches[0] if matches else None
+
+def measure(label, dispatch, corpus):
+    started = perf_counter()
+    for item in corpus:
+        dispatch(item)
+    elapsed = perf_counter() - started
+    print(f"{label:<24}{elapsed / len(corpus) * 1e9:8.0f} ns/update  {len(corpus) / elapsed:12,.0f} updates/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--extra', type=int, default=100, help='дополнительных маршрутов перед реальными')
+    args = parser.parse_args()
+
+    # Дополнительные маршруты моделируют рост числа обработчиков
+    extra = [(f'feature{i}_', {'item_id': int}) for i in range(args.extra)]
+    callbacks = extra + CALLBACKS
+    texts = [f"Кнопка {i}" for i in range(args.extra)] + TEXTS
+
+    rng = random.Random(1)
+    samples = ['open_menu', 'type_cpm', 'admin', 'edit_ads', 'jump_to_id',
+               'dbpage_next_{}', 'editpage_prev_{}', 'edit_{}', 'status_{}', 'delete_{}']
+    callback_corpus = [rng.choice(samples).format(rng.randint(1, 10 ** 6)) for _ in range(args.lookups)]
+    versioned_corpus = ['1:' + data for data in callback_corpus]
+    text_corpus = [rng.choice(TEXTS) for _ in range(args.lookups)]
+
+    print(f"callback_data, маршрутов: {len(callbacks)}")
+    chain = build_chain(callbacks)
+    measure('lambda chain', lambda data: chain_dispatch(chain, data), callback_corpus)
+    trie = build_trie(callbacks)
+    measure('PrefixTrie', lambda data: trie_dispatch(trie, data), versioned_corpus)
+
+    print(f"тексты кнопок, обработчиков: {len(texts)}")
+    text_chain = [lambda text, t=t: text == t for t in texts]
+    measure('lambda chain', lambda text: next((check for check in text_chain if check(text)), None), text_corpus)
+    text_routes = {text: text for text in texts}
+    measure('dict', text_routes.get, text_corpus)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Бенчмарк планировщиков: один APScheduler-job на рекламу против TimerHeap
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_scheduler --jobs 100000
+"""
+
+import random
+import asyncio
+import argparse
+import tracemalloc
+from time import perf_counter, time
+from datetime import datetime
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from src.utils.timer_heap import TimerHeap
+
+async def noop(*args):
+    pass
+
+def measure(label, schedule, cancel, jobs):
+    """Время постановки и отмены jobs событий и память на одно событие."""
+    due_times = [time() + 3600 + random.random() * 86400 for _ in range(jobs)]
+
+    tracemalloc.start()
+    started = perf_counter()
+    for ad_id, due in enumerate(due_times):
+        schedule(ad_id, due)
+    scheduled = perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    victims = random.sample(range(jobs), min(jobs, 10000))
+    started = perf_counter()
+    for ad_id in victims:
+        cancel(ad_id)
+    cancelled = perf_counter() - started
+
+    print(
+        f"{label:<14}schedule {scheduled:8.3f} s ({scheduled / jobs * 1e6:7.2f} us/job)  "
+        f"cancel {cancelled / len(victims) * 1e6:9.2f} us/job  "
+        f"memory {memory / jobs:7.0f} B/job"
+    )
+
+async def run(args):
+    scheduler = AsyncIOScheduler()
+    scheduler.start()
+    measure(
+        'APScheduler',
+        lambda ad_id, due: scheduler.add_job(
+            noop, 'date', run_date=datetime.fromtimestamp(due), args=(ad_id,), id=str(ad_id)
+        ),
+        lambda ad_id: scheduler.remove_job(str(ad_id)),
+        args.jobs,
+    )
+    scheduler.shutdown(wait=False)
+
+    timers = TimerHeap(noop)
+    timers.start()
+    measure('TimerHeap', lambda ad_id, due: timers.schedule(ad_id, due), timers.cancel, args.jobs)
+    await timers.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=100000)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
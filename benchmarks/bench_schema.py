@@ -0,0 +1,91 @@
+"""
+Бенчмарк запросов к таблице ads до и после миграций схемы
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_schema --rows 1000000
+"""
+
+import os
+import random
+import sqlite3
+import argparse
+import tempfile
+from time import perf_counter
+from src.config.config import SQLITE_PRAGMAS
+from src.database.migrations import MIGRATIONS
+
+QUERIES = {
+    'order by created_at': 'SELECT id FROM ads ORDER BY created_at DESC LIMIT 20',
+    'filter by id': 'SELECT * FROM ads WHERE id = ?',
+    'filter by username': 'SELECT id FROM ads WHERE username = ?',
+    'filter by date': 'SELECT id FROM ads WHERE date = ?',
+    'filter by payment_status': "SELECT COUNT(*) FROM ads WHERE payment_status = 'Оплачено'",
+}
+
+def fill_table(db, rows):
+    """Заполнение таблицы синтетическими объявлениями."""
+    for statement in MIGRATIONS[0]:
+        db.execute(statement)
+
+    def generate():
+        for i in range(rows):
+            day = i % 28 + 1
+            month = i % 12 + 1
+            yield (
+                random.choice(('CPM', 'ФИКС')),
+                f"{day:02d}.{month:02d}.2024",
+                f"@user{i % 50000}",
+                '12:00',
+                '24ч',
+                1.5,
+                random.choice(('Оплачено', 'Не оплачено')),
+                f"2024-{month:02d}-{day:02d} {i % 24:02d}:{i % 60:02d}:00",
+            )
+
+    db.executemany('''
+    INSERT INTO ads (ad_type, date, username, time, conditions, cpm, payment_status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', generate())
+    db.commit()
+
+def run_queries(db, rows, repeats):
+    """Замер среднего времени каждого запроса в миллисекундах."""
+    params = {
+        'filter by id': lambda: (random.randint(1, rows),),
+        'filter by username': lambda: (f"@user{random.randint(0, 49999)}",),
+        'filter by date': lambda: (f"{random.randint(1, 28):02d}.{random.randint(1, 12):02d}.2024",),
+    }
+    results = {}
+    for name, sql in QUERIES.items():
+        started = perf_counter()
+        for _ in range(repeats):
+            db.execute(sql, params.get(name, tuple)()).fetchall()
+        results[name] = (perf_counter() - started) / repeats * 1000
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        fill_table(db, args.rows)
+        before = run_queries(db, args.rows, args.repeats)
+
+        for pragma, value in SQLITE_PRAGMAS.items():
+            db.execute(f'PRAGMA {pragma} = {value}')
+        for migration in MIGRATIONS[1:]:
+            for statement in migration:
+                db.execute(statement)
+        db.commit()
+        after = run_queries(db, args.rows, args.repeats)
+        db.close()
+
+    print(f"{'query':<28}{'before, ms':>12}{'after, ms':>12}")
+    for name in QUERIES:
+        print(f"{name:<28}{before[name]:>12.3f}{after[name]:>12.3f}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Бенчмарк поиска: LIKE по ads против FTS5 с префиксами и кэша результатов при поиске по мере набора
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_search --rows 1000000
+"""
+
+import os
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from time import perf_counter
+from src.config.config import VALID_CONDITIONS
+from src.database import database
+
+INSERT_SQL = '''
+INSERT INTO ads (ad_type, date, username, time, conditions, cpm, payment_status, scheduled_at, notes)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SYLLABLES = ('ka', 'ro', 'mi', 'te', 'lu', 'vo', 'na', 'si', 'de', 'po', 'ri', 'zu', 'ga', 'le', 'bo', 'xi')
+NOTE_WORDS = ('бартер', 'повтор', 'скидка', 'крипта', 'игры', 'новости', 'финансы', 'юмор')
+BATCH = 50000
+
+def word(rnd, syllables):
+    return ''.join(rnd.choice(SYLLABLES) for _ in range(syllables))
+
+async def fill(rows):
+    """Юзеры из случайных слогов; заметка есть у каждой десятой записи."""
+    conditions = sorted(VALID_CONDITIONS)
+    rnd = random.Random(1)
+    usernames = []
+    async with database.get_pool().acquire() as db:
+        for start in range(0, rows, BATCH):
+            batch = []
+            for i in range(start, min(start + BATCH, rows)):
+                username = f'@{word(rnd, rnd.randint(3, 5))}_{word(rnd, 2)}'
+                notes = f'{rnd.choice(NOTE_WORDS)} {word(rnd, 3)}' if i % 10 == 0 else ''
+                usernames.append(username)
+                batch.append((
+                    'CPM', '01.01.2025', username, '12:00', conditions[i % len(conditions)], 1.5,
+                    'Не оплачено', '2025-01-01 12:00', notes,
+                ))
+            await db.executemany(INSERT_SQL, batch)
+            await db.commit()
+    return usernames
+
+def typed(word):
+    """Префиксы слова от двух символов — запросы при наборе по буквам."""
+    return [word[:length] for length in range(2, len(word) + 1)]
+
+async def like_search(text, limit):
+    pattern = f'%{text}%'
+    async with database.get_pool().acquire() as db:
+        async with db.execute(
+            'SELECT * FROM ads WHERE username LIKE ? OR conditions LIKE ? OR notes LIKE ? LIMIT ?',
+            (pattern, pattern, pattern, limit)
+        ) as cursor:
+            return await cursor.fetchall()
+
+async def measure(label, search, queries, clear_cache):
+    latencies = []
+    for query in queries:
+        if clear_cache:
+            database.search_cache.clear()
+        started = perf_counter()
+        await search(query, database.SEARCH_LIMIT)
+        latencies.append((perf_counter() - started) * 1000)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(f"{label:<22}p50 {statistics.median(latencies):8.3f} ms   p95 {p95:8.3f} ms   max {latencies[-1]:8.3f} ms")
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        await database.init_db(os.path.join(tmp, 'bench.db'))
+        try:
+            started = perf_counter()
+            usernames = await fill(args.rows)
+            print(f"filled {args.rows} rows (with FTS triggers) in {perf_counter() - started:.1f} s")
+
+            rnd = random.Random(2)
+            words = [rnd.choice(usernames)[1:] for _ in range(args.words)] + list(NOTE_WORDS)
+            queries = [query for word in words for query in typed(word)]
+            print(f"{len(queries)} queries, typed letter by letter")
+
+            await measure('LIKE %query%', like_search, queries[:args.like_queries], False)
+            await measure('FTS5, no cache', database.search_ads, queries, True)
+            database.search_cache.clear()
+            await measure('FTS5, first pass', database.search_ads, queries, False)
+            await measure('FTS5, cached', database.search_ads, queries, False)
+        finally:
+            await database.close_db()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--words', type=int, default=20, help='сколько юзеров «набрать» по буквам')
+    parser.add_argument('--like-queries', type=int, default=20, help='запросов LIKE (каждый — полный просмотр)')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
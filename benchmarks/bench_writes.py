@@ -0,0 +1,69 @@
+"""
+Бенчмарк вставок: отдельный COMMIT на каждую запись против групповой фиксации
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_writes --inserts 5000 --concurrency 50
+"""
+
+import os
+import asyncio
+import argparse
+import tempfile
+from time import perf_counter
+from src.database import database
+
+INSERT_SQL = '''
+INSERT INTO ads (ad_type, date, username, time, conditions, cpm, payment_status)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+def make_params(i):
+    return ('CPM', '01.01.2025', f"@user{i}", '12:00', '24ч', 1.5, 'Не оплачено')
+
+async def per_call_commit(i):
+    """Прежнее поведение: одна транзакция и один COMMIT на вставку."""
+    async with database.get_pool().acquire() as db:
+        cursor = await db.execute(INSERT_SQL, make_params(i))
+        await db.commit()
+        return cursor.lastrowid
+
+async def group_commit(i):
+    """Вставка через очередь групповой фиксации."""
+    return await database.get_write_queue().submit(INSERT_SQL, make_params(i))
+
+async def measure(insert, inserts, concurrency):
+    """Число вставок в секунду при заданном числе одновременных вызовов."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(i):
+        async with semaphore:
+            await insert(i)
+
+    started = perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(inserts)))
+    return inserts / (perf_counter() - started)
+
+async def run(args):
+    results = {}
+    for name, insert in (('per-call commit', per_call_commit), ('group commit', group_commit)):
+        with tempfile.TemporaryDirectory() as tmp:
+            await database.init_db(os.path.join(tmp, 'bench.db'))
+            try:
+                results[name] = await measure(insert, args.inserts, args.concurrency)
+                if name == 'group commit':
+                    queue = database.get_write_queue()
+                    print(f"batches: {queue.batches}, avg batch: {queue.writes / queue.batches:.1f}")
+            finally:
+                await database.close_db()
+
+    for name, rate in results.items():
+        print(f"{name:<18}{rate:>12.0f} inserts/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--inserts', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -10,11 +10,140 @@ ADMIN_ID =''
 # Файл блокировки для предотвращения множественных запусков
 LOCK_FILE = "bot.lock"
 
+# Настройки базы данных
+DB_PATH = 'advertisements.db'
+DB_POOL_SIZE = 4
+
+# Сколько последних месяцев показывать на экране статистики
+STATS_MONTHS = 6
+
+# Кэш записей по ID: ёмкость и число последних записей, загружаемых при старте
+AD_CACHE_SIZE = 1024
+AD_CACHE_WARM = 100
+
+# Групповая фиксация записей: максимум изменений в пачке и дополнительное
+# ожидание новых изменений перед фиксацией (сек, 0 — только уже поставленные)
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_DELAY = 0
+
+# PRAGMA, применяемые к каждому соединению при открытии
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+# Количество записей на одной странице просмотра БД
+VIEW_PAGE_SIZE = 10
+
+# Количество записей на одной странице выбора для редактирования
+EDIT_PAGE_SIZE = 20
+
+# Максимальная длина заметок к записи (символов) и сколько из них показывать в списках записей:
+# страница из VIEW_PAGE_SIZE записей с полными заметками не влезла бы в сообщение Telegram (4096 символов)
+NOTES_MAX_LENGTH = 500
+NOTES_PREVIEW_LENGTH = 100
+
+# Ограничения массового импорта: строк в сообщении/файле, ошибок в ответе, размер файла
+BULK_IMPORT_MAX_LINES = 1000
+BULK_IMPORT_MAX_ERRORS = 30
+BULK_IMPORT_MAX_BYTES = 1024 * 1024
+
+# Экспорт: число строк, читаемых из курсора за один раз
+EXPORT_CHUNK_SIZE = 1000
+
+# Отложенная обработка постов: через сколько часов после выхода рекламы
+# собирать охват, сколько задач обрабатывать одной пачкой и пауза между пачками (сек)
+POST_PROCESSING_DELAY_HOURS = 24
+JOB_CATCHUP_BATCH = 20
+JOB_CATCHUP_PAUSE = 1.0
+
+# Многопроцессный режим: как часто (сек) процесс с таймером задач подхватывает из базы
+# задачи, запланированные другими процессами
+JOB_SYNC_INTERVAL = 30
+
+# Сбор охвата: сколько запросов просмотров выполнять одновременно; через сколько минут
+# повторять сбор, если пост не найден, и через сколько часов после выхода рекламы бросить попытки
+POST_VIEWS_CONCURRENCY = 5
+POST_VIEWS_RETRY_MINUTES = 60
+POST_VIEWS_GIVE_UP_HOURS = 72
+
+# Источник просмотров: '' — охват не собирается, 'preview' — публичная веб-версия
+# канала t.me/s/<канал> по ссылке на пост, заданной в редакторе записи
+VIEWS_SOURCE = ''
+
+# Очередь отправки: общий лимит сообщений в секунду, лимит на чат и допустимый всплеск,
+# сколько раз повторять запрос после RetryAfter
+SEND_GLOBAL_RATE = 30
+SEND_CHAT_RATE = 1
+SEND_CHAT_BURST = 3
+SEND_MAX_RETRIES = 5
+
+# Режим получения обновлений: 'polling' или 'webhook'
+BOT_MODE = 'polling'
+
+# Вебхук: публичный адрес (пустой — не регистрировать в Telegram), путь, секретный токен
+# (обязателен, без него вебхук не запускается), адрес локального сервера,
+# размер каждой очереди и число обработчиков
+WEBHOOK_URL = ''
+WEBHOOK_PATH = '/webhook'
+WEBHOOK_SECRET = ''
+WEBAPP_HOST = '127.0.0.1'
+WEBAPP_PORT = 8080
+WEBHOOK_QUEUE_SIZE = 1000
+WEBHOOK_WORKERS = 4
+
+# Многопроцессный режим: число процессов-обработчиков (0 — всё в одном процессе),
+# размер очереди каждого процесса, число параллельных очередей по чатам внутри процесса,
+# пауза перед перезапуском упавшего процесса (сек)
+WORKER_PROCESSES = 0
+WORKER_QUEUE_SIZE = 1000
+WORKER_LANES = 4
+WORKER_RESTART_DELAY = 1.0
+
+# Хранилище состояний FSM: 'sqlite' (в DB_PATH, переживает рестарт) или 'memory';
+# через сколько секунд брошенная форма удаляется, как часто сбрасывать изменения в базу
+# и искать просроченные формы (сек), сколько состояний держать в памяти
+FSM_STORAGE = 'sqlite'
+FSM_STATE_TTL = 24 * 3600
+FSM_FLUSH_INTERVAL = 0.5
+FSM_SWEEP_INTERVAL = 600
+FSM_CACHE_SIZE = 10000
+
+# Метрики в формате Prometheus: адрес и порт HTTP-сервера /metrics (0 — не запускать).
+# В многопроцессном режиме процессы-обработчики занимают следующие порты: METRICS_PORT + 1 + index
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 0
+
+# Вывод в лог времени этапов запуска (импорты, база, таймер задач, первое обновление);
+# то же включает флаг --profile-startup
+STARTUP_PROFILE = False
+
+# Поиск (/find и inline-режим): сколько записей возвращать, минимальная длина слова
+# для поиска по префиксу, сколько секунд и сколько запросов держать в кэше результатов
+SEARCH_LIMIT = 20
+SEARCH_MIN_CHARS = 2
+SEARCH_CACHE_TTL = 30
+SEARCH_CACHE_SIZE = 1000
+
+# Язык интерфейса по умолчанию; клавиатуры кэшируются отдельно для каждого языка
+DEFAULT_LANGUAGE = 'ru'
+
 # Допустимые условия рекламы
 VALID_CONDITIONS = {'24ч', '48ч', '72ч', '3дня', 'неделя', 'бессрочно'}
 
-# Настройки логирования
+# Настройки логирования: общий уровень и уровни отдельных логгеров, JSON вместо текста,
+# файл с ротацией по размеру ('' — только консоль), сколько строк в секунду пропускать
+# от логгеров, пишущих на каждое обновление
 LOGGING_CONFIG = {
     'level': 'INFO',
-    'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    'loggers': {},
+    'json': False,
+    'file': '',
+    'max_bytes': 10 * 1024 * 1024,
+    'backup_count': 5,
+    'rate_limited': ['aiogram.contrib.middlewares.logging'],
+    'rate_limit': 20,
 } 
\ No newline at end of file
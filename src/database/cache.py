@@ -0,0 +1,133 @@
+"""
+Модуль с LRU-кэшем записей рекламы по ID и кэшем результатов поиска
+"""
+
+from time import monotonic
+from collections import OrderedDict
+
+class AdCache:
+    """Ограниченный по размеру LRU-кэш записей рекламы.
+
+    Записи хранятся как словари. Счётчик поколений защищает от гонки, когда
+    чтение из базы завершается после инвалидации и вернуло бы в кэш старую
+    версию записи: такое значение не кэшируется. Выключенный кэш (enabled = False)
+    ничего не хранит: каждое чтение идёт в базу.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.enabled = True
+        self._items = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ad_id):
+        """Получение записи из кэша или None."""
+        if not self.enabled:
+            return None
+        ad = self._items.get(ad_id)
+        if ad is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(ad_id)
+        self.hits += 1
+        return ad
+
+    def generation(self):
+        """Текущее поколение кэша; снимается перед чтением из базы."""
+        return self._generation
+
+    def put(self, ad_id, ad, generation=None):
+        """Сохранение записи, если с момента чтения не было инвалидаций."""
+        if not self.enabled or generation is not None and generation != self._generation:
+            return
+        self._items[ad_id] = ad
+        self._items.move_to_end(ad_id)
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def update(self, ad_id, field, value):
+        """Обновление поля закэшированной записи после изменения в базе."""
+        self._generation += 1
+        ad = self._items.get(ad_id)
+        if ad is not None:
+            self._items[ad_id] = {**ad, field: value}
+
+    def invalidate(self, ad_id):
+        """Удаление записи из кэша."""
+        self._generation += 1
+        self._items.pop(ad_id, None)
+
+    def clear(self):
+        """Полная очистка кэша."""
+        self._generation += 1
+        self._items.clear()
+
+    def stats(self):
+        """Статистика попаданий в кэш."""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._items),
+            'capacity': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+class SearchCache:
+    """Результаты поиска по строке запроса на ttl секунд, не больше size запросов.
+
+    Поиск по мере набора повторяет одни и те же префиксы. Любое изменение
+    ads через модуль database очищает кэш целиком; как и в AdCache, счётчик
+    поколений не даёт поиску, начатому до очистки, сохранить старый результат.
+    Выключается так же, как AdCache.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.enabled = True
+        self._items = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        """Результаты из кэша или None, если их нет или срок вышел."""
+        if not self.enabled:
+            return None
+        item = self._items.get(query)
+        if item is None or item[0] < monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item[1]
+
+    def generation(self):
+        """Текущее поколение кэша; снимается перед поиском в базе."""
+        return self._generation
+
+    def put(self, query, results, generation=None):
+        """Сохранение результатов, если с начала поиска кэш не очищался."""
+        if not self.enabled or generation is not None and generation != self._generation:
+            return
+        self._items[query] = (monotonic() + self.ttl, results)
+        self._items.move_to_end(query)
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        """Полная очистка кэша."""
+        self._generation += 1
+        self._items.clear()
+
+    def stats(self):
+        """Статистика попаданий в кэш."""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._items),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
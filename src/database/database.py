@@ -2,92 +2,519 @@
 Модуль для работы с базой данных
 """
 
+import re
+import json
+import asyncio
 import logging
 import aiosqlite
-from datetime import datetime
-
-async def init_db():
-    """Инициализация базы данных с необходимыми таблицами."""
-    try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            await db.execute('''
-            CREATE TABLE IF NOT EXISTS ads (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ad_type TEXT NOT NULL,
-                date TEXT NOT NULL,
-                username TEXT NOT NULL,
-                time TEXT NOT NULL,
-                conditions TEXT NOT NULL,
-                cpm REAL,
-                reach INTEGER,
-                profit REAL,
-                payment_status TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            await db.commit()
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from time import perf_counter
+from src.config.config import (
+    DB_PATH, DB_POOL_SIZE, SQLITE_PRAGMAS, VIEW_PAGE_SIZE, AD_CACHE_SIZE, AD_CACHE_WARM,
+    STATS_MONTHS, EXPORT_CHUNK_SIZE, SEARCH_LIMIT, SEARCH_MIN_CHARS, SEARCH_CACHE_TTL, SEARCH_CACHE_SIZE
+)
+from src.database.cache import AdCache, SearchCache
+from src.database.migrations import apply_migrations
+from src.database.write_queue import WriteQueue
+from src.utils.date_utils import to_scheduled_at, format_scheduled_at
+from src.utils.metrics import timed_query
+
+class ConnectionPool:
+    """Пул постоянных соединений с базой данных."""
+
+    def __init__(self, path=DB_PATH, size=DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = asyncio.Queue()
+        self._connections = []
+        self._acquired = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    async def open(self):
+        """Открытие всех соединений пула."""
+        for _ in range(self.size):
+            db = await aiosqlite.connect(self.path)
+            # Соединение учитывается сразу, чтобы close() закрыл его и при ошибке в PRAGMA
+            self._connections.append(db)
+            db.row_factory = aiosqlite.Row
+            for pragma, value in SQLITE_PRAGMAS.items():
+                await db.execute(f'PRAGMA {pragma} = {value}')
+            self._idle.put_nowait(db)
+
+    async def close(self):
+        """Закрытие всех соединений пула."""
+        for db in self._connections:
+            await db.close()
+        self._connections.clear()
+        self._idle = asyncio.Queue()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Выдача соединения на время одной операции."""
+        started = perf_counter()
+        if self._idle.empty():
+            self._waits += 1
+        db = await self._idle.get()
+        waited = perf_counter() - started
+        self._acquired += 1
+        self._wait_time += waited
+        self._max_wait = max(self._max_wait, waited)
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+        finally:
+            self._idle.put_nowait(db)
+
+    def stats(self):
+        """Статистика использования пула."""
+        return {
+            'size': self.size,
+            'in_use': self.size - self._idle.qsize(),
+            'acquired': self._acquired,
+            'waits': self._waits,
+            'avg_wait_ms': self._wait_time / self._acquired * 1000 if self._acquired else 0.0,
+            'max_wait_ms': self._max_wait * 1000,
+        }
+
+_pool = None
+_write_queue = None
+ad_cache = AdCache(AD_CACHE_SIZE)
+search_cache = SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+# Слово запроса поиска: буквы, цифры и '_', как у токенизатора ads_fts
+SEARCH_WORD = re.compile(r'\w+')
+
+def get_pool():
+    """Получение активного пула соединений."""
+    if _pool is None:
+        raise RuntimeError("База данных не инициализирована, вызовите init_db()")
+    return _pool
+
+def get_write_queue():
+    """Получение очереди групповой записи."""
+    if _write_queue is None:
+        raise RuntimeError("База данных не инициализирована, вызовите init_db()")
+    return _write_queue
+
+async def init_db(path=DB_PATH, pool_size=DB_POOL_SIZE, cache=True):
+    """Инициализация базы данных с необходимыми таблицами.
+
+    cache=False выключает кэши записей и поиска: в многопроцессном режиме
+    каждый процесс видел бы в своём кэше устаревшие изменения других процессов.
+    """
+    global _pool, _write_queue
+    ad_cache.enabled = search_cache.enabled = cache
+    try:
+        _pool = ConnectionPool(path, pool_size)
+        await _pool.open()
+        async with _pool.acquire() as db:
+            await apply_migrations(db)
+        _write_queue = WriteQueue(_pool)
+        _write_queue.start()
+        if cache:
+            await warm_ad_cache()
     except Exception as e:
         logging.error(f"Ошибка инициализации базы данных: {e}")
+        # Потоки соединений aiosqlite не фоновые: открытый пул не дал бы процессу завершиться
+        if _write_queue is not None:
+            await _write_queue.stop()
+        if _pool is not None:
+            await _pool.close()
+        _pool = _write_queue = None
         raise
 
-async def add_advertisement(ad_type, date, username, time, conditions, value, payment_status="Не оплачено"):
+async def close_db():
+    """Закрытие пула соединений при остановке бота."""
+    global _pool, _write_queue
+    if _write_queue is not None:
+        await _write_queue.stop()
+        _write_queue = None
+    if _pool is not None:
+        logging.info(f"Статистика пула соединений: {_pool.stats()}")
+        logging.info(f"Статистика кэша записей: {ad_cache.stats()}")
+        logging.info(f"Статистика кэша поиска: {search_cache.stats()}")
+        await _pool.close()
+        _pool = None
+
+async def migrate_db(path=DB_PATH):
+    """Применение миграций через одно соединение, без пула, очереди записи и кэша.
+
+    В многопроцессном режиме супервизор вызывает её до запуска обработчиков:
+    иначе все процессы одновременно мигрировали бы свежую базу.
+    """
+    async with aiosqlite.connect(path) as db:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            await db.execute(f'PRAGMA {pragma} = {value}')
+        return await apply_migrations(db)
+
+async def warm_ad_cache(count=AD_CACHE_WARM):
+    """Загрузка последних записей в кэш при старте."""
+    ad_cache.clear()
+    async with get_pool().acquire() as db:
+        async with db.execute('SELECT * FROM ads ORDER BY id DESC LIMIT ?', (count,)) as cursor:
+            rows = await cursor.fetchall()
+    # Самые новые записи кладём последними, чтобы они вытеснялись позже остальных
+    for row in reversed(rows):
+        ad_cache.put(row['id'], dict(row))
+
+@timed_query
+async def add_advertisement(ad_type, date, username, time, conditions, value, payment_status="Не оплачено",
+                            scheduled_at=None):
     """Добавление новой рекламы в базу данных."""
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            if ad_type == 'CPM':
-                await db.execute('''
-                INSERT INTO ads (ad_type, date, username, time, conditions, cpm, payment_status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (ad_type, date, username, time, conditions, float(value), payment_status))
-            else:
-                await db.execute('''
-                INSERT INTO ads (ad_type, date, username, time, conditions, profit, payment_status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (ad_type, date, username, time, conditions, float(value), payment_status))
-            await db.commit()
-            return (await (await db.execute('SELECT last_insert_rowid()')).fetchone())[0]
+        column = 'cpm' if ad_type == 'CPM' else 'profit'
+        if scheduled_at is None:
+            scheduled_at = to_scheduled_at(date, time)
+        ad_id = await get_write_queue().submit(f'''
+        INSERT INTO ads (ad_type, date, username, time, conditions, {column}, payment_status, scheduled_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (ad_type, date, username, time, conditions, float(value), payment_status, scheduled_at))
+        ad_cache.invalidate(ad_id)
+        search_cache.clear()
+        return ad_id
     except Exception as e:
         logging.error(f"Ошибка при добавлении рекламы: {e}")
         raise
 
+@timed_query
+async def add_advertisements_bulk(ads):
+    """Добавление пачки реклам одним executemany через очередь записи.
+
+    ads — словари с теми же ключами, что и аргументы add_advertisement.
+    Возвращает id добавленных записей в порядке ads.
+    """
+    rows = []
+    for ad in ads:
+        value = float(ad['value'])
+        is_cpm = ad['ad_type'] == 'CPM'
+        rows.append((
+            ad['ad_type'], ad['date'], ad['username'], ad['time'], ad['conditions'],
+            value if is_cpm else None, None if is_cpm else value,
+            ad.get('payment_status', "Не оплачено"),
+            ad.get('scheduled_at') or to_scheduled_at(ad['date'], ad['time']),
+        ))
+    try:
+        ad_ids = await get_write_queue().submit_many('''
+        INSERT INTO ads (ad_type, date, username, time, conditions, cpm, profit, payment_status, scheduled_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        search_cache.clear()
+        return ad_ids
+    except Exception as e:
+        logging.error(f"Ошибка при массовом добавлении реклам: {e}")
+        raise
+
+@timed_query
 async def get_all_ads():
     """Получение всех рекламных объявлений."""
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            db.row_factory = aiosqlite.Row
+        async with get_pool().acquire() as db:
             async with db.execute('SELECT * FROM ads ORDER BY created_at DESC') as cursor:
                 return await cursor.fetchall()
     except Exception as e:
         logging.error(f"Ошибка при получении реклам: {e}")
         raise
 
+@timed_query
+async def get_ads_page(cursor_id=None, direction='next', limit=VIEW_PAGE_SIZE, columns='*', pool=None):
+    """Получение страницы реклам по ключу (keyset), от новых к старым.
+
+    direction='next' возвращает записи с id меньше cursor_id, 'prev' — больше.
+    Возвращает кортеж (записи по убыванию id, есть ли ещё записи в этом направлении).
+    pool — другой пул соединений вместо пула init_db.
+    """
+    try:
+        async with (pool or get_pool()).acquire() as db:
+            if cursor_id is None:
+                sql, params = f'SELECT {columns} FROM ads ORDER BY id DESC LIMIT ?', (limit + 1,)
+            elif direction == 'next':
+                sql, params = f'SELECT {columns} FROM ads WHERE id < ? ORDER BY id DESC LIMIT ?', (cursor_id, limit + 1)
+            else:
+                sql, params = f'SELECT {columns} FROM ads WHERE id > ? ORDER BY id ASC LIMIT ?', (cursor_id, limit + 1)
+            async with db.execute(sql, params) as cursor:
+                rows = await cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == 'prev' and cursor_id is not None:
+            rows.reverse()
+        return rows, has_more
+    except Exception as e:
+        logging.error(f"Ошибка при получении страницы реклам: {e}")
+        raise
+
+@timed_query
+async def get_ads_scheduled_between(start, end, limit=None):
+    """Получение реклам со временем выхода в полуинтервале [start, end), по возрастанию.
+
+    Запрос идёт по индексу idx_ads_scheduled_at, без разбора дат в Python.
+    """
+    try:
+        sql = 'SELECT * FROM ads WHERE scheduled_at >= ? AND scheduled_at < ? ORDER BY scheduled_at'
+        params = (format_scheduled_at(start), format_scheduled_at(end))
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params += (limit,)
+        async with get_pool().acquire() as db:
+            async with db.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+    except Exception as e:
+        logging.error(f"Ошибка при получении реклам по диапазону дат: {e}")
+        raise
+
+async def get_ads_due_today():
+    """Получение реклам, запланированных на сегодня."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return await get_ads_scheduled_between(today, today + timedelta(days=1))
+
+async def get_ads_next_week():
+    """Получение реклам, запланированных на ближайшие 7 дней начиная с текущего момента."""
+    now = datetime.now()
+    return await get_ads_scheduled_between(now, now + timedelta(days=7))
+
+async def iter_ads(start=None, end=None, payment_status=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Потоковое чтение реклам пачками по chunk_size строк, по возрастанию id.
+
+    start/end — границы scheduled_at (datetime), payment_status — точное значение.
+    В памяти одновременно находится не больше одной пачки.
+    """
+    conditions, params = [], []
+    if start is not None:
+        conditions.append('scheduled_at >= ?')
+        params.append(format_scheduled_at(start))
+    if end is not None:
+        conditions.append('scheduled_at < ?')
+        params.append(format_scheduled_at(end))
+    if payment_status is not None:
+        conditions.append('payment_status = ?')
+        params.append(payment_status)
+    sql = 'SELECT * FROM ads'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY id'
+
+    async with get_pool().acquire() as db:
+        async with db.execute(sql, params) as cursor:
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+@timed_query
+async def save_jobs(jobs):
+    """Сохранение отложенных задач: список кортежей (ad_id, job_type, run_at: datetime)."""
+    try:
+        await get_write_queue().submit_many(
+            'INSERT OR REPLACE INTO scheduled_jobs (ad_id, job_type, run_at) VALUES (?, ?, ?)',
+            [(ad_id, job_type, format_scheduled_at(run_at)) for ad_id, job_type, run_at in jobs]
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении отложенных задач: {e}")
+        raise
+
+@timed_query
+async def delete_job(ad_id, job_type):
+    """Удаление выполненной или отменённой задачи."""
+    try:
+        await get_write_queue().submit(
+            'DELETE FROM scheduled_jobs WHERE ad_id = ? AND job_type = ?', (ad_id, job_type)
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при удалении отложенной задачи: {e}")
+        raise
+
+@timed_query
+async def delete_jobs(ad_ids, job_type):
+    """Удаление пачки выполненных задач одного типа в одной транзакции."""
+    if not ad_ids:
+        return
+    try:
+        await get_write_queue().submit_many(
+            'DELETE FROM scheduled_jobs WHERE ad_id = ? AND job_type = ?',
+            [(ad_id, job_type) for ad_id in ad_ids]
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при удалении отложенных задач: {e}")
+        raise
+
+@timed_query
+async def get_pending_jobs():
+    """Получение всех сохранённых задач одним запросом по индексу run_at."""
+    try:
+        async with get_pool().acquire() as db:
+            async with db.execute(
+                'SELECT ad_id, job_type, run_at FROM scheduled_jobs ORDER BY run_at'
+            ) as cursor:
+                return await cursor.fetchall()
+    except Exception as e:
+        logging.error(f"Ошибка при получении отложенных задач: {e}")
+        raise
+
+@timed_query
+async def get_jobs(keys):
+    """Сохранённые задачи из списка пар (ad_id, job_type): словарь пара -> run_at."""
+    if not keys:
+        return {}
+    wanted = set(keys)
+    try:
+        async with get_pool().acquire() as db:
+            async with db.execute(
+                'SELECT ad_id, job_type, run_at FROM scheduled_jobs WHERE ad_id IN (SELECT value FROM json_each(?))',
+                (json.dumps(sorted({ad_id for ad_id, _ in wanted})),)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return {
+            (row['ad_id'], row['job_type']): row['run_at']
+            for row in rows if (row['ad_id'], row['job_type']) in wanted
+        }
+    except Exception as e:
+        logging.error(f"Ошибка при получении отложенных задач: {e}")
+        raise
+
+@timed_query
+async def get_stats(months=STATS_MONTHS):
+    """Получение сводной статистики из ad_stats: итоги по типам и по последним месяцам.
+
+    Объём чтения зависит только от числа типов и месяцев, а не от числа реклам.
+    """
+    try:
+        async with get_pool().acquire() as db:
+            async with db.execute('''
+            SELECT ad_type, SUM(ads_count) AS ads_count, SUM(cpm_total) AS cpm_total,
+                   SUM(profit_total) AS profit_total, SUM(paid_count) AS paid_count,
+                   SUM(paid_profit) AS paid_profit, SUM(unpaid_count) AS unpaid_count,
+                   SUM(unpaid_profit) AS unpaid_profit
+            FROM ad_stats GROUP BY ad_type HAVING SUM(ads_count) > 0 ORDER BY ad_type
+            ''') as cursor:
+                by_type = await cursor.fetchall()
+            async with db.execute('''
+            SELECT month, SUM(ads_count) AS ads_count, SUM(profit_total) AS profit_total,
+                   SUM(paid_count) AS paid_count, SUM(unpaid_count) AS unpaid_count
+            FROM ad_stats GROUP BY month HAVING SUM(ads_count) > 0 ORDER BY month DESC LIMIT ?
+            ''', (months,)) as cursor:
+                by_month = await cursor.fetchall()
+        return by_type, by_month
+    except Exception as e:
+        logging.error(f"Ошибка при получении статистики: {e}")
+        raise
+
+@timed_query
 async def get_ad_by_id(ad_id):
     """Получение рекламы по ID."""
+    ad = ad_cache.get(ad_id)
+    if ad is not None:
+        return ad
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            db.row_factory = aiosqlite.Row
+        generation = ad_cache.generation()
+        async with get_pool().acquire() as db:
             async with db.execute('SELECT * FROM ads WHERE id = ?', (ad_id,)) as cursor:
-                return await cursor.fetchone()
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        ad = dict(row)
+        ad_cache.put(ad_id, ad, generation)
+        return ad
     except Exception as e:
         logging.error(f"Ошибка при получении рекламы по ID: {e}")
         raise
 
+@timed_query
+async def get_ads_by_ids(ad_ids):
+    """Получение записей по списку ID одним запросом WHERE id IN (...)."""
+    if not ad_ids:
+        return []
+    try:
+        placeholders = ', '.join('?' * len(ad_ids))
+        async with get_pool().acquire() as db:
+            async with db.execute(f'SELECT * FROM ads WHERE id IN ({placeholders})', tuple(ad_ids)) as cursor:
+                return await cursor.fetchall()
+    except Exception as e:
+        logging.error(f"Ошибка при получении реклам по списку ID: {e}")
+        raise
+
+@timed_query
+async def save_post_results(results):
+    """Запись охвата и прибыли пачкой в одной транзакции: список (ad_id, reach, profit)."""
+    if not results:
+        return
+    try:
+        await get_write_queue().submit_many(
+            'UPDATE ads SET reach = ?, profit = ? WHERE id = ?',
+            [(reach, profit, ad_id) for ad_id, reach, profit in results]
+        )
+        for ad_id, _, _ in results:
+            ad_cache.invalidate(ad_id)
+        search_cache.clear()
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении охвата: {e}")
+        raise
+
+@timed_query
 async def update_ad_field(ad_id, field, value):
     """Обновление поля рекламы."""
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            await db.execute(f'UPDATE ads SET {field} = ? WHERE id = ?', (value, ad_id))
-            await db.commit()
+        await get_write_queue().submit(f'UPDATE ads SET {field} = ? WHERE id = ?', (value, ad_id))
+        search_cache.clear()
+        if field in ('date', 'time'):
+            # scheduled_at пересчитывается триггером, кэшированная копия устарела
+            ad_cache.invalidate(ad_id)
+        else:
+            ad_cache.update(ad_id, field, value)
     except Exception as e:
         logging.error(f"Ошибка при обновлении поля рекламы: {e}")
         raise
 
+@timed_query
 async def delete_ad(ad_id):
     """Удаление рекламы."""
     try:
-        async with aiosqlite.connect('advertisements.db') as db:
-            await db.execute('DELETE FROM ads WHERE id = ?', (ad_id,))
-            await db.commit()
+        await get_write_queue().submit('DELETE FROM ads WHERE id = ?', (ad_id,))
+        ad_cache.invalidate(ad_id)
+        search_cache.clear()
     except Exception as e:
         logging.error(f"Ошибка при удалении рекламы: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def search_match(text):
+    """Выражение MATCH для FTS5: все слова запроса как префиксы, или None.
+
+    Слова короче SEARCH_MIN_CHARS отбрасываются (по одной букве совпадает
+    слишком много записей), каждое берётся в кавычки, чтобы пользовательский
+    ввод не разбирался как синтаксис FTS5 (AND, NEAR, * и т.п.).
+    """
+    words = [word for word in SEARCH_WORD.findall(text.lower()) if len(word) >= SEARCH_MIN_CHARS]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+@timed_query
+async def search_ads(text, limit=SEARCH_LIMIT):
+    """Поиск записей по юзеру, условиям и заметкам, лучшие совпадения первыми (bm25).
+
+    Результаты кэшируются по выражению запроса на SEARCH_CACHE_TTL секунд.
+    """
+    match = search_match(text)
+    if match is None:
+        return []
+    key = (match, limit)
+    ads = search_cache.get(key)
+    if ads is not None:
+        return ads
+    try:
+        generation = search_cache.generation()
+        async with get_pool().acquire() as db:
+            async with db.execute('''
+            SELECT ads.* FROM ads_fts JOIN ads ON ads.id = ads_fts.rowid
+            WHERE ads_fts MATCH ? ORDER BY ads_fts.rank LIMIT ?
+            ''', (match, limit)) as cursor:
+                ads = [dict(row) for row in await cursor.fetchall()]
+        search_cache.put(key, ads, generation)
+        return ads
+    except Exception as e:
+        logging.error(f"Ошибка при поиске рекламы: {e}")
+        raise
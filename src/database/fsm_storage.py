@@ -0,0 +1,232 @@
+"""
+Хранилище состояний FSM в SQLite с кэшем в памяти и пакетной записью
+"""
+
+import copy
+import json
+import asyncio
+import logging
+import aiosqlite
+from time import time
+from collections import OrderedDict
+from aiogram.dispatcher.storage import BaseStorage
+from src.config.config import (
+    DB_PATH, SQLITE_PRAGMAS, FSM_STORAGE, FSM_STATE_TTL, FSM_FLUSH_INTERVAL, FSM_SWEEP_INTERVAL, FSM_CACHE_SIZE
+)
+from src.database.migrations import apply_migrations
+
+class SQLiteStorage(BaseStorage):
+    """Замена MemoryStorage, переживающая рестарт.
+
+    Состояние и данные формы сначала меняются в кэше (его и читают
+    обработчики), а в таблицу fsm_states попадают фоновым сбросом раз
+    в flush_interval секунд: все изменения за интервал — одной транзакцией.
+    Формы, которых не касались дольше ttl секунд, считаются брошенными
+    и удаляются. Кэш ограничен cache_size записями, вытесняются только
+    уже сохранённые.
+
+    Каждый процесс держит свой кэш, поэтому обновления одного чата должны
+    обрабатываться одним процессом. path=':memory:' — локальная замена для
+    тестов и бенчмарков без файла.
+    """
+
+    def __init__(self, path=DB_PATH, ttl=FSM_STATE_TTL, flush_interval=FSM_FLUSH_INTERVAL,
+                 sweep_interval=FSM_SWEEP_INTERVAL, cache_size=FSM_CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.cache_size = cache_size
+        self._db = None
+        self._task = None
+        # (chat, user) -> [state, data, updated_at]
+        self._entries = OrderedDict()
+        self._dirty = set()
+        self._flush_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+
+    async def open(self):
+        """Подключение к базе и запуск фонового сброса."""
+        self._db = await aiosqlite.connect(self.path)
+        for pragma, value in SQLITE_PRAGMAS.items():
+            await self._db.execute(f'PRAGMA {pragma} = {value}')
+        await apply_migrations(self._db)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._db is not None:
+            await self.flush()
+            await self._db.close()
+            self._db = None
+        self._entries.clear()
+
+    async def wait_closed(self):
+        pass
+
+    def _key(self, chat, user):
+        chat, user = self.check_address(chat=chat, user=user)
+        return str(chat), str(user)
+
+    async def _entry(self, key):
+        """Запись формы из кэша или базы; просроченная считается пустой."""
+        now = time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            async with self._db.execute(
+                'SELECT state, data, updated_at FROM fsm_states WHERE chat = ? AND user = ?', key
+            ) as cursor:
+                row = await cursor.fetchone()
+            entry = [row[0], json.loads(row[1]), row[2]] if row else [None, {}, now]
+            # Пока шёл запрос, запись могла загрузить и изменить другая корутина:
+            # её вариант новее прочитанного из базы
+            entry = self._entries.setdefault(key, entry)
+            self._evict()
+        if now - entry[2] > self.ttl:
+            entry[0], entry[1] = None, {}
+        return entry
+
+    def _touch(self, key, entry):
+        entry[2] = time()
+        self._dirty.add(key)
+
+    def _evict(self):
+        """Вытеснение давно не использованных сохранённых записей сверх cache_size."""
+        if len(self._entries) <= self.cache_size:
+            return
+        for key in list(self._entries):
+            if len(self._entries) <= self.cache_size:
+                break
+            if key not in self._dirty:
+                del self._entries[key]
+
+    async def flush(self):
+        """Запись накопленных изменений одной транзакцией."""
+        async with self._flush_lock:
+            if not self._dirty or self._db is None:
+                return
+            dirty, self._dirty = self._dirty, set()
+            upserts, deletes = [], []
+            for key in dirty:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                state, data, updated_at = entry
+                if state is None and not data:
+                    deletes.append(key)
+                else:
+                    upserts.append((*key, state, json.dumps(data, ensure_ascii=False), updated_at))
+            try:
+                if upserts:
+                    await self._db.executemany(
+                        'INSERT INTO fsm_states (chat, user, state, data, updated_at) VALUES (?, ?, ?, ?, ?) '
+                        'ON CONFLICT (chat, user) DO UPDATE SET '
+                        'state = excluded.state, data = excluded.data, updated_at = excluded.updated_at',
+                        upserts
+                    )
+                if deletes:
+                    await self._db.executemany('DELETE FROM fsm_states WHERE chat = ? AND user = ?', deletes)
+                await self._db.commit()
+                self.flushes += 1
+            except Exception as e:
+                await self._db.rollback()
+                # Изменения вернутся в следующий сброс
+                self._dirty |= dirty
+                logging.error(f"Ошибка записи состояний FSM: {e}")
+
+    async def sweep(self):
+        """Удаление брошенных форм из базы и кэша. Возвращает число удалённых строк."""
+        deadline = time() - self.ttl
+        for key in [key for key, entry in self._entries.items() if entry[2] < deadline and key not in self._dirty]:
+            del self._entries[key]
+        cursor = await self._db.execute('DELETE FROM fsm_states WHERE updated_at < ?', (deadline,))
+        await self._db.commit()
+        return cursor.rowcount
+
+    async def _run(self):
+        last_sweep = time()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time() - last_sweep >= self.sweep_interval:
+                last_sweep = time()
+                try:
+                    removed = await self.sweep()
+                    if removed:
+                        logging.info(f"Удалено брошенных форм: {removed}")
+                except Exception as e:
+                    logging.error(f"Ошибка очистки состояний FSM: {e}")
+
+    async def get_state(self, *, chat=None, user=None, default=None):
+        entry = await self._entry(self._key(chat, user))
+        return entry[0] if entry[0] is not None else self.resolve_state(default)
+
+    async def get_data(self, *, chat=None, user=None, default=None):
+        entry = await self._entry(self._key(chat, user))
+        return copy.deepcopy(entry[1])
+
+    async def set_state(self, *, chat=None, user=None, state=None):
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        entry[0] = self.resolve_state(state)
+        self._touch(key, entry)
+
+    async def set_data(self, *, chat=None, user=None, data=None):
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        entry[1] = copy.deepcopy(data or {})
+        self._touch(key, entry)
+
+    async def update_data(self, *, chat=None, user=None, data=None, **kwargs):
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        entry[1].update(data or {}, **kwargs)
+        self._touch(key, entry)
+
+    async def reset_state(self, *, chat=None, user=None, with_data=True):
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        entry[0] = None
+        if with_data:
+            entry[1] = {}
+        self._touch(key, entry)
+
+    def stats(self):
+        """Статистика кэша и сбросов."""
+        return {
+            'cached': len(self._entries),
+            'dirty': len(self._dirty),
+            'hits': self.hits,
+            'misses': self.misses,
+            'flushes': self.flushes,
+        }
+
+    async def state_counts(self):
+        """Число активных форм по состояниям (с учётом ещё не сброшенных изменений)."""
+        await self.flush()
+        async with self._db.execute(
+            'SELECT state, COUNT(*) FROM fsm_states WHERE state IS NOT NULL AND updated_at >= ? GROUP BY state',
+            (time() - self.ttl,)
+        ) as cursor:
+            return {state: count for state, count in await cursor.fetchall()}
+
+def create_storage(kind=FSM_STORAGE):
+    """Хранилище FSM по настройке FSM_STORAGE; SQLiteStorage перед работой нужно открыть (open)."""
+    if kind == 'memory':
+        from aiogram.contrib.fsm_storage.memory import MemoryStorage
+        return MemoryStorage()
+    if kind == 'sqlite':
+        return SQLiteStorage()
+    raise ValueError(f"Unknown FSM storage: {kind}")
@@ -0,0 +1,261 @@
+"""
+Модуль с версионированными миграциями схемы базы данных
+"""
+
+import logging
+
+def _month(row):
+    """SQL-выражение месяца ГГГГ-ММ из даты ДД.ММ.ГГГГ."""
+    return f"substr({row}.date, 7, 4) || '-' || substr({row}.date, 4, 2)"
+
+def _stats_values(row, sign=None):
+    """Вклад строки (или группы строк при sign=None) в столбцы ad_stats."""
+    if sign is None:
+        total = 'SUM'
+    else:
+        total = f'{sign} * '
+    paid = f"{row}.payment_status = 'Оплачено'"
+    return (
+        f"{row}.ad_type, {_month(row)}, "
+        f"{total}(1), "
+        f"{total}(COALESCE({row}.cpm, 0)), "
+        f"{total}(COALESCE({row}.profit, 0)), "
+        f"{total}({paid}), "
+        f"{total}(CASE WHEN {paid} THEN COALESCE({row}.profit, 0) ELSE 0 END), "
+        f"{total}(NOT {paid}), "
+        f"{total}(CASE WHEN {paid} THEN 0 ELSE COALESCE({row}.profit, 0) END)"
+    )
+
+def _stats_upsert(row, sign):
+    """Тело триггера: прибавление (sign=1) или вычитание (sign=-1) строки из ad_stats."""
+    return f'''
+            INSERT INTO ad_stats VALUES ({_stats_values(row, sign)})
+            ON CONFLICT (ad_type, month) DO UPDATE SET
+                ads_count = ads_count + excluded.ads_count,
+                cpm_total = cpm_total + excluded.cpm_total,
+                profit_total = profit_total + excluded.profit_total,
+                paid_count = paid_count + excluded.paid_count,
+                paid_profit = paid_profit + excluded.paid_profit,
+                unpaid_count = unpaid_count + excluded.unpaid_count,
+                unpaid_profit = unpaid_profit + excluded.unpaid_profit;'''
+
+def _scheduled_at(row):
+    """SQL-выражение scheduled_at (ГГГГ-ММ-ДД ЧЧ:ММ) из столбцов date и time.
+
+    Повторяет src.utils.date_utils.to_scheduled_at для строк, записанных без него.
+    """
+    return f'''CASE WHEN {row}.date GLOB '[0-3][0-9].[01][0-9].[0-9][0-9][0-9][0-9]' THEN
+            substr({row}.date, 7, 4) || '-' || substr({row}.date, 4, 2) || '-' || substr({row}.date, 1, 2) || ' ' ||
+            CASE
+                WHEN ltrim({row}.time) GLOB '[01][0-9]:[0-5][0-9]*' OR ltrim({row}.time) GLOB '2[0-3]:[0-5][0-9]*'
+                    THEN substr(ltrim({row}.time), 1, 5)
+                WHEN ltrim({row}.time) GLOB '[0-9]:[0-5][0-9]*' THEN '0' || substr(ltrim({row}.time), 1, 4)
+                ELSE '00:00'
+            END
+        END'''
+
+def _padded_date(row):
+    """SQL-выражение даты ДД.ММ.ГГГГ с ведущими нулями из Д.М.ГГГГ, ДД.М.ГГГГ или Д.ММ.ГГГГ."""
+    rest = f"substr({row}.date, instr({row}.date, '.') + 1)"
+    return (
+        f"printf('%02d.%02d.%s', substr({row}.date, 1, instr({row}.date, '.') - 1), "
+        f"substr({rest}, 1, instr({rest}, '.') - 1), substr({rest}, instr({rest}, '.') + 1))"
+    )
+
+# Каждая миграция — список SQL-выражений. Номер версии схемы равен
+# индексу миграции + 1 и хранится в PRAGMA user_version.
+MIGRATIONS = [
+    # 1: исходная таблица объявлений
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS ads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ad_type TEXT NOT NULL,
+            date TEXT NOT NULL,
+            username TEXT NOT NULL,
+            time TEXT NOT NULL,
+            conditions TEXT NOT NULL,
+            cpm REAL,
+            reach INTEGER,
+            profit REAL,
+            payment_status TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ],
+    # 2: индексы под сортировку и фильтры админ-панели
+    [
+        'CREATE INDEX IF NOT EXISTS idx_ads_created_at ON ads (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_ads_username ON ads (username)',
+        'CREATE INDEX IF NOT EXISTS idx_ads_date ON ads (date)',
+        'CREATE INDEX IF NOT EXISTS idx_ads_payment_status ON ads (payment_status)',
+    ],
+    # 3: сводная статистика по типу и месяцу, поддерживаемая триггерами
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS ad_stats (
+            ad_type TEXT NOT NULL,
+            month TEXT NOT NULL,
+            ads_count INTEGER NOT NULL DEFAULT 0,
+            cpm_total REAL NOT NULL DEFAULT 0,
+            profit_total REAL NOT NULL DEFAULT 0,
+            paid_count INTEGER NOT NULL DEFAULT 0,
+            paid_profit REAL NOT NULL DEFAULT 0,
+            unpaid_count INTEGER NOT NULL DEFAULT 0,
+            unpaid_profit REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (ad_type, month)
+        )
+        ''',
+        f'''
+        INSERT INTO ad_stats
+        SELECT {_stats_values('ads')} FROM ads
+        GROUP BY ad_type, {_month('ads')}
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS ads_stats_insert AFTER INSERT ON ads BEGIN
+            {_stats_upsert('NEW', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS ads_stats_delete AFTER DELETE ON ads BEGIN
+            {_stats_upsert('OLD', -1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS ads_stats_update
+        AFTER UPDATE OF ad_type, date, cpm, profit, payment_status ON ads BEGIN
+            {_stats_upsert('OLD', -1)}
+            {_stats_upsert('NEW', 1)}
+        END
+        ''',
+    ],
+    # 4: нормализованное время выхода рекламы для индексных запросов по диапазону
+    [
+        'ALTER TABLE ads ADD COLUMN scheduled_at TEXT',
+        f"UPDATE ads SET scheduled_at = {_scheduled_at('ads')}",
+        'CREATE INDEX IF NOT EXISTS idx_ads_scheduled_at ON ads (scheduled_at)',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS ads_scheduled_at_update
+        AFTER UPDATE OF date, time ON ads BEGIN
+            UPDATE ads SET scheduled_at = {_scheduled_at('NEW')} WHERE id = NEW.id;
+        END
+        ''',
+    ],
+    # 5: постоянное хранилище отложенных задач планировщика
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            ad_id INTEGER NOT NULL,
+            job_type TEXT NOT NULL,
+            run_at TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (ad_id, job_type)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_run_at ON scheduled_jobs (run_at)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS ads_jobs_delete AFTER DELETE ON ads BEGIN
+            DELETE FROM scheduled_jobs WHERE ad_id = OLD.id;
+        END
+        ''',
+    ],
+    # 6: состояния FSM (AdForm, EditAdForm) переживают рестарт и доступны всем процессам
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            chat TEXT NOT NULL,
+            user TEXT NOT NULL,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (chat, user)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)',
+    ],
+    # 7: заметки и полнотекстовый поиск (FTS5) по юзеру, условиям и заметкам.
+    # Индекс хранит только токены, текст берётся из ads (content='ads');
+    # '_' — часть слова, чтобы @user_name искался целиком по префиксу.
+    [
+        "ALTER TABLE ads ADD COLUMN notes TEXT NOT NULL DEFAULT ''",
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS ads_fts USING fts5(
+            username, conditions, notes,
+            content='ads', content_rowid='id',
+            tokenize="unicode61 remove_diacritics 2 tokenchars '_'",
+            prefix='2 3'
+        )
+        ''',
+        "INSERT INTO ads_fts (ads_fts) VALUES ('rebuild')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS ads_fts_insert AFTER INSERT ON ads BEGIN
+            INSERT INTO ads_fts (rowid, username, conditions, notes)
+            VALUES (NEW.id, NEW.username, NEW.conditions, NEW.notes);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS ads_fts_delete AFTER DELETE ON ads BEGIN
+            INSERT INTO ads_fts (ads_fts, rowid, username, conditions, notes)
+            VALUES ('delete', OLD.id, OLD.username, OLD.conditions, OLD.notes);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS ads_fts_update AFTER UPDATE OF username, conditions, notes ON ads BEGIN
+            INSERT INTO ads_fts (ads_fts, rowid, username, conditions, notes)
+            VALUES ('delete', OLD.id, OLD.username, OLD.conditions, OLD.notes);
+            INSERT INTO ads_fts (rowid, username, conditions, notes)
+            VALUES (NEW.id, NEW.username, NEW.conditions, NEW.notes);
+        END
+        ''',
+    ],
+    # 8: даты без ведущих нулей (1.3.2025) -> ДД.ММ.ГГГГ. Триггеры обновления
+    # переносят запись в правильный месяц ad_stats и пересчитывают scheduled_at.
+    [
+        f'''
+        UPDATE ads SET date = {_padded_date('ads')}
+        WHERE date GLOB '[0-9].[0-9].[0-9][0-9][0-9][0-9]'
+           OR date GLOB '[0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]'
+           OR date GLOB '[0-9][0-9].[0-9].[0-9][0-9][0-9][0-9]'
+        ''',
+        'DELETE FROM ad_stats WHERE ads_count = 0',
+    ],
+    # 9: ссылка на рекламный пост, по которой собираются просмотры
+    [
+        "ALTER TABLE ads ADD COLUMN post_link TEXT NOT NULL DEFAULT ''",
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+async def get_schema_version(db):
+    """Получение текущей версии схемы."""
+    async with db.execute('PRAGMA user_version') as cursor:
+        return (await cursor.fetchone())[0]
+
+async def apply_migrations(db):
+    """Применение всех недостающих миграций. Возвращает итоговую версию схемы."""
+    version = await get_schema_version(db)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        try:
+            # sqlite3 не открывает транзакцию перед DDL сам: без явного BEGIN
+            # ALTER TABLE фиксируется сразу и не откатывается при ошибке.
+            # user_version повышается в той же транзакции, что и миграция.
+            await db.execute('BEGIN IMMEDIATE')
+            if await get_schema_version(db) >= number:
+                # Миграцию уже применил другой процесс, пока этот ждал блокировку
+                await db.commit()
+                continue
+            for statement in MIGRATIONS[number - 1]:
+                await db.execute(statement)
+            # PRAGMA не принимает параметры, номер версии — целое из кода
+            await db.execute(f'PRAGMA user_version = {number}')
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logging.error(f"Ошибка миграции схемы до версии {number}: {e}")
+            raise
+        logging.info(f"Схема базы данных обновлена до версии {number}")
+    return SCHEMA_VERSION
\ No newline at end of file
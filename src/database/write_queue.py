@@ -0,0 +1,118 @@
+"""
+Модуль с очередью записи в базу данных с групповой фиксацией (group commit)
+"""
+
+import asyncio
+import logging
+from src.config.config import WRITE_BATCH_SIZE, WRITE_BATCH_DELAY
+
+class WriteQueue:
+    """Очередь изменений, которые фоновая задача фиксирует пачками.
+
+    Пачка выполняется в одной транзакции; если она откатилась, изменения
+    повторяются по одному, чтобы ошибка одного запроса не задела остальные.
+    Future вызывающего завершается после COMMIT: id вставленной строки
+    для INSERT, число затронутых строк для остальных запросов или исключением.
+    Пачки строк (submit_many) выполняются executemany в той же транзакции.
+    """
+
+    def __init__(self, pool, batch_size=WRITE_BATCH_SIZE, batch_delay=WRITE_BATCH_DELAY):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._queue = asyncio.Queue()
+        self._task = None
+        self.batches = 0
+        self.writes = 0
+
+    def start(self):
+        """Запуск фоновой задачи записи."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._writer())
+
+    async def stop(self):
+        """Остановка задачи записи после фиксации всех ожидающих изменений."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, sql, params=()):
+        """Постановка изменения в очередь и ожидание его фиксации."""
+        return await self._put(sql, params, False)
+
+    async def submit_many(self, sql, rows):
+        """Постановка executemany в очередь и ожидание его фиксации.
+
+        Для INSERT результат — список id вставленных строк в порядке rows.
+        """
+        return await self._put(sql, list(rows), True)
+
+    async def _put(self, sql, params, many):
+        if self._task is None:
+            raise RuntimeError("Очередь записи не запущена")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((sql, params, many, future))
+        return await future
+
+    async def _collect(self):
+        """Сбор пачки: первое изменение ждём, остальные — не дольше batch_delay."""
+        batch = [await self._queue.get()]
+        if self._queue.qsize() < self.batch_size - 1:
+            await asyncio.sleep(self.batch_delay)
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _execute_batch(self, batch):
+        """Выполнение пачки в одной транзакции. Возвращает результаты по порядку."""
+        results = []
+        async with self.pool.acquire() as db:
+            for sql, params, many, _ in batch:
+                is_insert = sql.lstrip().upper().startswith('INSERT')
+                if not many:
+                    cursor = await db.execute(sql, params)
+                    results.append(cursor.lastrowid if is_insert else cursor.rowcount)
+                elif is_insert:
+                    await db.executemany(sql, params)
+                    # Транзакция держит блокировку записи, поэтому id строк пачки идут подряд
+                    async with db.execute('SELECT last_insert_rowid()') as cursor:
+                        last_id = (await cursor.fetchone())[0]
+                    results.append(list(range(last_id - len(params) + 1, last_id + 1)) if params else [])
+                else:
+                    cursor = await db.executemany(sql, params)
+                    results.append(cursor.rowcount)
+            await db.commit()
+        return results
+
+    async def _writer(self):
+        """Фоновая задача: выполнение и фиксация изменений пачками."""
+        while True:
+            batch = await self._collect()
+            try:
+                results = await self._execute_batch(batch)
+            except Exception:
+                # Пачка откатилась целиком: повторяем изменения по одному,
+                # чтобы ошибка досталась только виновному запросу
+                results = []
+                for item in batch:
+                    try:
+                        results.extend(await self._execute_batch([item]))
+                    except Exception as e:
+                        logging.error(f"Ошибка записи в базу данных: {e}")
+                        results.append(e)
+
+            self.batches += 1
+            self.writes += len(batch)
+            for (_, _, _, future), result in zip(batch, results):
+                if not future.done():
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+                self._queue.task_done()
\ No newline at end of file
@@ -3,90 +3,69 @@
 """
 
 import logging
-from datetime import datetime, timedelta
+from io import BytesIO
 from aiogram import types
 from aiogram.dispatcher import FSMContext
-from src.config.config import VALID_CONDITIONS
-from src.database.database import add_advertisement
-from src.keyboards.keyboards import get_main_menu
+from src.config.config import BULK_IMPORT_MAX_LINES, BULK_IMPORT_MAX_ERRORS, BULK_IMPORT_MAX_BYTES
+from src.database.database import add_advertisement, add_advertisements_bulk
+from src.keyboards.keyboards import get_main_menu, get_back_keyboard
+from src.handlers.router import router
 from src.handlers.states import AdForm
+from src.utils.ad_parser import parse_ad, format_errors, import_line, is_header
+from src.utils.jobs import schedule_post_processing
 
-async def choose_ad_type(callback_query: types.CallbackQuery, state: FSMContext):
+@router.callback('type_', state='*', ad_type=str)
+async def choose_ad_type(callback_query: types.CallbackQuery, state: FSMContext, ad_type: str):
     """Обработка выбора типа рекламы."""
-    ad_type = callback_query.data.split('_')[1].upper()
+    ad_type = ad_type.upper()
     async with state.proxy() as data:
         data['ad_type'] = ad_type
     
-    keyboard = types.InlineKeyboardMarkup(row_width=1)
-    keyboard.add(types.InlineKeyboardButton("⬅️ Назад", callback_data="open_menu"))
-    
     await callback_query.message.edit_text(
         f"Введите данные ({ad_type}) в формате:\n"
         "ДД.ММ.ГГГГ, @юзер, время, условия, CPM/сумма",
-        reply_markup=keyboard
+        reply_markup=get_back_keyboard('open_menu')
     )
     await AdForm.waiting_for_data.set()
 
-async def process_ad_data(message: types.Message, ad_type: str = None):
-    """Обработка и валидация данных рекламы."""
-    try:
-        # Заменяем запятые без пробелов на запятые с пробелами
-        text = message.text.replace(',', ', ')
-        # Удаляем возможные двойные пробелы
-        text = ' '.join(text.split())
-        parts = text.split(', ')
-        
-        if len(parts) not in (5, 6):
-            await message.reply("❌ Неверный формат! Используйте формат:\nДД.ММ.ГГГГ, @юзер, время, условия, CPM/сумма")
-            return
-
-        # Parse input data
-        if len(parts) == 5:
-            date, username, time, conditions, value = parts
-            ad_type = 'CPM' if '.' in value else 'ФИКС'
-        else:
-            date, username, time, conditions, ad_type_input, value = parts
-            ad_type = ad_type_input.upper()
+def parse_ad_line(line):
+    """Разбор и валидация одной строки с данными рекламы.
 
-        # Validate advertisement type
-        if ad_type not in ['CPM', 'ФИКС']:
-            await message.reply("❌ Ошибка в типе рекламы! Допустимые типы: CPM или ФИКС")
-            return
+    Возвращает (данные, None) при успехе или (None, текст ошибки по всем неверным полям).
+    """
+    ad, errors = parse_ad(line)
+    return ad, format_errors(errors) if errors else None
 
-        # Validate conditions
-        if conditions.lower() not in [c.lower() for c in VALID_CONDITIONS]:
-            await message.reply(f"❌ Неверные условия! Допустимые условия: {', '.join(VALID_CONDITIONS)}")
-            return
+async def process_ad_data(message: types.Message, ad_type: str = None, text: str = None):
+    """Обработка и валидация данных рекламы; text — данные без упоминания бота."""
+    text = message.text if text is None else text
+    if '\n' in text.strip():
+        await process_bulk_import(message, text)
+        return
 
-        # Validate date format
-        try:
-            datetime.strptime(date, "%d.%m.%Y")
-        except ValueError:
-            await message.reply("❌ Неверный формат даты! Используйте формат ДД.ММ.ГГГГ")
+    try:
+        ad, error = parse_ad_line(text)
+        if error:
+            await message.reply(error)
             return
 
         # Process and save data
-        ad_id = await add_advertisement(
-            ad_type=ad_type,
-            date=date,
-            username=username,
-            time=time,
-            conditions=conditions,
-            value=value,
-            payment_status='Не оплачено' if ad_type == 'CPM' else 'Оплачено'
-        )
+        ad_id = await add_advertisement(**ad)
+        if ad['ad_type'] == 'CPM':
+            # Schedule post processing
+            await schedule_post_processing([(ad_id, ad['scheduled_at'])])
         
         # Send confirmation message
         await message.reply(
             f"""
             ✅ Запись успешно сохранена!
             
-            📅 Дата: {date}
-            ⏰ Время: {time}
-            👤 Пользователь: {username}
-            📋 Условия: {conditions}
-            📈 Тип рекламы: {ad_type}
-            💰 Значение: {value}
+            📅 Дата: {ad['date']}
+            ⏰ Время: {ad['time']}
+            👤 Пользователь: {ad['username']}
+            📋 Условия: {ad['conditions']}
+            📈 Тип рекламы: {ad['ad_type']}
+            💰 Значение: {ad['value']}
             """,
             reply_markup=get_main_menu()
         )
@@ -95,4 +74,73 @@ async def process_ad_data(message: types.Message, ad_type: str = None):
         await message.reply(f"❌ Ошибка в данных: {str(e)}\nПроверьте правильность введенных значений.")
     except Exception as e:
         logging.error(f"Error processing ad data: {e}")
-        await message.reply("❌ Произошла непредвиденная ошибка. Попробуйте позже или обратитесь в техподдержку.") 
\ No newline at end of file
+        await message.reply("❌ Произошла непредвиденная ошибка. Попробуйте позже или обратитесь в техподдержку.")
+
+async def process_bulk_import(message: types.Message, text: str):
+    """Массовый импорт: по одной рекламе на строку, все валидные — одной транзакцией."""
+    lines = text.splitlines()
+    if len(lines) > BULK_IMPORT_MAX_LINES:
+        await message.reply(f"❌ Слишком много строк: {len(lines)}. Максимум — {BULK_IMPORT_MAX_LINES}.")
+        return
+
+    ads, errors = [], []
+    header_allowed = True
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        # Заголовок CSV пропускается только перед данными; прочие строки разбираются и попадают в ошибки
+        if header_allowed:
+            header_allowed = False
+            if is_header(line):
+                continue
+        ad, error = parse_ad_line(import_line(line))
+        if error:
+            errors.append((number, error.replace('\n', ' ')))
+        else:
+            ads.append(ad)
+
+    try:
+        ad_ids = await add_advertisements_bulk(ads) if ads else []
+    except Exception as e:
+        logging.error(f"Error in bulk import: {e}")
+        await message.reply("❌ Произошла ошибка при сохранении. Ни одна запись не добавлена.")
+        return
+
+    summary = [f"📥 Импорт завершён: добавлено {len(ad_ids)}, с ошибками {len(errors)}."]
+    try:
+        await schedule_post_processing([
+            (ad_id, ad['scheduled_at']) for ad_id, ad in zip(ad_ids, ads) if ad['ad_type'] == 'CPM'
+        ])
+    except Exception as e:
+        # Записи уже сохранены, не запланирован только сбор охвата
+        logging.error(f"Error scheduling post processing for imported ads {ad_ids}: {e}")
+        summary.append("⚠️ Записи сохранены, но сбор охвата для CPM не запланирован.")
+    for number, error in errors[:BULK_IMPORT_MAX_ERRORS]:
+        summary.append(f"Строка {number}: {error}")
+    if len(errors) > BULK_IMPORT_MAX_ERRORS:
+        summary.append(f"…и ещё {len(errors) - BULK_IMPORT_MAX_ERRORS} строк с ошибками.")
+    await message.reply('\n'.join(summary), reply_markup=get_main_menu())
+
+async def process_import_document(message: types.Message):
+    """Массовый импорт из присланного .txt или .csv файла."""
+    file_name = (message.document.file_name or '').lower()
+    if not file_name.endswith(('.txt', '.csv')):
+        await message.reply("❌ Поддерживаются только файлы .txt и .csv")
+        return
+    if message.document.file_size and message.document.file_size > BULK_IMPORT_MAX_BYTES:
+        await message.reply("❌ Файл слишком большой.")
+        return
+
+    try:
+        buffer = await message.document.download(destination_file=BytesIO())
+        text = buffer.getvalue().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        await message.reply("❌ Файл должен быть в кодировке UTF-8.")
+        return
+    except Exception as e:
+        logging.error(f"Error downloading import file: {e}")
+        await message.reply("❌ Не удалось загрузить файл.")
+        return
+
+    await process_bulk_import(message, text)
\ No newline at end of file
@@ -2,14 +2,22 @@
 Модуль с обработчиками админ-панели
 """
 
+import os
 import logging
+from datetime import datetime, timedelta
 from aiogram import types
 from aiogram.dispatcher import FSMContext
-from src.config.config import ADMIN_ID, VALID_CONDITIONS
-from src.database.database import get_all_ads, get_ad_by_id, update_ad_field, delete_ad
+from src.config.config import ADMIN_ID, VALID_CONDITIONS, EDIT_PAGE_SIZE, NOTES_MAX_LENGTH
+from src.database.database import get_ads_page, get_ad_by_id, get_stats, delete_ad as db_delete_ad
+from src.handlers.router import router
 from src.handlers.states import EditAdForm
-from src.keyboards.keyboards import get_admin_keyboard
+from src.keyboards.keyboards import get_admin_keyboard, get_back_keyboard, get_edit_page_keyboard, get_ad_editor_keyboard
+from src.utils.export import ENCODERS, export_ads
+from src.utils.jobs import cancel_jobs, edit_ad_field
+from src.utils.metrics import render_summary
+from src.utils.views_client import parse_post_link, format_post_link
 
+@router.callback('admin')
 async def handle_admin_menu(callback_query: types.CallbackQuery):
     """Handle admin menu access."""
     if callback_query.from_user.id != ADMIN_ID:
@@ -21,6 +29,108 @@ async def handle_admin_menu(callback_query: types.CallbackQuery):
         reply_markup=get_admin_keyboard()
     )
 
+@router.callback('stats')
+async def show_stats(callback_query: types.CallbackQuery):
+    """Handle the statistics screen."""
+    if callback_query.from_user.id != ADMIN_ID:
+        await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    try:
+        by_type, by_month = await get_stats()
+        if not by_type:
+            await callback_query.answer("База данных пуста.", show_alert=True)
+            return
+
+        lines = ["📈 Статистика\n"]
+        for row in by_type:
+            lines.append(
+                f"<b>{row['ad_type']}</b>: {row['ads_count']} шт.\n"
+                f"  Сумма CPM: {row['cpm_total']:.2f}\n"
+                f"  Прибыль: {row['profit_total']:.2f}\n"
+                f"  Оплачено: {row['paid_count']} ({row['paid_profit']:.2f})\n"
+                f"  Не оплачено: {row['unpaid_count']} ({row['unpaid_profit']:.2f})"
+            )
+        lines.append("\n<b>По месяцам:</b>")
+        for row in by_month:
+            lines.append(
+                f"{row['month']}: {row['ads_count']} шт., прибыль {row['profit_total']:.2f}, "
+                f"оплачено {row['paid_count']}/{row['ads_count']}"
+            )
+
+        await callback_query.message.edit_text(
+            '\n'.join(lines), parse_mode='HTML', reply_markup=get_back_keyboard('admin')
+        )
+
+    except Exception as e:
+        logging.error(f"Error in show_stats: {e}")
+        await callback_query.answer("❌ Произошла ошибка при загрузке статистики.", show_alert=True)
+
+def parse_export_args(args):
+    """Parse /export arguments: format, ДД.ММ.ГГГГ-ДД.ММ.ГГГГ range and payment status."""
+    options = {'fmt': 'csv', 'start': None, 'end': None, 'payment_status': None}
+    for token in args.lower().split():
+        if token in ENCODERS:
+            options['fmt'] = token
+        elif token in ('оплачено', 'paid'):
+            options['payment_status'] = 'Оплачено'
+        elif token in ('не_оплачено', 'неоплачено', 'unpaid'):
+            options['payment_status'] = 'Не оплачено'
+        elif '-' in token:
+            first, last = token.split('-', 1)
+            options['start'] = datetime.strptime(first, "%d.%m.%Y")
+            # Конечная дата входит в выгрузку целиком
+            options['end'] = datetime.strptime(last, "%d.%m.%Y") + timedelta(days=1)
+        else:
+            raise ValueError(token)
+    return options
+
+async def export_command(message: types.Message):
+    """Handle /export: send the ads table as a gzip-compressed CSV or NDJSON document."""
+    if message.from_user.id != ADMIN_ID:
+        await message.answer("У вас нет доступа к этой функции.")
+        return
+
+    try:
+        options = parse_export_args(message.get_args() or '')
+    except ValueError:
+        await message.reply(
+            "❌ Неверные параметры. Формат:\n"
+            "/export [csv|json] [ДД.ММ.ГГГГ-ДД.ММ.ГГГГ] [оплачено|не_оплачено]"
+        )
+        return
+
+    path = None
+    try:
+        path, exported = await export_ads(**options)
+        if not exported:
+            await message.reply("Нет записей для выгрузки.")
+            return
+        file_name = f"ads_{datetime.now():%Y%m%d_%H%M}.{'ndjson' if options['fmt'] == 'json' else 'csv'}.gz"
+        await message.answer_document(
+            types.InputFile(path, filename=file_name),
+            caption=f"📤 Выгружено записей: {exported}"
+        )
+    except Exception as e:
+        logging.error(f"Error in export_command: {e}")
+        await message.reply("❌ Произошла ошибка при выгрузке.")
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+async def metrics_command(message: types.Message):
+    """Handle /metrics: latency, errors and queue summary for the admin."""
+    if message.from_user.id != ADMIN_ID:
+        await message.answer("У вас нет доступа к этой функции.")
+        return
+
+    try:
+        await message.answer(await render_summary())
+    except Exception as e:
+        logging.error(f"Error in metrics_command: {e}")
+        await message.reply("❌ Произошла ошибка при сборе метрик.")
+
+@router.callback('edit_ads')
 async def edit_ads(callback_query: types.CallbackQuery):
     """Handle advertisement editing."""
     if callback_query.from_user.id != ADMIN_ID:
@@ -28,101 +138,246 @@ async def edit_ads(callback_query: types.CallbackQuery):
         return
 
     try:
-        ads = await get_all_ads()
+        ads, has_next = await get_ads_page(limit=EDIT_PAGE_SIZE, columns='id, ad_type, username')
         if not ads:
             await callback_query.message.edit_text("База данных пуста.")
             return
 
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
-        for ad in ads:
-            keyboard.add(types.InlineKeyboardButton(
-                f"ID: {ad['id']} | {ad['ad_type']} | {ad['username']}",
-                callback_data=f"edit_{ad['id']}"
-            ))
-        keyboard.add(types.InlineKeyboardButton("⬅️ Назад", callback_data="admin"))
-
         await callback_query.message.edit_text(
             "Выберите запись для редактирования:",
-            reply_markup=keyboard
+            reply_markup=get_edit_page_keyboard(ads, False, has_next)
         )
 
     except Exception as e:
         logging.error(f"Error in edit_ads: {e}")
         await callback_query.message.edit_text("❌ Произошла ошибка при загрузке записей.")
 
-async def edit_ad(callback_query: types.CallbackQuery):
+@router.callback('editpage_', direction=str, cursor_id=int)
+async def edit_ads_page(callback_query: types.CallbackQuery, direction: str, cursor_id: int):
+    """Handle paging through the advertisement picker."""
+    if callback_query.from_user.id != ADMIN_ID:
+        await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    try:
+        ads, has_more = await get_ads_page(
+            cursor_id, direction, limit=EDIT_PAGE_SIZE, columns='id, ad_type, username'
+        )
+        if not ads:
+            await callback_query.answer("Больше записей нет.")
+            return
+
+        if direction == 'next':
+            keyboard = get_edit_page_keyboard(ads, True, has_more)
+        else:
+            keyboard = get_edit_page_keyboard(ads, has_more, True)
+        await callback_query.message.edit_text("Выберите запись для редактирования:", reply_markup=keyboard)
+        await callback_query.answer()
+
+    except Exception as e:
+        logging.error(f"Error in edit_ads_page: {e}")
+        await callback_query.answer("❌ Произошла ошибка при загрузке записей.", show_alert=True)
+
+@router.callback('jump_to_id')
+async def jump_to_id(callback_query: types.CallbackQuery):
+    """Ask for an advertisement ID to open directly."""
+    if callback_query.from_user.id != ADMIN_ID:
+        await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    await callback_query.message.edit_text("Введите ID записи:", reply_markup=get_back_keyboard('edit_ads'))
+    await EditAdForm.waiting_for_ad_id.set()
+
+@router.callback(
+    'edit_ads', state=[EditAdForm.waiting_for_ad_id, EditAdForm.waiting_for_notes, EditAdForm.waiting_for_post_link]
+)
+async def cancel_edit_input(callback_query: types.CallbackQuery, state: FSMContext):
+    """Return to the picker without entering an ID, notes or a post link."""
+    await state.finish()
+    await edit_ads(callback_query)
+
+async def process_jump_to_id(message: types.Message, state: FSMContext):
+    """Open the editor for the advertisement ID entered by the admin."""
+    if message.from_user.id != ADMIN_ID:
+        await state.finish()
+        return
+
+    if not message.text.strip().isdigit():
+        await message.reply("❌ ID должен быть числом. Попробуйте ещё раз.")
+        return
+
+    try:
+        ad = await get_ad_by_id(int(message.text.strip()))
+        if not ad:
+            await message.reply("Запись не найдена. Введите другой ID.")
+            return
+
+        await state.finish()
+        text, keyboard = render_ad_editor(ad)
+        await message.answer(text, reply_markup=keyboard)
+
+    except Exception as e:
+        logging.error(f"Error in process_jump_to_id: {e}")
+        await state.finish()
+        await message.answer("❌ Произошла ошибка при загрузке записи.")
+
+def render_ad_editor(ad):
+    """Build the text and keyboard of the advertisement editor."""
+    ad_id = ad['id']
+    keyboard = get_ad_editor_keyboard(ad_id)
+
+    response = (
+        f"📝 Редактирование записи ID: {ad_id}\n\n"
+        f"Тип: {ad['ad_type']}\n"
+        f"Дата: {ad['date']}\n"
+        f"Пользователь: {ad['username']}\n"
+        f"Время: {ad['time']}\n"
+        f"Условия: {ad['conditions']}\n"
+    )
+    if ad['ad_type'] == 'CPM':
+        response += f"CPM: {ad['cpm']}\n"
+    else:
+        response += f"Прибыль: {ad['profit']}\n"
+    response += f"Статус: {ad['payment_status']}"
+    if ad['post_link']:
+        response += f"\nПост: {ad['post_link']}"
+    if ad['notes']:
+        response += f"\nЗаметки: {ad['notes']}"
+    return response, keyboard
+
+@router.callback('edit_', ad_id=int)
+async def edit_ad(callback_query: types.CallbackQuery, ad_id: int):
     """Handle individual advertisement editing."""
     if callback_query.from_user.id != ADMIN_ID:
         await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
         return
 
-    ad_id = int(callback_query.data.split('_')[1])
     try:
         ad = await get_ad_by_id(ad_id)
         if not ad:
             await callback_query.answer("Запись не найдена.", show_alert=True)
             return
 
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
-        keyboard.add(
-            types.InlineKeyboardButton("Изменить тип", callback_data=f"edit_type_{ad_id}"),
-            types.InlineKeyboardButton("Изменить дату", callback_data=f"edit_date_{ad_id}"),
-            types.InlineKeyboardButton("Изменить юзер", callback_data=f"edit_username_{ad_id}"),
-            types.InlineKeyboardButton("Изменить время", callback_data=f"edit_time_{ad_id}"),
-            types.InlineKeyboardButton("Изменить условия", callback_data=f"edit_conditions_{ad_id}"),
-            types.InlineKeyboardButton("Изменить CPM/прибыль", callback_data=f"edit_value_{ad_id}"),
-            types.InlineKeyboardButton("Изменить статус", callback_data=f"status_{ad_id}"),
-            types.InlineKeyboardButton("Удалить", callback_data=f"delete_{ad_id}"),
-            types.InlineKeyboardButton("⬅️ Назад", callback_data="edit_ads")
-        )
-
-        response = (
-            f"📝 Редактирование записи ID: {ad_id}\n\n"
-            f"Тип: {ad['ad_type']}\n"
-            f"Дата: {ad['date']}\n"
-            f"Пользователь: {ad['username']}\n"
-            f"Время: {ad['time']}\n"
-            f"Условия: {ad['conditions']}\n"
-        )
-        if ad['ad_type'] == 'CPM':
-            response += f"CPM: {ad['cpm']}\n"
-        else:
-            response += f"Прибыль: {ad['profit']}\n"
-        response += f"Статус: {ad['payment_status']}"
-
+        response, keyboard = render_ad_editor(ad)
         await callback_query.message.edit_text(response, reply_markup=keyboard)
 
     except Exception as e:
         logging.error(f"Error in edit_ad: {e}")
         await callback_query.message.edit_text("❌ Произошла ошибка при загрузке записи.")
 
-async def change_status(callback_query: types.CallbackQuery):
+@router.callback('edit_notes_', ad_id=int)
+async def edit_notes(callback_query: types.CallbackQuery, state: FSMContext, ad_id: int):
+    """Ask for new notes of an advertisement."""
+    if callback_query.from_user.id != ADMIN_ID:
+        await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    await callback_query.message.edit_text(
+        "Введите заметки к записи (или «-», чтобы удалить их):", reply_markup=get_back_keyboard('edit_ads')
+    )
+    await EditAdForm.waiting_for_notes.set()
+    await state.update_data(ad_id=ad_id)
+
+async def process_notes(message: types.Message, state: FSMContext):
+    """Save the notes entered by the admin and reopen the editor."""
+    if message.from_user.id != ADMIN_ID:
+        await state.finish()
+        return
+
+    text = (message.text or '').strip()
+    if not text:
+        await message.reply("❌ Отправьте заметки текстом или «-», чтобы удалить их.")
+        return
+    if len(text) > NOTES_MAX_LENGTH:
+        await message.reply(f"❌ Заметки длиннее {NOTES_MAX_LENGTH} символов. Сократите текст.")
+        return
+
+    try:
+        ad_id = (await state.get_data())['ad_id']
+        await edit_ad_field(ad_id, 'notes', '' if text == '-' else text)
+        await state.finish()
+        ad = await get_ad_by_id(ad_id)
+        if not ad:
+            await message.answer("Запись не найдена.")
+            return
+        response, keyboard = render_ad_editor(ad)
+        await message.answer(response, reply_markup=keyboard)
+
+    except Exception as e:
+        logging.error(f"Error in process_notes: {e}")
+        await state.finish()
+        await message.answer("❌ Произошла ошибка при сохранении заметок.")
+
+@router.callback('edit_link_', ad_id=int)
+async def edit_post_link(callback_query: types.CallbackQuery, state: FSMContext, ad_id: int):
+    """Ask for the link to the advertisement post."""
+    if callback_query.from_user.id != ADMIN_ID:
+        await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
+        return
+
+    await callback_query.message.edit_text(
+        "Отправьте ссылку на рекламный пост (https://t.me/канал/123) или «-», чтобы удалить её:",
+        reply_markup=get_back_keyboard('edit_ads')
+    )
+    await EditAdForm.waiting_for_post_link.set()
+    await state.update_data(ad_id=ad_id)
+
+async def process_post_link(message: types.Message, state: FSMContext):
+    """Save the post link entered by the admin and reopen the editor."""
+    if message.from_user.id != ADMIN_ID:
+        await state.finish()
+        return
+
+    text = (message.text or '').strip()
+    link = parse_post_link(text)
+    if text != '-' and link is None:
+        await message.reply("❌ Неверная ссылка. Пример: https://t.me/channel/123")
+        return
+
+    try:
+        ad_id = (await state.get_data())['ad_id']
+        await edit_ad_field(ad_id, 'post_link', format_post_link(*link) if link else '')
+        await state.finish()
+        ad = await get_ad_by_id(ad_id)
+        if not ad:
+            await message.answer("Запись не найдена.")
+            return
+        response, keyboard = render_ad_editor(ad)
+        await message.answer(response, reply_markup=keyboard)
+
+    except Exception as e:
+        logging.error(f"Error in process_post_link: {e}")
+        await state.finish()
+        await message.answer("❌ Произошла ошибка при сохранении ссылки.")
+
+@router.callback('status_', ad_id=int)
+async def change_status(callback_query: types.CallbackQuery, ad_id: int):
     """Handle advertisement status change."""
     if callback_query.from_user.id != ADMIN_ID:
         await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
         return
 
-    ad_id = int(callback_query.data.split('_')[1])
     try:
         ad = await get_ad_by_id(ad_id)
         new_status = "Не оплачено" if ad['payment_status'] == "Оплачено" else "Оплачено"
-        await update_ad_field(ad_id, 'payment_status', new_status)
+        await edit_ad_field(ad_id, 'payment_status', new_status)
         await callback_query.answer("Статус успешно изменен!")
-        await edit_ad(callback_query)
+        await edit_ad(callback_query, ad_id)
 
     except Exception as e:
         logging.error(f"Error in change_status: {e}")
         await callback_query.answer("❌ Произошла ошибка при изменении статуса.", show_alert=True)
 
-async def delete_ad(callback_query: types.CallbackQuery):
+@router.callback('delete_', ad_id=int)
+async def delete_ad(callback_query: types.CallbackQuery, ad_id: int):
     """Handle advertisement deletion."""
     if callback_query.from_user.id != ADMIN_ID:
         await callback_query.answer("У вас нет доступа к этой функции.", show_alert=True)
         return
 
-    ad_id = int(callback_query.data.split('_')[1])
     try:
-        await delete_ad(ad_id)
+        await db_delete_ad(ad_id)
+        await cancel_jobs(ad_id)
         await callback_query.answer("Запись успешно удалена!")
         await edit_ads(callback_query)
 
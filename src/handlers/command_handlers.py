@@ -3,11 +3,16 @@
 """
 
 import logging
+from html import escape
 from aiogram import types
 from aiogram.dispatcher import FSMContext
-from src.keyboards.keyboards import get_main_menu, get_settings_menu, get_ad_type_menu
-from src.config.config import ADMIN_ID, BOT_USERNAME
-from src.database.database import get_all_ads
+from src.keyboards.keyboards import get_main_menu, get_settings_menu, get_ad_type_menu, get_db_page_keyboard
+from src.config.config import ADMIN_ID, BOT_USERNAME, SEARCH_CACHE_TTL, VIEW_PAGE_SIZE, NOTES_PREVIEW_LENGTH
+from src.database.database import get_ads_page, search_ads
+from src.handlers.router import router
+from src.utils.ad_parser import mention_pattern, strip_mention
+
+MENTION_PATTERN = mention_pattern(BOT_USERNAME)
 
 async def send_welcome(message: types.Message):
     """Обработка команды /start."""
@@ -18,6 +23,7 @@ async def send_welcome(message: types.Message):
     )
     await message.reply(welcome_text, reply_markup=get_main_menu())
 
+@router.text("Добавить рекламу")
 async def add_ad(message: types.Message):
     """Handle 'Add advertisement' button."""
     await message.answer(
@@ -25,36 +31,47 @@ async def add_ad(message: types.Message):
         reply_markup=get_ad_type_menu()
     )
 
-async def view_db_command(message: types.Message):
-    """Обработка команды просмотра базы данных."""
-    try:
-        ads = await get_all_ads()
-        
-        if not ads:
-            await message.answer("База данных пуста.", reply_markup=get_main_menu())
-            return
+def format_ad(ad, notes_length=NOTES_PREVIEW_LENGTH):
+    """Форматирование записи рекламы для вывода в HTML.
 
-        message_text = ["📊 Все записи:"]
-        for ad in ads:
-            message_text.append(f"""
+    Заметки длиннее notes_length символов обрезаются; notes_length=None — заметки целиком.
+    """
+    notes = ad['notes']
+    if notes_length is not None and len(notes) > notes_length:
+        notes = notes[:notes_length].rstrip() + '…'
+    notes = f"Заметки: {escape(notes)}\n" if notes else ''
+    return f"""
 <b>#{ad['id']}</b>
 Тип: {ad['ad_type']}
 Дата: {ad['date']}
-Время: {ad['time']}
-Юзер: {ad['username']}
+Время: {escape(ad['time'])}
+Юзер: {escape(ad['username'])}
 Условия: {ad['conditions']}
 CPM: {ad['cpm'] or '—'}
 Охват: {ad['reach'] or '—'}
 Прибыль: {ad['profit'] or '—'}
 Статус: {ad['payment_status']}
-{'='*20}
-""")
+{notes}{'='*20}
+"""
+
+def render_db_page(ads, has_prev, has_next):
+    """Подготовка текста и клавиатуры одной страницы БД."""
+    text = '\n'.join(["📊 Записи:"] + [format_ad(ad) for ad in ads])
+    keyboard = get_db_page_keyboard(ads[0]['id'], ads[-1]['id'], has_prev, has_next)
+    return text, keyboard
+
+@router.text("Просмотреть БД")
+async def view_db_command(message: types.Message):
+    """Обработка команды просмотра базы данных."""
+    try:
+        ads, has_next = await get_ads_page()
         
-        await message.answer(
-            '\n'.join(message_text),
-            parse_mode='HTML',
-            reply_markup=get_main_menu()
-        )
+        if not ads:
+            await message.answer("База данных пуста.", reply_markup=get_main_menu())
+            return
+
+        text, keyboard = render_db_page(ads, False, has_next)
+        await message.answer(text, parse_mode='HTML', reply_markup=keyboard)
 
     except Exception as e:
         logging.error(f"Ошибка при просмотре базы данных: {e}")
@@ -63,6 +80,73 @@ CPM: {ad['cpm'] or '—'}
             reply_markup=get_main_menu()
         )
 
+@router.callback('dbpage_', direction=str, cursor_id=int)
+async def view_db_page(callback_query: types.CallbackQuery, direction: str, cursor_id: int):
+    """Листание страниц базы данных."""
+    try:
+        ads, has_more = await get_ads_page(cursor_id, direction)
+        if not ads:
+            await callback_query.answer("Больше записей нет.")
+            return
+
+        if direction == 'next':
+            text, keyboard = render_db_page(ads, True, has_more)
+        else:
+            text, keyboard = render_db_page(ads, has_more, True)
+        await callback_query.message.edit_text(text, parse_mode='HTML', reply_markup=keyboard)
+        await callback_query.answer()
+
+    except Exception as e:
+        logging.error(f"Ошибка при листании базы данных: {e}")
+        await callback_query.answer("❌ Произошла ошибка при загрузке страницы.", show_alert=True)
+
+async def find_command(message: types.Message):
+    """Обработка команды /find: поиск по юзеру, условиям и заметкам."""
+    if message.from_user.id != ADMIN_ID:
+        await message.answer("У вас нет доступа к этой функции.")
+        return
+
+    query = (message.get_args() or '').strip()
+    if not query:
+        await message.reply("Использование: /find @юзер, условия или слово из заметок")
+        return
+
+    try:
+        ads = await search_ads(query, limit=VIEW_PAGE_SIZE)
+        if not ads:
+            await message.reply("Ничего не найдено.")
+            return
+        text = '\n'.join([f"🔎 Найдено: {len(ads)}"] + [format_ad(ad) for ad in ads])
+        await message.answer(text, parse_mode='HTML')
+
+    except Exception as e:
+        logging.error(f"Ошибка поиска: {e}")
+        await message.reply("❌ Произошла ошибка при поиске.")
+
+async def inline_search(inline_query: types.InlineQuery):
+    """Inline-режим: результаты поиска по мере набора запроса."""
+    if inline_query.from_user.id != ADMIN_ID:
+        # Остальным пользователям — пустой список, а не «запрос завис»
+        await inline_query.answer([], cache_time=SEARCH_CACHE_TTL, is_personal=True)
+        return
+
+    try:
+        ads = await search_ads(inline_query.query)
+        results = [
+            types.InlineQueryResultArticle(
+                id=str(ad['id']),
+                title=f"#{ad['id']} {ad['username']} — {ad['date']} {ad['time']}",
+                description=f"{ad['ad_type']} | {ad['conditions']} | {ad['payment_status']}",
+                input_message_content=types.InputTextMessageContent(format_ad(ad, notes_length=None), parse_mode='HTML'),
+            )
+            for ad in ads
+        ]
+        await inline_query.answer(results, cache_time=SEARCH_CACHE_TTL, is_personal=True)
+
+    except Exception as e:
+        logging.error(f"Ошибка inline-поиска: {e}")
+
+@router.text("Помощь")
 async def show_help(message: types.Message):
     """Show help information."""
     help_text = """
@@ -81,7 +165,8 @@ async def show_help(message: types.Message):
 
     3. Просмотр базы данных:
        - Нажмите "Просмотреть БД"
-       - Используйте фильтры для поиска
+       - Поиск по юзеру, условиям и заметкам (для администратора):
+         /find запрос или @бот запрос в любом чате
 
     4. Настройки:
        - Смена языка
@@ -89,14 +174,17 @@ async def show_help(message: types.Message):
     """
     await message.answer(help_text, reply_markup=get_main_menu())
 
+@router.text("Настройки")
 async def open_settings(message: types.Message):
     """Handle 'Settings' button."""
     await message.answer("Выберите настройку:", reply_markup=get_settings_menu())
 
+@router.text("⬅️ Назад")
 async def back_to_main(message: types.Message):
     """Handle 'Back' button."""
     await message.answer("Главное меню:", reply_markup=get_main_menu())
 
+@router.text("🔧 Админ-панель")
 async def admin_panel(message: types.Message):
     """Обработка нажатия кнопки админ-панели."""
     if message.from_user.id != ADMIN_ID:
@@ -111,10 +199,9 @@ async def admin_panel(message: types.Message):
 
 async def handle_mention(message: types.Message):
     """Обработка упоминания бота."""
-    clean_text = message.text.replace(f"@{BOT_USERNAME}", "").strip()
+    clean_text = strip_mention(message.text, MENTION_PATTERN)
     if not clean_text:
         await message.reply("❌ Сообщение не содержит данных")
         return
-    message.text = clean_text
     from src.handlers.ad_handlers import process_ad_data
-    await process_ad_data(message) 
\ No newline at end of file
+    await process_ad_data(message, text=clean_text) 
\ No newline at end of file
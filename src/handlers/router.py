@@ -0,0 +1,123 @@
+"""
+Маршрутизатор: точные тексты кнопок через словарь, callback_data через префиксное дерево
+"""
+
+import inspect
+from aiogram import Dispatcher, types
+from aiogram.dispatcher.filters.state import State, StatesGroup
+from src.utils.callback_codec import CALLBACK_VERSION, PrefixTrie, split_version
+
+# Маршрут для любого состояния
+ANY_STATE = '*'
+
+class Route:
+    """Обработчик с допустимыми состояниями и списком принимаемых аргументов."""
+
+    __slots__ = ('handler', 'states', 'params')
+
+    def __init__(self, handler, state):
+        self.handler = handler
+        self.states = _state_names(state)
+        spec = inspect.getfullargspec(handler)
+        self.params = None if spec.varkw else set(spec.args + spec.kwonlyargs)
+
+    async def call(self, obj, kwargs):
+        if self.params is not None:
+            kwargs = {key: value for key, value in kwargs.items() if key in self.params}
+        return await self.handler(obj, **kwargs)
+
+def _state_names(state):
+    """Нормализация state так же, как в StateFilter aiogram: None — без состояния, '*' — любое."""
+    if not isinstance(state, (list, set, tuple, frozenset)):
+        state = [state]
+    names = set()
+    for item in state:
+        if isinstance(item, State):
+            names.add(item.state)
+        elif inspect.isclass(item) and issubclass(item, StatesGroup):
+            names.update(item.all_states_names)
+        else:
+            names.add(item)
+    return None if ANY_STATE in names else frozenset(names)
+
+class Router:
+    """Диспетчеризация нажатий за O(1) от числа обработчиков.
+
+    Тексты reply-клавиатуры ищутся в словаре, callback_data — в PrefixTrie;
+    поля из callback_data (например ad_id) передаются обработчику именованными
+    аргументами. Кнопки с неизвестной версией кодека получают ответ
+    «кнопка устарела» вместо молчаливого игнорирования.
+
+    router.setup(dp) регистрирует в aiogram по одному обработчику сообщений
+    и callback-запросов; всё, что маршрутизатор не узнал, идёт дальше
+    по обычным фильтрам aiogram.
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.callbacks = PrefixTrie()
+
+    def text(self, *texts, state=None):
+        """Регистрация обработчика точного текста сообщения."""
+        def decorator(handler):
+            for text in texts:
+                self.texts.setdefault(text, []).append(Route(handler, state))
+            return handler
+        return decorator
+
+    def callback(self, prefix, state=None, **fields):
+        """Регистрация обработчика callback_data с префиксом prefix и полями {имя: тип}."""
+        def decorator(handler):
+            self.callbacks.insert(prefix, fields, Route(handler, state))
+            return handler
+        return decorator
+
+    @staticmethod
+    async def _select(candidates, state):
+        """Первый маршрут, чьё состояние совпадает с текущим."""
+        loaded, raw_state = False, None
+        for route, fields in candidates:
+            if route.states is not None:
+                if not loaded:
+                    loaded, raw_state = True, await state.get_state()
+                if raw_state not in route.states:
+                    continue
+            return {'route': route, 'fields': fields}
+        return False
+
+    async def match_message(self, message: types.Message):
+        routes = self.texts.get(message.text)
+        if not routes:
+            return False
+        state = Dispatcher.get_current().current_state()
+        return await self._select([(route, {}) for route in routes], state)
+
+    async def match_callback(self, callback_query: types.CallbackQuery):
+        if not callback_query.data:
+            return False
+        version, payload = split_version(callback_query.data)
+        if version is not None and version != CALLBACK_VERSION:
+            return {'route': None, 'fields': {}}
+        candidates = self.callbacks.match(payload)
+        if not candidates:
+            return False
+        state = Dispatcher.get_current().current_state()
+        return await self._select(candidates, state)
+
+    @staticmethod
+    async def _dispatch_message(message, route, fields, state):
+        await route.call(message, {'state': state, **fields})
+
+    @staticmethod
+    async def _dispatch_callback(callback_query, route, fields, state):
+        if route is None:
+            await callback_query.answer("Кнопка устарела, откройте меню заново.", show_alert=True)
+            return
+        await route.call(callback_query, {'state': state, **fields})
+
+    def setup(self, dp):
+        """Подключение к диспетчеру; вызывать до регистрации остальных обработчиков."""
+        dp.register_message_handler(self._dispatch_message, self.match_message, state=ANY_STATE)
+        dp.register_callback_query_handler(self._dispatch_callback, self.match_callback, state=ANY_STATE)
+
+router = Router()
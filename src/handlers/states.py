@@ -17,4 +17,7 @@ class EditAdForm(StatesGroup):
     waiting_for_conditions = State()
     waiting_for_cpm = State()
     waiting_for_profit = State()
-    waiting_for_type = State() 
\ No newline at end of file
+    waiting_for_type = State()
+    waiting_for_ad_id = State()
+    waiting_for_notes = State()
+    waiting_for_post_link = State() 
\ No newline at end of file
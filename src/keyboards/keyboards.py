@@ -1,11 +1,51 @@
 """
 Модуль с клавиатурами для бота
+
+Статичные клавиатуры собираются и сериализуются в JSON один раз на язык:
+aiogram передаёт строку reply_markup в Telegram как есть, без повторной
+сериализации. Динамические клавиатуры собираются из готовых шаблонов.
 """
 
+import json
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from src.config.config import DEFAULT_LANGUAGE
+from src.utils.callback_codec import pack
 
-def get_main_menu():
-    """Создание главного меню."""
+# Готовые JSON-строки статичных клавиатур по (имени, языку)
+_markups = {}
+
+def serialize(obj):
+    """JSON клавиатуры, кнопки или списка рядов в том виде, в каком его отправляет aiogram."""
+    return json.dumps(obj.to_python() if hasattr(obj, 'to_python') else obj)
+
+def _cached(name, lang, build):
+    markup = _markups.get((name, lang))
+    if markup is None:
+        markup = _markups[name, lang] = serialize(build(lang))
+    return markup
+
+class KeyboardTemplate:
+    """Сериализованная клавиатура с подставляемыми полями.
+
+    build получает вместо значений маркеры '@@поле@@'; получившийся JSON
+    один раз делится по маркерам, а render только склеивает строки,
+    экранируя подставленные значения для JSON.
+    """
+
+    def __init__(self, build, *fields):
+        parts = serialize(build(**{field: f"@@{field}@@" for field in fields})).split('@@')
+        # Чётные элементы — неизменный JSON, нечётные — имена полей
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def render(self, **values):
+        out = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            out.append(json.dumps(str(values[field]))[1:-1])
+            out.append(literal)
+        return ''.join(out)
+
+def _main_menu(lang):
     return ReplyKeyboardMarkup(
         keyboard=[
             [
@@ -25,8 +65,7 @@ def get_main_menu():
         input_field_placeholder="Главное меню"
     )
 
-def get_settings_menu():
-    """Создание меню настроек."""
+def _settings_menu(lang):
     return ReplyKeyboardMarkup(
         keyboard=[
             [
@@ -40,33 +79,137 @@ def get_settings_menu():
         resize_keyboard=True
     )
 
-def get_ad_type_menu():
-    """Создание меню выбора типа рекламы."""
+def _ad_type_menu(lang):
     menu = InlineKeyboardMarkup(row_width=2)
     menu.add(
-        InlineKeyboardButton("CPM", callback_data="type_cpm"),
-        InlineKeyboardButton("ФИКС", callback_data="type_fixed"),
-        InlineKeyboardButton("⬅️ Назад", callback_data="open_menu")
+        InlineKeyboardButton("CPM", callback_data=pack('type_', 'cpm')),
+        InlineKeyboardButton("ФИКС", callback_data=pack('type_', 'fixed')),
+        InlineKeyboardButton("⬅️ Назад", callback_data=pack('open_menu'))
     )
     return menu
 
-def get_language_menu():
-    """Создание меню выбора языка."""
+def _language_menu(lang):
     menu = InlineKeyboardMarkup(row_width=2)
     menu.add(
-        InlineKeyboardButton("Русский", callback_data="lang_ru"),
-        InlineKeyboardButton("English", callback_data="lang_en"),
-        InlineKeyboardButton("⬅️ Назад", callback_data="open_menu")
+        InlineKeyboardButton("Русский", callback_data=pack('lang_', 'ru')),
+        InlineKeyboardButton("English", callback_data=pack('lang_', 'en')),
+        InlineKeyboardButton("⬅️ Назад", callback_data=pack('open_menu'))
     )
     return menu
 
-def get_admin_keyboard():
+def _admin_keyboard(lang):
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    keyboard.add(
+        InlineKeyboardButton("Редактировать записи", callback_data=pack('edit_ads')),
+        InlineKeyboardButton("Удалить записи", callback_data=pack('delete_ads')),
+        InlineKeyboardButton("Статистика", callback_data=pack('stats')),
+        InlineKeyboardButton("⬅️ Назад", callback_data=pack('open_menu'))
+    )
+    return keyboard
+
+def get_main_menu(lang=DEFAULT_LANGUAGE):
+    """Создание главного меню."""
+    return _cached('main_menu', lang, _main_menu)
+
+def get_settings_menu(lang=DEFAULT_LANGUAGE):
+    """Создание меню настроек."""
+    return _cached('settings_menu', lang, _settings_menu)
+
+def get_ad_type_menu(lang=DEFAULT_LANGUAGE):
+    """Создание меню выбора типа рекламы."""
+    return _cached('ad_type_menu', lang, _ad_type_menu)
+
+def get_language_menu(lang=DEFAULT_LANGUAGE):
+    """Создание меню выбора языка."""
+    return _cached('language_menu', lang, _language_menu)
+
+def get_admin_keyboard(lang=DEFAULT_LANGUAGE):
     """Create admin control keyboard."""
+    return _cached('admin_keyboard', lang, _admin_keyboard)
+
+def get_back_keyboard(target, lang=DEFAULT_LANGUAGE):
+    """Клавиатура из одной кнопки «Назад» с callback_data target."""
+    def build(lang):
+        keyboard = InlineKeyboardMarkup(row_width=1)
+        keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data=pack(target)))
+        return keyboard
+    return _cached(f'back_{target}', lang, build)
+
+def _page_navigation(prefix, has_prev, has_next):
+    """Ряд кнопок листания, если листать есть куда."""
+    def build(first_id, last_id):
+        nav = []
+        if has_prev:
+            nav.append(InlineKeyboardButton("◀️ Новее", callback_data=pack(prefix, 'prev', first_id)))
+        if has_next:
+            nav.append(InlineKeyboardButton("Старее ▶️", callback_data=pack(prefix, 'next', last_id)))
+        return nav
+    return build
+
+def _db_page_template(has_prev, has_next):
+    navigation = _page_navigation('dbpage_', has_prev, has_next)
+
+    def build(first_id, last_id):
+        keyboard = InlineKeyboardMarkup(row_width=2)
+        nav = navigation(first_id, last_id)
+        if nav:
+            keyboard.row(*nav)
+        keyboard.add(InlineKeyboardButton("⬅️ Назад", callback_data=pack('open_menu')))
+        return keyboard
+    return KeyboardTemplate(build, 'first_id', 'last_id')
+
+def _edit_page_footer_template(has_prev, has_next):
+    navigation = _page_navigation('editpage_', has_prev, has_next)
+
+    def build(first_id, last_id):
+        nav = navigation(first_id, last_id)
+        rows = [[button.to_python() for button in nav]] if nav else []
+        rows.append([InlineKeyboardButton("🔎 Перейти к ID", callback_data=pack('jump_to_id')).to_python()])
+        rows.append([InlineKeyboardButton("⬅️ Назад", callback_data=pack('admin')).to_python()])
+        return rows
+    return KeyboardTemplate(build, 'first_id', 'last_id')
+
+def _ad_editor_keyboard(ad_id):
     keyboard = InlineKeyboardMarkup(row_width=2)
     keyboard.add(
-        InlineKeyboardButton("Редактировать записи", callback_data="edit_ads"),
-        InlineKeyboardButton("Удалить записи", callback_data="delete_ads"),
-        InlineKeyboardButton("Статистика", callback_data="stats"),
-        InlineKeyboardButton("⬅️ Назад", callback_data="open_menu")
+        InlineKeyboardButton("Изменить тип", callback_data=pack('edit_type_', ad_id)),
+        InlineKeyboardButton("Изменить дату", callback_data=pack('edit_date_', ad_id)),
+        InlineKeyboardButton("Изменить юзер", callback_data=pack('edit_username_', ad_id)),
+        InlineKeyboardButton("Изменить время", callback_data=pack('edit_time_', ad_id)),
+        InlineKeyboardButton("Изменить условия", callback_data=pack('edit_conditions_', ad_id)),
+        InlineKeyboardButton("Изменить CPM/прибыль", callback_data=pack('edit_value_', ad_id)),
+        InlineKeyboardButton("Изменить заметки", callback_data=pack('edit_notes_', ad_id)),
+        InlineKeyboardButton("Ссылка на пост", callback_data=pack('edit_link_', ad_id)),
+        InlineKeyboardButton("Изменить статус", callback_data=pack('status_', ad_id)),
+        InlineKeyboardButton("Удалить", callback_data=pack('delete_', ad_id)),
+        InlineKeyboardButton("⬅️ Назад", callback_data=pack('edit_ads'))
     )
-    return keyboard 
\ No newline at end of file
+    return keyboard
+
+# Шаблоны страниц по (has_prev, has_next)
+_PAGE_FLAGS = [(has_prev, has_next) for has_prev in (False, True) for has_next in (False, True)]
+_DB_PAGE_TEMPLATES = {flags: _db_page_template(*flags) for flags in _PAGE_FLAGS}
+_EDIT_PAGE_FOOTERS = {flags: _edit_page_footer_template(*flags) for flags in _PAGE_FLAGS}
+_EDIT_PAGE_ROW = KeyboardTemplate(
+    lambda ad_id, label: [InlineKeyboardButton(label, callback_data=pack('edit_', ad_id)).to_python()],
+    'ad_id', 'label'
+)
+_AD_EDITOR_TEMPLATE = KeyboardTemplate(_ad_editor_keyboard, 'ad_id')
+
+def get_db_page_keyboard(first_id, last_id, has_prev, has_next):
+    """Создание клавиатуры листания страниц БД."""
+    return _DB_PAGE_TEMPLATES[has_prev, has_next].render(first_id=first_id, last_id=last_id)
+
+def get_edit_page_keyboard(ads, has_prev, has_next):
+    """Создание клавиатуры выбора записи для редактирования (одна страница)."""
+    rows = [
+        _EDIT_PAGE_ROW.render(ad_id=ad['id'], label=f"ID: {ad['id']} | {ad['ad_type']} | {ad['username']}")
+        for ad in ads
+    ]
+    # Шаблон подвала — список рядов '[[...], [...]]'; внешние скобки снимаются
+    rows.append(_EDIT_PAGE_FOOTERS[has_prev, has_next].render(first_id=ads[0]['id'], last_id=ads[-1]['id'])[1:-1])
+    return '{"inline_keyboard": [' + ', '.join(rows) + ']}'
+
+def get_ad_editor_keyboard(ad_id):
+    """Клавиатура действий над записью."""
+    return _AD_EDITOR_TEMPLATE.render(ad_id=ad_id)
@@ -0,0 +1,268 @@
+"""
+Точка входа бота: фабрика приложения и запуск в режиме polling, webhook или с процессами-обработчиками
+
+Запуск из корня репозитория:
+    python src/main.py [--profile-startup]
+
+Модули aiogram, обработчиков и базы импортируются внутри фабрики, а вебхук,
+супервизор и хранилища — только в том режиме, где они нужны.
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import argparse
+from time import perf_counter
+
+# Отсчёт времени запуска — до импорта тяжёлых модулей
+_STARTED = perf_counter()
+
+if not __package__:
+    # python src/main.py: корень репозитория в пути поиска модулей
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import config
+
+class StartupProfile:
+    """Время этапов запуска: каждый mark закрывает этап, начатый предыдущим."""
+
+    def __init__(self, enabled=config.STARTUP_PROFILE):
+        self.enabled = enabled
+        self.last = _STARTED
+        self.stages = []
+
+    def mark(self, stage):
+        now = perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        total = 0.0
+        lines = ["Startup profile:"]
+        for stage, seconds in self.stages:
+            total += seconds
+            lines.append(f"  {stage:<14}{seconds * 1000:9.1f} ms  (total {total * 1000:.1f} ms)")
+        logging.info('\n'.join(lines))
+
+def first_update_middleware(profile):
+    """Middleware, отмечающее в профиле приход первого обновления."""
+    from aiogram.dispatcher.middlewares import BaseMiddleware
+
+    class FirstUpdate(BaseMiddleware):
+        seen = False
+
+        # Очереди по чатам вызывают dp.process_update напрямую, минуя pre_process_update
+        async def on_pre_process_message(self, message, data):
+            if not self.seen:
+                self.seen = True
+                profile.mark('first update')
+                profile.report()
+
+        on_pre_process_callback_query = on_pre_process_message
+
+    return FirstUpdate()
+
+def create_bot():
+    """Bot с очередью отправки; очередь запускается в setup."""
+    from aiogram import Bot
+    from src.utils.send_queue import install_send_queue
+    bot = Bot(token=config.API_TOKEN)
+    return bot, install_send_queue(bot)
+
+def create_dispatcher(bot, storage):
+    """Dispatcher со всеми обработчиками src/handlers.
+
+    Роутер кнопок подключается первым; остальные обработчики — команды,
+    inline-поиск, упоминание бота и ввод в состояниях FSM.
+    """
+    from aiogram import Dispatcher, types
+    from aiogram.contrib.middlewares.logging import LoggingMiddleware
+    from src.handlers.router import router
+    from src.handlers.states import AdForm, EditAdForm
+    from src.handlers.command_handlers import send_welcome, handle_mention, find_command, inline_search
+    from src.handlers.ad_handlers import process_ad_data, process_import_document
+    from src.handlers.admin_handlers import export_command, metrics_command, process_jump_to_id, process_notes
+    from src.handlers.admin_handlers import process_post_link
+    from src.utils.metrics import setup_metrics
+
+    dp = Dispatcher(bot, storage=storage)
+    dp.middleware.setup(LoggingMiddleware())
+    setup_metrics(dp)
+    router.setup(dp)
+
+    dp.register_message_handler(send_welcome, commands=['start'])
+    dp.register_message_handler(export_command, commands=['export'])
+    dp.register_message_handler(metrics_command, commands=['metrics'])
+    dp.register_message_handler(find_command, commands=['find'])
+    dp.register_inline_handler(inline_search)
+    dp.register_message_handler(
+        handle_mention, lambda message: (message.text or '').startswith(f"@{config.BOT_USERNAME}")
+    )
+    dp.register_message_handler(
+        process_import_document, content_types=types.ContentType.DOCUMENT, state=AdForm.waiting_for_data
+    )
+    dp.register_message_handler(process_ad_data, state=AdForm.waiting_for_data)
+    dp.register_message_handler(process_jump_to_id, state=EditAdForm.waiting_for_ad_id)
+    dp.register_message_handler(
+        process_notes, content_types=types.ContentType.ANY, state=EditAdForm.waiting_for_notes
+    )
+    dp.register_message_handler(
+        process_post_link, content_types=types.ContentType.ANY, state=EditAdForm.waiting_for_post_link
+    )
+    return dp
+
+async def setup(index=0, profile=None, metrics_port=config.METRICS_PORT):
+    """Сборка и запуск приложения в процессе index; возвращает dp.
+
+    Таймер отложенных задач работает только в процессе 0, чтобы задачи
+    не выполнялись по разу в каждом процессе; остальные процессы только
+    сохраняют задачи в базу, а процесс 0 подхватывает их раз в JOB_SYNC_INTERVAL.
+    """
+    profile = profile or StartupProfile(False)
+    from src.database.database import init_db
+    from src.database.fsm_storage import create_storage
+    from src.utils.jobs import start_jobs, rehydrate_jobs
+    from src.utils.metrics import start_metrics_server
+    from src.utils.post_processing import set_views_client
+    from src.utils.views_client import create_views_client
+
+    bot, send_queue = create_bot()
+    storage = create_storage()
+    dp = create_dispatcher(bot, storage)
+    if profile.enabled:
+        dp.middleware.setup(first_update_middleware(profile))
+    profile.mark('imports')
+    dp['send_queue'] = send_queue
+    dp['metrics'] = None
+
+    try:
+        # Процессы-обработчики не видят изменений друг друга в кэшах, поэтому в этом режиме кэши выключены
+        await init_db(cache=config.WORKER_PROCESSES == 0)
+        if hasattr(storage, 'open'):
+            await storage.open()
+        profile.mark('db')
+
+        send_queue.start()
+        if index == 0:
+            set_views_client(create_views_client())
+            start_jobs(config.JOB_SYNC_INTERVAL if config.WORKER_PROCESSES > 0 else None)
+            await rehydrate_jobs()
+        profile.mark('scheduler')
+
+        dp['metrics'] = await start_metrics_server(port=metrics_port)
+    except Exception:
+        # Потоки соединений aiosqlite не фоновые: без остановки уже запущенного процесс не завершится
+        try:
+            await teardown(dp, index)
+        except Exception as e:
+            logging.error(f"Error while stopping after a failed start: {e}")
+        raise
+    return dp
+
+async def teardown(dp, index=0):
+    """Остановка приложения процесса index в порядке, обратном setup.
+
+    Каждый шаг пропускает то, что не было запущено, поэтому teardown
+    вызывается и из setup, упавшего на середине.
+    """
+    from src.database.database import close_db
+    from src.utils.jobs import stop_jobs
+    from src.utils.metrics import stop_metrics_server
+    from src.utils import post_processing
+
+    await stop_metrics_server(dp['metrics'])
+    if index == 0:
+        await stop_jobs()
+        if post_processing.views_client is not None:
+            await post_processing.views_client.close()
+    await dp['send_queue'].stop()
+    await dp.storage.close()
+    await dp.storage.wait_closed()
+    await close_db()
+    session = await dp.bot.get_session()
+    await session.close()
+
+async def worker_setup(index):
+    """setup для процесса-обработчика: в новом процессе логирование ещё не настроено.
+
+    Метрики процесса index отдаются на METRICS_PORT + 1 + index, на METRICS_PORT — супервизор.
+    """
+    from src.utils.process_utils import setup_logging
+    setup_logging()
+    return await setup(index, metrics_port=config.METRICS_PORT and config.METRICS_PORT + 1 + index)
+
+async def run_polling(dp):
+    await dp.skip_updates()
+    await dp.start_polling()
+
+async def run_webhook(dp):
+    from src.utils.webhook import start_webhook, stop_webhook
+    server, runner = await start_webhook(dp)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_webhook(server, runner)
+
+async def run_supervisor(profile):
+    """Многопроцессный режим: обновления получает этот процесс, обрабатывают WORKER_PROCESSES процессов."""
+    from aiogram import Bot
+    from src.database.database import migrate_db
+    from src.utils.supervisor import Supervisor
+    from src.utils.metrics import start_metrics_server, stop_metrics_server
+
+    if config.BOT_MODE != 'polling':
+        logging.warning("Worker processes receive updates by polling only; BOT_MODE is ignored")
+    bot = Bot(token=config.API_TOKEN)
+    # Схема обновляется один раз здесь, процессы-обработчики застают её готовой
+    await migrate_db()
+    supervisor = Supervisor(worker_setup, teardown)
+    supervisor.start()
+    profile.mark('workers')
+    profile.report()
+    metrics = await start_metrics_server()
+    watcher = asyncio.get_running_loop().create_task(supervisor.watch())
+    try:
+        await bot.delete_webhook(drop_pending_updates=True)
+        await supervisor.run_polling(bot)
+    finally:
+        await supervisor.stop()
+        watcher.cancel()
+        await stop_metrics_server(metrics)
+        session = await bot.get_session()
+        await session.close()
+
+async def run(profile):
+    if config.WORKER_PROCESSES > 0:
+        await run_supervisor(profile)
+        return
+    dp = await setup(0, profile)
+    try:
+        if config.BOT_MODE == 'webhook':
+            await run_webhook(dp)
+        else:
+            await run_polling(dp)
+    finally:
+        await teardown(dp, 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Рекламный бот")
+    parser.add_argument('--profile-startup', action='store_true', default=config.STARTUP_PROFILE,
+                        help='вывести в лог время этапов запуска')
+    args = parser.parse_args()
+
+    from src.utils.process_utils import setup_logging, setup_process_lock, cleanup
+    setup_logging()
+    setup_process_lock()
+    try:
+        asyncio.run(run(StartupProfile(args.profile_startup)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cleanup()
+        logging.info("Bot shutdown completed")
+
+if __name__ == '__main__':
+    main()
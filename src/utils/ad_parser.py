@@ -0,0 +1,134 @@
+"""
+Разбор строки с данными рекламы: ДД.ММ.ГГГГ, @юзер, время, условия, [тип,] CPM/сумма
+"""
+
+import re
+from collections import namedtuple
+from src.config.config import VALID_CONDITIONS
+from src.utils.date_utils import TIME_PATTERN
+
+# Поля разделяются запятой, пробел вокруг запятой не важен (пробелы уже схлопнуты)
+FIELD_SEPARATOR = re.compile(r' ?, ?')
+DATE_PATTERN = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})')
+VALUE_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+# Условия в нижнем регистре -> как они записаны в VALID_CONDITIONS
+CONDITIONS = {condition.lower(): condition for condition in VALID_CONDITIONS}
+AD_TYPES = {'CPM', 'ФИКС'}
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+FORMAT_ERROR = "❌ Неверный формат! Используйте формат:\nДД.ММ.ГГГГ, @юзер, время, условия, CPM/сумма"
+FIELD_ERRORS = {
+    'ad_type': "❌ Ошибка в типе рекламы! Допустимые типы: CPM или ФИКС",
+    'conditions': f"❌ Неверные условия! Допустимые условия: {', '.join(VALID_CONDITIONS)}",
+    'date': "❌ Неверный формат даты! Используйте формат ДД.ММ.ГГГГ",
+    'value': "❌ Неверное значение CPM/суммы! Введите число, например 150 или 1.5",
+}
+
+FieldError = namedtuple('FieldError', ['field', 'message'])
+
+# Заголовок файла импорта: первая колонка называется «Дата»
+HEADER_FIRST_FIELDS = {'дата', 'date'}
+IMPORT_FIELD_SEPARATOR = re.compile(r'[;,]')
+
+def parse_date(date):
+    """Быстрая проверка даты ДД.ММ.ГГГГ без strptime; возвращает (год, месяц, день) или None."""
+    match = DATE_PATTERN.fullmatch(date)
+    if not match:
+        return None
+    day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    if not 1 <= month <= 12 or year < 1:
+        return None
+    days = _DAYS_IN_MONTH[month - 1]
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        days = 29
+    if not 1 <= day <= days:
+        return None
+    return year, month, day
+
+def scheduled_at(date_parts, time):
+    """Строка ГГГГ-ММ-ДД ЧЧ:ММ, как date_utils.to_scheduled_at, из уже разобранной даты."""
+    year, month, day = date_parts
+    hour = minute = 0
+    match = TIME_PATTERN.match(time)
+    if match and int(match.group(1)) < 24 and int(match.group(2)) < 60:
+        hour, minute = int(match.group(1)), int(match.group(2))
+    return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}"
+
+def parse_ad(text):
+    """Разбор одной строки рекламы за один проход.
+
+    Возвращает (данные, []) при успехе или (None, [FieldError, ...]) со всеми
+    ошибками по полям. Ключи данных совпадают с аргументами add_advertisement.
+    """
+    parts = FIELD_SEPARATOR.split(' '.join(text.split()))
+    if len(parts) == 5:
+        date, username, time, conditions, value = parts
+        ad_type = 'CPM' if '.' in value else 'ФИКС'
+    elif len(parts) == 6:
+        date, username, time, conditions, ad_type, value = parts
+        ad_type = ad_type.upper()
+    else:
+        return None, [FieldError('format', FORMAT_ERROR)]
+
+    errors = []
+    if ad_type not in AD_TYPES:
+        errors.append(FieldError('ad_type', FIELD_ERRORS['ad_type']))
+    if conditions.lower() not in CONDITIONS:
+        errors.append(FieldError('conditions', FIELD_ERRORS['conditions']))
+    date_parts = parse_date(date)
+    if date_parts is None:
+        errors.append(FieldError('date', FIELD_ERRORS['date']))
+    if not VALUE_PATTERN.fullmatch(value):
+        errors.append(FieldError('value', FIELD_ERRORS['value']))
+    if errors:
+        return None, errors
+
+    year, month, day = date_parts
+    return {
+        'ad_type': ad_type,
+        # Д.М.ГГГГ хранится как ДД.ММ.ГГГГ: на этот формат опираются триггеры статистики и scheduled_at
+        'date': f"{day:02d}.{month:02d}.{year:04d}",
+        'username': username,
+        'time': time,
+        # Условия хранятся в том виде, как они записаны в VALID_CONDITIONS, а не как их набрали
+        'conditions': CONDITIONS[conditions.lower()],
+        'value': value,
+        'payment_status': 'Не оплачено' if ad_type == 'CPM' else 'Оплачено',
+        'scheduled_at': scheduled_at(date_parts, time),
+    }, []
+
+def import_line(line):
+    """Строка файла импорта в формате parse_ad.
+
+    CSV из русскоязычных таблиц разделяют поля «;» и пишут дробные числа
+    с запятой: такая строка делится по «;», а запятая заменяется точкой
+    только в последнем поле (CPM/сумма). Строки с запятыми не меняются.
+    """
+    if ';' not in line:
+        return line
+    fields = [field.strip() for field in line.split(';')]
+    # Таблицы дописывают «;» за пустыми колонками в конце строки
+    while fields and not fields[-1]:
+        fields.pop()
+    if fields:
+        fields[-1] = fields[-1].replace(',', '.')
+    return ', '.join(fields)
+
+def is_header(line):
+    """Строка заголовка CSV: первая колонка — «Дата»."""
+    first = IMPORT_FIELD_SEPARATOR.split(line, 1)[0]
+    return first.strip().strip('"').lower() in HEADER_FIRST_FIELDS
+
+def format_errors(errors):
+    """Текст ответа пользователю: по строке на каждое ошибочное поле."""
+    return '\n'.join(error.message for error in errors)
+
+def mention_pattern(bot_username):
+    """Скомпилированный шаблон упоминания бота для strip_mention."""
+    return re.compile(rf'@{re.escape(bot_username)}\b', re.IGNORECASE)
+
+def strip_mention(text, pattern):
+    """Текст сообщения без упоминания бота."""
+    return pattern.sub('', text).strip()
@@ -0,0 +1,92 @@
+"""
+Кодек callback_data: версия формата, префикс действия и поля через '_'
+
+Формат: '<версия>:<префикс><поле>_<поле>...', например '1:edit_42' или
+'1:dbpage_next_120'. Данные без версии — кнопки, отправленные до появления
+кодека; их формат совпадает с текущим, поэтому они разбираются так же.
+"""
+
+CALLBACK_VERSION = 1
+VERSION_SEPARATOR = ':'
+FIELD_SEPARATOR = '_'
+
+# Ограничение Telegram на длину callback_data
+MAX_CALLBACK_BYTES = 64
+
+def pack(prefix, *values):
+    """Сборка callback_data текущей версии."""
+    data = f"{CALLBACK_VERSION}{VERSION_SEPARATOR}{prefix}{FIELD_SEPARATOR.join(map(str, values))}"
+    if len(data.encode()) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"callback_data is longer than {MAX_CALLBACK_BYTES} bytes: {data}")
+    return data
+
+def split_version(data):
+    """Разделение callback_data на (версия, полезная часть); без версии — (None, data)."""
+    head, sep, payload = data.partition(VERSION_SEPARATOR)
+    if sep and head.isdigit():
+        return int(head), payload
+    return None, data
+
+class _Node:
+    __slots__ = ('children', 'routes')
+
+    def __init__(self):
+        self.children = {}
+        self.routes = []
+
+class PrefixTrie:
+    """Префиксное дерево маршрутов по сегментам callback_data между '_'.
+
+    Маршрут — префикс ('edit_', 'edit_ads', 'dbpage_') и упорядоченные поля
+    {имя: преобразователь}. Поиск делит строку один раз и спускается по
+    словарям, поэтому его стоимость зависит от числа сегментов, а не от числа
+    маршрутов. Выигрывает самый длинный префикс, у которого разбираются поля:
+    'edit_ads' не путается с 'edit_<id>', а 'edit_type_5' — с 'edit_5'.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, prefix, fields, route):
+        node = self.root
+        for segment in prefix.rstrip(FIELD_SEPARATOR).split(FIELD_SEPARATOR):
+            node = node.children.setdefault(segment, _Node())
+        node.routes.append((tuple(fields.items()), route))
+
+    @staticmethod
+    def _parse(fields, rest):
+        if len(rest) != len(fields):
+            return None
+        parsed = {}
+        try:
+            for (name, convert), part in zip(fields, rest):
+                if not part:
+                    return None
+                parsed[name] = convert(part)
+        except ValueError:
+            return None
+        return parsed
+
+    def match(self, data):
+        """Список (route, поля) подходящих маршрутов, начиная с самого длинного префикса."""
+        segments = data.split(FIELD_SEPARATOR)
+        children = self.root.children
+        visited = []
+        depth = 0
+        for segment in segments:
+            node = children.get(segment)
+            if node is None:
+                break
+            depth += 1
+            if node.routes:
+                visited.append((node.routes, depth))
+            children = node.children
+
+        matches = []
+        for routes, depth in reversed(visited):
+            rest = segments[depth:]
+            for fields, route in routes:
+                parsed = self._parse(fields, rest)
+                if parsed is not None:
+                    matches.append((route, parsed))
+        return matches
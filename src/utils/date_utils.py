@@ -0,0 +1,29 @@
+"""
+Утилиты для нормализации даты и времени рекламы
+"""
+
+import re
+from datetime import datetime
+
+# Время в свободной форме: берём ведущие ЧЧ:ММ или Ч:ММ, остальное игнорируем
+TIME_PATTERN = re.compile(r'\s*(\d{1,2}):(\d{2})')
+
+SCHEDULED_AT_FORMAT = "%Y-%m-%d %H:%M"
+
+def to_scheduled_at(date, time):
+    """Приведение даты ДД.ММ.ГГГГ и времени к сортируемой строке ГГГГ-ММ-ДД ЧЧ:ММ.
+
+    Если время не распознано, берётся начало дня; при неверной дате возвращается None.
+    """
+    try:
+        day = datetime.strptime(date, "%d.%m.%Y")
+    except ValueError:
+        return None
+    match = TIME_PATTERN.match(time or '')
+    if match and int(match.group(1)) < 24 and int(match.group(2)) < 60:
+        day = day.replace(hour=int(match.group(1)), minute=int(match.group(2)))
+    return day.strftime(SCHEDULED_AT_FORMAT)
+
+def format_scheduled_at(moment):
+    """Форматирование datetime для сравнения со столбцом scheduled_at."""
+    return moment.strftime(SCHEDULED_AT_FORMAT)
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Утилиты для потоковой выгрузки таблицы реклам в сжатый файл
+"""
+
+import io
+import os
+import csv
+import gzip
+import json
+import asyncio
+import tempfile
+from src.database.database import iter_ads
+
+EXPORT_COLUMNS = (
+    'id', 'ad_type', 'date', 'username', 'time', 'conditions', 'cpm', 'reach',
+    'profit', 'payment_status', 'scheduled_at', 'created_at', 'notes', 'post_link'
+)
+
+def _encode_csv(rows, with_header):
+    """Кодирование пачки строк в CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if with_header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+    return buffer.getvalue().encode('utf-8')
+
+def _encode_ndjson(rows, with_header):
+    """Кодирование пачки строк в NDJSON (один JSON-объект на строку)."""
+    return ''.join(
+        json.dumps({column: row[column] for column in EXPORT_COLUMNS}, ensure_ascii=False) + '\n'
+        for row in rows
+    ).encode('utf-8')
+
+ENCODERS = {
+    'csv': _encode_csv,
+    'json': _encode_ndjson,
+}
+
+async def export_ads(fmt='csv', start=None, end=None, payment_status=None):
+    """Выгрузка реклам в gzip-файл во временном каталоге.
+
+    Строки читаются из курсора пачками, сжатие и запись на диск выполняются
+    в пуле потоков, поэтому объём памяти не зависит от размера таблицы.
+    Возвращает (путь к файлу, число строк); удалить файл должен вызывающий.
+    """
+    encode = ENCODERS[fmt]
+    loop = asyncio.get_running_loop()
+    exported = 0
+    with tempfile.NamedTemporaryFile(suffix=f'.{fmt}.gz', delete=False) as raw:
+        path = raw.name
+        try:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+                async for rows in iter_ads(start, end, payment_status):
+                    chunk = encode(rows, exported == 0)
+                    await loop.run_in_executor(None, archive.write, chunk)
+                    exported += len(rows)
+        except Exception:
+            raw.close()
+            os.remove(path)
+            raise
+    return path, exported
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Отложенные задачи с постоянным хранением в базе данных
+
+Источник истины — таблица scheduled_jobs. Таймер работает в одном процессе;
+остальные процессы только сохраняют задачи в базу, а процесс с таймером
+подхватывает их сверкой раз в JOB_SYNC_INTERVAL секунд. Перед выполнением
+созревшие задачи сверяются с базой, поэтому отменённые и перенесённые
+в другом процессе задачи не выполняются по старому времени.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from src.config.config import (
+    POST_PROCESSING_DELAY_HOURS, POST_VIEWS_RETRY_MINUTES, JOB_CATCHUP_BATCH, JOB_CATCHUP_PAUSE
+)
+from src.database.database import (
+    save_jobs, delete_job, delete_jobs, get_jobs, get_pending_jobs, get_ad_by_id, update_ad_field
+)
+from src.utils.date_utils import SCHEDULED_AT_FORMAT
+from src.utils.post_processing import process_posts
+from src.utils.timer_heap import TimerHeap
+
+# Обработчики задач по типу; тип хранится в scheduled_jobs.job_type.
+# Обработчик получает пачку ID записей и возвращает ID выполненных,
+# остальные задачи повторяются через RETRY_DELAYS[тип].
+JOB_HANDLERS = {
+    'parse_post': process_posts,
+}
+RETRY_DELAYS = {
+    'parse_post': timedelta(minutes=POST_VIEWS_RETRY_MINUTES),
+}
+
+def post_processing_time(scheduled_at):
+    """Время сбора охвата для рекламы со временем выхода scheduled_at (строка ГГГГ-ММ-ДД ЧЧ:ММ)."""
+    return datetime.strptime(scheduled_at, SCHEDULED_AT_FORMAT) + timedelta(hours=POST_PROCESSING_DELAY_HOURS)
+
+async def run_jobs(job_type, ad_ids):
+    """Выполнение пачки задач одного типа: выполненные удаляются, остальные переносятся."""
+    try:
+        done = set(await JOB_HANDLERS[job_type](ad_ids))
+        await delete_jobs(list(done), job_type)
+        retry = [ad_id for ad_id in ad_ids if ad_id not in done]
+        if retry:
+            run_at = datetime.now() + RETRY_DELAYS[job_type]
+            logging.info(f"Задачи {job_type} для записей {retry} перенесены на {run_at:%Y-%m-%d %H:%M}")
+            await schedule_jobs([(ad_id, job_type, run_at) for ad_id in retry])
+    except Exception as e:
+        logging.error(f"Ошибка выполнения задач {job_type} для записей {ad_ids}: {e}")
+
+# Задачи, переданные в run_due_jobs и ещё не выполненные: сверка не ставит их в таймер повторно
+_running = set()
+_sync_task = None
+
+async def _still_due(keys):
+    """Созревшие задачи, которые ещё есть в базе; перенесённые на потом снова ставятся в таймер."""
+    stored = await get_jobs(keys)
+    now = datetime.now()
+    due = []
+    for key in keys:
+        run_at = stored.get(key)
+        if run_at is None:
+            continue
+        run_at = datetime.strptime(run_at, SCHEDULED_AT_FORMAT)
+        if run_at <= now:
+            due.append(key)
+        else:
+            timers.schedule(key, run_at.timestamp())
+    return due
+
+async def run_due_jobs(keys):
+    """Выполнение созревших задач пачками по JOB_CATCHUP_BATCH с паузой между ними.
+
+    keys — пары (ad_id, job_type). Используется и таймером, и догонянием после рестарта.
+    """
+    _running.update(keys)
+    try:
+        by_type = {}
+        for ad_id, job_type in await _still_due(keys):
+            by_type.setdefault(job_type, []).append(ad_id)
+        for job_type, ad_ids in by_type.items():
+            for start in range(0, len(ad_ids), JOB_CATCHUP_BATCH):
+                await run_jobs(job_type, ad_ids[start:start + JOB_CATCHUP_BATCH])
+                if start + JOB_CATCHUP_BATCH < len(ad_ids):
+                    await asyncio.sleep(JOB_CATCHUP_PAUSE)
+    finally:
+        _running.difference_update(keys)
+
+timers = TimerHeap(run_due_jobs)
+
+async def sync_jobs():
+    """Сверка таймера с scheduled_jobs: задачи, добавленные, перенесённые или удалённые другими процессами."""
+    stored = {
+        (row['ad_id'], row['job_type']): datetime.strptime(row['run_at'], SCHEDULED_AT_FORMAT).timestamp()
+        for row in await get_pending_jobs()
+    }
+    scheduled = timers.due_times()
+    for key in scheduled.keys() - stored.keys():
+        timers.cancel(key)
+    for key, due_time in stored.items():
+        # В базе время хранится с точностью до минуты, точное время таймера не трогаем
+        if key not in _running and abs(scheduled.get(key, float('-inf')) - due_time) >= 60:
+            timers.schedule(key, due_time)
+
+async def _sync_loop(interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_jobs()
+        except Exception as e:
+            logging.error(f"Ошибка сверки отложенных задач с базой: {e}")
+
+def start_jobs(sync_interval=None):
+    """Запуск таймера отложенных задач в этом процессе.
+
+    sync_interval — если задан, раз в столько секунд таймер сверяется с базой,
+    чтобы подхватить задачи, запланированные другими процессами.
+    """
+    global _sync_task
+    timers.start()
+    if sync_interval and _sync_task is None:
+        _sync_task = asyncio.get_running_loop().create_task(_sync_loop(sync_interval))
+
+async def stop_jobs():
+    """Остановка таймера; задачи остаются в базе до следующего запуска."""
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+    await timers.stop()
+
+async def schedule_jobs(jobs):
+    """Сохранение задач в базе и постановка в таймер, если он работает в этом процессе.
+
+    jobs — список кортежей (ad_id, job_type, run_at: datetime).
+    """
+    if not jobs:
+        return
+    await save_jobs(jobs)
+    if not timers.running:
+        return
+    for ad_id, job_type, run_at in jobs:
+        timers.schedule((ad_id, job_type), run_at.timestamp())
+
+async def schedule_post_processing(ad_ids_with_time):
+    """Планирование сбора охвата: список пар (ad_id, scheduled_at)."""
+    await schedule_jobs([
+        (ad_id, 'parse_post', post_processing_time(scheduled_at))
+        for ad_id, scheduled_at in ad_ids_with_time
+    ])
+
+async def cancel_jobs(ad_id, job_types=tuple(JOB_HANDLERS)):
+    """Отмена задач записи, например при её удалении."""
+    for job_type in job_types:
+        timers.cancel((ad_id, job_type))
+        await delete_job(ad_id, job_type)
+
+async def reschedule_post_processing(ad_id, ad_type, scheduled_at):
+    """Перенос сбора охвата после изменения даты, времени или типа рекламы."""
+    if ad_type == 'CPM' and scheduled_at:
+        await schedule_post_processing([(ad_id, scheduled_at)])
+    else:
+        await cancel_jobs(ad_id, ('parse_post',))
+
+# Поля записи, от которых зависит сбор охвата: его время и пост, просмотры которого собираются
+SCHEDULE_FIELDS = ('ad_type', 'date', 'time', 'post_link')
+
+async def edit_ad_field(ad_id, field, value):
+    """Изменение поля рекламы; после смены типа, даты, времени или ссылки на пост сбор охвата переносится."""
+    await update_ad_field(ad_id, field, value)
+    if field in SCHEDULE_FIELDS:
+        # scheduled_at пересчитан триггером, запись перечитывается из базы
+        ad = await get_ad_by_id(ad_id)
+        if ad is not None:
+            await reschedule_post_processing(ad_id, ad['ad_type'], ad['scheduled_at'])
+
+async def rehydrate_jobs():
+    """Восстановление задач после рестарта одним запросом к scheduled_jobs.
+
+    Будущие задачи ставятся в таймер, просроченные выполняются в фоне пачками.
+    Возвращает фоновую задачу догоняния или None.
+    """
+    now = datetime.now()
+    overdue = []
+    restored = 0
+    for row in await get_pending_jobs():
+        run_at = datetime.strptime(row['run_at'], SCHEDULED_AT_FORMAT)
+        if run_at <= now:
+            overdue.append((row['ad_id'], row['job_type']))
+        else:
+            timers.schedule((row['ad_id'], row['job_type']), run_at.timestamp())
+            restored += 1
+    logging.info(f"Восстановлено задач: {restored}, просрочено: {len(overdue)}")
+    if overdue:
+        return asyncio.get_running_loop().create_task(run_due_jobs(overdue))
+    return None
\ No newline at end of file
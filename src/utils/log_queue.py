@@ -0,0 +1,124 @@
+"""
+Логирование без блокировки цикла событий: очередь, фоновая запись, ротация и ограничение частоты
+"""
+
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from time import monotonic
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """Не больше rate записей в секунду (с запасом burst) от каждого из логгеров names.
+
+    Предназначен для строк на каждое обновление (LoggingMiddleware): при
+    наплыве обновлений лишние строки отбрасываются, а первая пропущенная
+    после перерыва сообщает, сколько было отброшено. Предупреждения
+    и ошибки не ограничиваются.
+    """
+
+    def __init__(self, names, rate, burst=None):
+        super().__init__()
+        self.names = tuple(names)
+        self.rate = rate
+        self.burst = burst or rate
+        # Имя логгера -> [токены, время последнего пополнения, отброшено]
+        self._buckets = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not record.name.startswith(self.names):
+            return True
+        now = monotonic()
+        bucket = self._buckets.get(record.name)
+        if bucket is None:
+            bucket = self._buckets[record.name] = [self.burst, now, 0]
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            record.msg = f"{record.getMessage()} [пропущено строк: {bucket[2]}]"
+            record.args = None
+            bucket[2] = 0
+        return True
+
+class LoopQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler для очереди внутри процесса.
+
+    Стандартный prepare форматирует запись (вместе с трейсбеком) ещё
+    в потоке цикла событий, чтобы её можно было сериализовать; здесь
+    очередь читает поток того же процесса, поэтому в цикле событий только
+    подставляются аргументы, а форматирование и запись — в фоне.
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+_listener = None
+
+def setup_queued_logging(config):
+    """Перенастройка корневого логгера на очередь и фоновый поток записи.
+
+    config — словарь вида LOGGING_CONFIG. Возвращает запущенный QueueListener;
+    он останавливается (с дозаписью очереди) при выходе из процесса.
+    """
+    global _listener
+    stop_queued_logging()
+
+    formatter = JsonFormatter() if config.get('json') else logging.Formatter(config['format'])
+    handlers = [logging.StreamHandler()]
+    if config.get('file'):
+        handlers.append(logging.handlers.RotatingFileHandler(
+            config['file'], maxBytes=config.get('max_bytes', 0),
+            backupCount=config.get('backup_count', 0), encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = LoopQueueHandler(records)
+    if config.get('rate_limited'):
+        queue_handler.addFilter(RateLimitFilter(config['rate_limited'], config.get('rate_limit', 20)))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config['level'])
+    for name, level in config.get('loggers', {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_queued_logging():
+    """Дозапись очереди и остановка фонового потока."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(stop_queued_logging)
@@ -0,0 +1,263 @@
+"""
+Метрики горячего пути: задержки обработчиков и запросов к базе, ошибки, очереди, состояния FSM
+"""
+
+import logging
+import functools
+from bisect import bisect_left
+from time import perf_counter
+from contextvars import ContextVar
+from aiohttp import web
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from src.config.config import METRICS_HOST, METRICS_PORT
+
+# Границы корзин гистограмм задержки, сек
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Обработчик, который сейчас выполняется в этой задаче, — для подсчёта его ошибок
+_current_handler = ContextVar('metrics_handler', default=None)
+
+class Histogram:
+    """Гистограмма в формате Prometheus: счётчики по корзинам, сумма и число наблюдений."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # Последняя корзина — всё, что больше buckets[-1] (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Пары (граница, наблюдений не больше неё), последняя граница — '+Inf'."""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Оценка квантиля сверху: граница первой корзины, набравшей долю q."""
+        if not self.count:
+            return 0.0
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound if bound != '+Inf' else self.buckets[-1]
+
+handler_latency = {}
+handler_errors = {}
+query_latency = {}
+query_rows = {}
+query_errors = {}
+# Имя метрики -> (описание, имя метки, функция без аргументов; может быть async
+# и вернуть {значение метки: значение} вместо одного числа)
+gauges = {}
+
+def observe_handler(name, seconds):
+    histogram = handler_latency.get(name)
+    if histogram is None:
+        histogram = handler_latency[name] = Histogram()
+    histogram.observe(seconds)
+
+def set_gauge(name, description, read, label=None):
+    """Регистрация показателя, который читается в момент выдачи метрик."""
+    gauges[name] = (description, label, read)
+
+def count_rows(result):
+    """Сколько строк вернул запрос: длина списка, сумма списков кортежа (страница, есть_ещё) или одна запись."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple):
+        return sum(len(part) for part in result if isinstance(part, list))
+    return 1 if result else 0
+
+def timed_query(function):
+    """Декоратор функций модуля database: задержка, число строк и ошибки по имени функции."""
+    kind = function.__name__
+    histogram = query_latency[kind] = Histogram()
+    query_rows[kind] = 0
+    query_errors[kind] = 0
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        started = perf_counter()
+        try:
+            result = await function(*args, **kwargs)
+        except Exception:
+            query_errors[kind] += 1
+            raise
+        finally:
+            histogram.observe(perf_counter() - started)
+        query_rows[kind] += count_rows(result)
+        return result
+    return wrapper
+
+class MetricsMiddleware(BaseMiddleware):
+    """Задержка каждого обработчика сообщений и нажатий кнопок.
+
+    Время считается от вызова обработчика до его завершения, без фильтров.
+    Для обработчиков роутера берётся имя маршрута, а не общий _dispatch_*.
+    """
+
+    @staticmethod
+    def _start(data):
+        route = data.get('route')
+        if route is not None:
+            name = route.handler.__name__
+        else:
+            from aiogram.dispatcher.handler import current_handler
+            name = current_handler.get().__name__
+        _current_handler.set(name)
+        data['_metrics'] = (name, perf_counter())
+
+    @staticmethod
+    def _finish(data):
+        started = data.pop('_metrics', None)
+        if started is not None:
+            observe_handler(started[0], perf_counter() - started[1])
+            _current_handler.set(None)
+
+    async def on_process_message(self, message, data):
+        self._start(data)
+
+    async def on_post_process_message(self, message, results, data):
+        self._finish(data)
+
+    async def on_process_callback_query(self, callback_query, data):
+        self._start(data)
+
+    async def on_post_process_callback_query(self, callback_query, results, data):
+        self._finish(data)
+
+class ErrorCounter(logging.Handler):
+    """Ошибки по обработчикам.
+
+    Обработчики бота ловят исключения сами и пишут их в лог, поэтому ошибкой
+    обработчика считается запись уровня ERROR, сделанная во время его работы.
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+
+    def emit(self, record):
+        name = _current_handler.get() or 'other'
+        handler_errors[name] = handler_errors.get(name, 0) + 1
+
+def setup_metrics(dp):
+    """Подключение middleware, счётчика ошибок и показателя состояний FSM к диспетчеру."""
+    dp.middleware.setup(MetricsMiddleware())
+    logging.getLogger().addHandler(ErrorCounter())
+    set_gauge('bot_fsm_states', 'Активные формы FSM', lambda: fsm_state_counts(dp.storage), label='state')
+
+async def fsm_state_counts(storage):
+    """{состояние: число форм} для SQLiteStorage и MemoryStorage."""
+    if hasattr(storage, 'state_counts'):
+        return await storage.state_counts()
+    counts = {}
+    for users in getattr(storage, 'data', {}).values():
+        for entry in users.values():
+            if entry.get('state'):
+                counts[entry['state']] = counts.get(entry['state'], 0) + 1
+    return counts
+
+async def read_gauges():
+    """{имя: (описание, имя метки, {значение метки: значение})}; ошибка одного показателя не мешает остальным."""
+    values = {}
+    for name, (description, label, read) in gauges.items():
+        try:
+            value = read()
+            if hasattr(value, '__await__'):
+                value = await value
+        except Exception as e:
+            logging.warning(f"Metric {name} is unavailable: {e}")
+            continue
+        values[name] = (description, label, value if isinstance(value, dict) else {None: value})
+    return values
+
+def _label(name, value):
+    return '{%s="%s"}' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+
+def _histogram_lines(metric, label, histograms):
+    for key, histogram in sorted(histograms.items()):
+        for bound, total in histogram.cumulative():
+            labels = _label(label, key)[:-1] + f',le="{bound}"}}'
+            yield f'{metric}_bucket{labels} {total}'
+        yield f'{metric}_sum{_label(label, key)} {histogram.sum}'
+        yield f'{metric}_count{_label(label, key)} {histogram.count}'
+
+async def render_prometheus():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = [
+        '# HELP bot_handler_seconds Время выполнения обработчика',
+        '# TYPE bot_handler_seconds histogram',
+        *_histogram_lines('bot_handler_seconds', 'handler', handler_latency),
+        '# HELP bot_handler_errors_total Ошибки в обработчиках',
+        '# TYPE bot_handler_errors_total counter',
+        *(f'bot_handler_errors_total{_label("handler", name)} {count}' for name, count in sorted(handler_errors.items())),
+        '# HELP bot_db_query_seconds Время запроса к базе по функции database',
+        '# TYPE bot_db_query_seconds histogram',
+        *_histogram_lines('bot_db_query_seconds', 'query', query_latency),
+        '# HELP bot_db_query_rows_total Строки, возвращённые запросами',
+        '# TYPE bot_db_query_rows_total counter',
+        *(f'bot_db_query_rows_total{_label("query", kind)} {rows}' for kind, rows in sorted(query_rows.items())),
+        '# HELP bot_db_query_errors_total Запросы, завершившиеся исключением',
+        '# TYPE bot_db_query_errors_total counter',
+        *(f'bot_db_query_errors_total{_label("query", kind)} {count}' for kind, count in sorted(query_errors.items())),
+    ]
+    for name, (description, label, values) in (await read_gauges()).items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} gauge')
+        for key, value in values.items():
+            lines.append(f'{name}{_label(label, key) if key is not None else ""} {value}')
+    return '\n'.join(lines) + '\n'
+
+async def render_summary():
+    """Короткая сводка для команды /metrics: самые медленные обработчики и запросы."""
+    def rows(histograms, errors):
+        ranked = sorted(histograms.items(), key=lambda item: item[1].quantile(0.95), reverse=True)
+        for name, histogram in ranked[:10]:
+            if histogram.count:
+                yield (f"{name}: {histogram.count} шт., ср. {histogram.sum / histogram.count * 1000:.1f} мс, "
+                       f"p95 ≤ {histogram.quantile(0.95) * 1000:g} мс, ошибок {errors.get(name, 0)}")
+
+    lines = ["📈 Обработчики:", *rows(handler_latency, handler_errors), "", "🗄 Запросы к базе:"]
+    lines += rows(query_latency, query_errors)
+    for name, (description, label, values) in (await read_gauges()).items():
+        lines.append("")
+        lines.append(f"{description}: " + (', '.join(
+            f"{key}={value}" if key is not None else str(value) for key, value in values.items()
+        ) or "нет"))
+    return '\n'.join(lines)
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """HTTP-сервер /metrics для Prometheus; возвращает runner или None, если port == 0.
+
+    Занятый порт не мешает запуску бота: ошибка пишется в лог, и бот работает без метрик.
+    """
+    if not port:
+        return None
+
+    async def handle(request):
+        return web.Response(text=await render_prometheus(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logging.error(f"Metrics server could not listen on {host}:{port}, metrics are disabled: {e}")
+        await runner.cleanup()
+        return None
+    logging.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
+
+async def stop_metrics_server(runner):
+    if runner is not None:
+        await runner.cleanup()
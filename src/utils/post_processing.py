@@ -0,0 +1,69 @@
+"""
+Отложенная обработка рекламных постов: сбор охвата и расчёт прибыли
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from src.config.config import POST_VIEWS_CONCURRENCY, POST_VIEWS_GIVE_UP_HOURS
+from src.database.database import get_ads_by_ids, save_post_results
+from src.utils.date_utils import SCHEDULED_AT_FORMAT
+
+# Источник просмотров; None — охват не собирается, обработка только логируется
+views_client = None
+
+def set_views_client(client):
+    """Подключение источника просмотров (реализации ViewsClient)."""
+    global views_client
+    views_client = client
+
+def calculate_profit(ad, views):
+    """Прибыль по охвату: для CPM — стоимость тысячи просмотров, для ФИКС — без изменений."""
+    if ad['ad_type'] == 'CPM' and ad['cpm'] is not None:
+        return round(views / 1000 * ad['cpm'], 2)
+    return ad['profit']
+
+def gave_up(ad, moment, hours=POST_VIEWS_GIVE_UP_HOURS):
+    """Прошло ли с выхода рекламы столько времени, что пост искать больше не нужно."""
+    if not ad['scheduled_at']:
+        return True
+    return datetime.strptime(ad['scheduled_at'], SCHEDULED_AT_FORMAT) + timedelta(hours=hours) <= moment
+
+async def process_posts(ad_ids, client=None, concurrency=POST_VIEWS_CONCURRENCY):
+    """Обработка пачки постов.
+
+    Записи читаются одним запросом, просмотры запрашиваются не более чем
+    concurrency запросами одновременно, охват и прибыль записываются
+    одной транзакцией. Возвращает ID обработанных записей: с записанным
+    охватом, удалённых из базы и тех, для которых сбор прекращён.
+    Остальные (просмотры не получены) нужно повторить позже.
+    """
+    client = client or views_client
+    ads = await get_ads_by_ids(ad_ids)
+    missing = set(ad_ids) - {ad['id'] for ad in ads}
+    if client is None:
+        for ad in ads:
+            logging.info(f"Processing advertisement post ID: {ad['id']}")
+        return list(ad_ids)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(ad):
+        async with semaphore:
+            try:
+                return ad, await client.get_views(ad)
+            except Exception as e:
+                logging.error(f"Error fetching views for post {ad['id']}: {e}")
+                return ad, None
+
+    now = datetime.now()
+    results, handled = [], list(missing)
+    for ad, views in await asyncio.gather(*(fetch(ad) for ad in ads)):
+        if views is not None:
+            results.append((ad['id'], views, calculate_profit(ad, views)))
+            handled.append(ad['id'])
+        elif gave_up(ad, now):
+            logging.warning(f"Views for post {ad['id']} ({ad['username']}) not found, giving up")
+            handled.append(ad['id'])
+    await save_post_results(results)
+    return handled
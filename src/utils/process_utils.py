@@ -4,44 +4,67 @@
 
 import os
 import sys
-import psutil
-import logging
 from src.config.config import LOCK_FILE
 
-def is_process_running(pid):
-    """Проверка, запущен ли процесс с указанным PID."""
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Открытый файл блокировки; блокировку держит ОС, пока файл открыт или процесс жив
+_lock_file = None
+
+def acquire_leader_lock(path=LOCK_FILE):
+    """Захват эксклюзивной блокировки файла без ожидания.
+
+    В отличие от PID-файла блокировку снимает сама ОС при любой смерти
+    процесса, поэтому нет гонки между проверкой и записью и нет ложных
+    срабатываний после kill -9 или повторного использования PID.
+    Возвращает True, если процесс стал лидером.
+    """
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    handle = open(path, 'a+')
     try:
-        return psutil.Process(pid).is_running()
-    except psutil.NoSuchProcess:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
         return False
+    # PID — только для человека, смотрящего в файл
+    handle.seek(0)
+    handle.truncate()
+    handle.write(str(os.getpid()))
+    handle.flush()
+    _lock_file = handle
+    return True
 
 def setup_process_lock():
     """Настройка блокировки процесса для предотвращения запуска нескольких экземпляров бота."""
-    if os.path.exists(LOCK_FILE):
-        try:
-            with open(LOCK_FILE, 'r') as f:
-                old_pid = int(f.read().strip())
-            if is_process_running(old_pid):
-                print("Бот уже запущен! Пожалуйста, закройте предыдущий экземпляр.")
-                sys.exit()
-            else:
-                os.remove(LOCK_FILE)
-        except Exception as e:
-            print(f"Ошибка при проверке файла блокировки: {e}")
-            os.remove(LOCK_FILE)
-
-    with open(LOCK_FILE, 'w') as f:
-        f.write(str(os.getpid()))
+    if not acquire_leader_lock():
+        print("Бот уже запущен! Пожалуйста, закройте предыдущий экземпляр.")
+        sys.exit()
 
 def cleanup():
-    """Функция очистки для удаления файла блокировки при выходе."""
-    if os.path.exists(LOCK_FILE):
-        os.remove(LOCK_FILE)
+    """Функция очистки: снятие блокировки при выходе.
+
+    Файл не удаляется: иначе следующий процесс мог бы заблокировать уже
+    удалённый файл, а третий — создать новый, и лидеров стало бы два.
+    """
+    global _lock_file
+    if _lock_file is None:
+        return
+    _lock_file.truncate(0)
+    _lock_file.close()
+    _lock_file = None
 
 def setup_logging():
-    """Настройка логирования."""
+    """Настройка логирования: запись через очередь в фоновом потоке по LOGGING_CONFIG."""
     from src.config.config import LOGGING_CONFIG
-    logging.basicConfig(
-        level=LOGGING_CONFIG['level'],
-        format=LOGGING_CONFIG['format']
-    ) 
\ No newline at end of file
+    from src.utils.log_queue import setup_queued_logging
+    return setup_queued_logging(LOGGING_CONFIG) 
\ No newline at end of file
@@ -0,0 +1,296 @@
+"""
+Очередь исходящих запросов к Telegram с учётом лимитов частоты
+"""
+
+import asyncio
+import logging
+from collections import deque
+from time import monotonic
+from aiogram.utils.exceptions import RetryAfter
+from src.config.config import SEND_GLOBAL_RATE, SEND_CHAT_RATE, SEND_CHAT_BURST, SEND_MAX_RETRIES, WORKER_PROCESSES
+from src.utils.metrics import set_gauge
+
+# Полосы приоритета: меньше — раньше
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Правки сообщений отправляются раньше новых сообщений других чатов: пользователь ждёт
+# отклика на нажатие. Внутри одного чата запросы уходят строго в порядке поступления
+METHOD_PRIORITIES = {
+    'editMessageText': PRIORITY_HIGH,
+    'editMessageReplyMarkup': PRIORITY_HIGH,
+    'sendDocument': PRIORITY_LOW,
+}
+
+# Правки, для которых важен только последний вариант
+COALESCED_METHODS = {'editMessageText', 'editMessageReplyMarkup'}
+
+# Методы, которые не считаются сообщениями и идут в обход очереди
+UNLIMITED_METHODS = {
+    'answerCallbackQuery', 'answerInlineQuery', 'getUpdates', 'getMe', 'getFile',
+    'setWebhook', 'deleteWebhook', 'getWebhookInfo', 'close', 'logOut',
+}
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Через сколько секунд будет доступен токен."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+class _Request:
+    """Запрос в очереди; при слиянии правок к нему добавляются ожидающие future."""
+
+    __slots__ = ('chat_id', 'method', 'data', 'files', 'kwargs', 'priority', 'key', 'waiters', 'retries')
+
+    def __init__(self, chat_id, method, data, files, kwargs, priority, key, future):
+        self.chat_id = chat_id
+        self.method = method
+        self.data = data
+        self.files = files
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.waiters = [future]
+        self.retries = 0
+
+class SendQueue:
+    """Центральный планировщик отправки.
+
+    Подменяет bot.request: каждый запрос, адресованный чату, проходит через
+    общее ведро токенов (SEND_GLOBAL_RATE в секунду) и ведро своего чата
+    (SEND_CHAT_RATE, всплеск до SEND_CHAT_BURST). В одном чате одновременно
+    выполняется не больше одного запроса, а следующим уходит самый ранний
+    запрос чата, в какой бы полосе он ни стоял: приоритет упорядочивает только
+    разные чаты. RetryAfter приостанавливает чат на указанное время и возвращает
+    запрос в начало очереди, где с ним снова сливаются новые правки. Повторные
+    правки одного сообщения, ещё не ушедшие в Telegram, сливаются: отправляется
+    только последний вариант, и правка занимает место последнего из слитых запросов. Ведра чатов без запросов,
+    успевшие наполниться, раз в PRUNE_INTERVAL секунд удаляются.
+    """
+
+    PRUNE_INTERVAL = 60
+
+    def __init__(self, request, global_rate=SEND_GLOBAL_RATE, chat_rate=SEND_CHAT_RATE,
+                 chat_burst=SEND_CHAT_BURST, max_retries=SEND_MAX_RETRIES):
+        self._request = request
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        # Ёмкость не меньше одного токена, иначе при дробном лимите токен не накопится
+        self._global = TokenBucket(global_rate, max(global_rate, 1))
+        self._chats = {}
+        self._chat_queues = {}
+        self._blocked_until = {}
+        self._in_flight = set()
+        self._lanes = {priority: deque() for priority in (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)}
+        self._pending_edits = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._pruned = monotonic()
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    def __len__(self):
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def start(self):
+        """Запуск задачи-диспетчера."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Остановка диспетчера; неотправленные запросы завершаются отменой."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for lane in self._lanes.values():
+            for item in lane:
+                for future in item.waiters:
+                    future.cancel()
+            lane.clear()
+        self._pending_edits.clear()
+        self._chat_queues.clear()
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        """Замена bot.request: постановка запроса в очередь и ожидание результата."""
+        chat_id = (data or {}).get('chat_id')
+        if self._task is None or chat_id is None or method in UNLIMITED_METHODS:
+            return await self._request(method, data, files, **kwargs)
+
+        future = asyncio.get_running_loop().create_future()
+        key = None
+        if method in COALESCED_METHODS and not files and 'message_id' in data:
+            key = (method, chat_id, data['message_id'])
+            pending = self._pending_edits.get(key)
+            if pending is not None:
+                pending.data = data
+                pending.kwargs = kwargs
+                pending.waiters.append(future)
+                # Слитая правка не должна обогнать запросы чата, поставленные после первой
+                chat_queue = self._chat_queues[chat_id]
+                chat_queue.remove(pending)
+                chat_queue.append(pending)
+                self.coalesced += 1
+                return await future
+
+        item = _Request(chat_id, method, data, files, kwargs, METHOD_PRIORITIES.get(method, PRIORITY_NORMAL), key, future)
+        if key is not None:
+            self._pending_edits[key] = item
+        self._lanes[item.priority].append(item)
+        self._chat_queues.setdefault(chat_id, deque()).append(item)
+        self._wakeup.set()
+        return await future
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _prune(self, now):
+        """Удаление состояния чатов без запросов, ведра которых уже наполнились."""
+        self._pruned = now
+        for chat_id in [chat_id for chat_id, until in self._blocked_until.items() if until <= now]:
+            del self._blocked_until[chat_id]
+        for chat_id in list(self._chats):
+            if chat_id in self._chat_queues or chat_id in self._in_flight or chat_id in self._blocked_until:
+                continue
+            bucket = self._chats[chat_id]
+            bucket._refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self._chats[chat_id]
+
+    def _next_ready(self, now):
+        """Первый по приоритету запрос, который стоит первым в очереди своего чата
+        и чат которого готов; иначе (None, время ожидания)."""
+        wait = None
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            for index, item in enumerate(lane):
+                if item.chat_id in self._in_flight or self._chat_queues[item.chat_id][0] is not item:
+                    continue
+                delay = max(
+                    self._blocked_until.get(item.chat_id, now) - now,
+                    self._chat_bucket(item.chat_id).delay(now),
+                )
+                if delay <= 0:
+                    del lane[index]
+                    chat_queue = self._chat_queues[item.chat_id]
+                    chat_queue.popleft()
+                    if not chat_queue:
+                        del self._chat_queues[item.chat_id]
+                    return item, None
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _run(self):
+        while True:
+            now = monotonic()
+            if now - self._pruned >= self.PRUNE_INTERVAL:
+                self._prune(now)
+            global_delay = self._global.delay(now)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                continue
+
+            item, wait = self._next_ready(now)
+            if item is None:
+                self._wakeup.clear()
+                # Как в TimerHeap: wait_for в Python 3.11 может потерять отмену из stop()
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait((waiter,), timeout=wait)
+                finally:
+                    waiter.cancel()
+                continue
+
+            self._global.take(now)
+            self._chat_bucket(item.chat_id).take(now)
+            if item.key is not None:
+                self._pending_edits.pop(item.key, None)
+            self._in_flight.add(item.chat_id)
+            asyncio.get_running_loop().create_task(self._execute(item))
+
+    async def _execute(self, item):
+        try:
+            result = await self._request(item.method, item.data, item.files, **item.kwargs)
+        except RetryAfter as e:
+            self._blocked_until[item.chat_id] = monotonic() + e.timeout
+            if item.retries < self.max_retries:
+                item.retries += 1
+                self.retried += 1
+                logging.warning(f"Flood control for chat {item.chat_id}: retry in {e.timeout}s")
+                if item.key is not None:
+                    pending = self._pending_edits.get(item.key)
+                    if pending is not None:
+                        # Пока запрос выполнялся, пришла более новая правка того же сообщения: уйдёт она
+                        pending.waiters.extend(item.waiters)
+                        self.coalesced += 1
+                        return
+                    self._pending_edits[item.key] = item
+                self._lanes[item.priority].appendleft(item)
+                self._chat_queues.setdefault(item.chat_id, deque()).appendleft(item)
+                return
+            self._resolve(item, exception=e)
+        except Exception as e:
+            self._resolve(item, exception=e)
+        else:
+            self.sent += 1
+            self._resolve(item, result=result)
+        finally:
+            self._in_flight.discard(item.chat_id)
+            self._wakeup.set()
+
+    @staticmethod
+    def _resolve(item, result=None, exception=None):
+        for future in item.waiters:
+            if future.done():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        """Счётчики очереди отправки."""
+        return {
+            'queued': len(self),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'retried': self.retried,
+        }
+
+def install_send_queue(bot, processes=WORKER_PROCESSES):
+    """Подключение очереди к боту: все запросы bot.request идут через SendQueue.
+
+    Общий лимит Telegram действует на бота целиком, поэтому в многопроцессном
+    режиме каждый из processes обработчиков получает свою долю SEND_GLOBAL_RATE;
+    чаты закреплены за процессами, так что лимиты чатов не делятся.
+    """
+    queue = SendQueue(bot.request, global_rate=SEND_GLOBAL_RATE / max(processes, 1))
+    bot.request = queue.request
+    set_gauge('bot_send_queue_depth', 'Запросы к Telegram в очереди отправки', queue.__len__)
+    return queue
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Многопроцессный режим: супервизор получает обновления и раздаёт их процессам по ID чата
+"""
+
+import signal
+import asyncio
+import logging
+import multiprocessing
+from src.config.config import WORKER_PROCESSES, WORKER_QUEUE_SIZE, WORKER_LANES, WORKER_RESTART_DELAY
+from src.utils.update_shards import UpdateShards, update_chat_id
+from src.utils.metrics import set_gauge
+
+# Сигнал процессу-обработчику дообработать очередь и завершиться
+_STOP = None
+
+async def _worker_loop(index, connection, setup, teardown, lanes):
+    dp = await setup(index)
+    shards = UpdateShards(dp, lanes, WORKER_QUEUE_SIZE)
+    shards.start()
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                update = await loop.run_in_executor(None, connection.recv)
+            except EOFError:
+                break
+            if update is _STOP:
+                break
+            await shards.put(update)
+    finally:
+        await shards.stop()
+        await teardown(dp, index)
+
+def _worker_main(index, connection, setup, teardown, lanes):
+    # Ctrl+C получает вся группа процессов; останавливает обработчиков супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_loop(index, connection, setup, teardown, lanes))
+
+class Supervisor:
+    """Раздача обновлений workers процессам.
+
+    Супервизор один получает обновления (getUpdates) и кладёт каждое в очередь
+    процесса update_chat_id % workers: все обновления чата идут в один процесс
+    и обрабатываются там по порядку, поэтому кэш FSM процесса остаётся
+    единственным владельцем состояния чата.
+
+    Очереди (до queue_size обновлений) живут в супервизоре, в процесс они
+    передаются по собственному каналу (Pipe). Упавший процесс перезапускается
+    с новым каналом; очередь супервизора сохраняется, теряются только
+    обновления, уже переданные умершему процессу. Общая
+    multiprocessing.Queue для этого не подходит: процесс, умерший во время
+    чтения, навсегда оставляет её блокировку захваченной.
+
+    setup(index) -> dp и teardown(dp, index) — функции уровня модуля
+    (процессы запускаются через spawn); в них процесс открывает базу,
+    хранилище FSM и, например, запускает таймер задач только при index == 0.
+    Миграции схемы нужно применить до start(), иначе процессы выполнят их одновременно.
+    """
+
+    def __init__(self, setup, teardown, workers=WORKER_PROCESSES,
+                 queue_size=WORKER_QUEUE_SIZE, lanes=WORKER_LANES):
+        self.setup = setup
+        self.teardown = teardown
+        self.lanes = lanes
+        self._context = multiprocessing.get_context('spawn')
+        self.queues = [asyncio.Queue(queue_size) for _ in range(workers)]
+        self.processes = [None] * workers
+        self.connections = [None] * workers
+        self._senders = []
+        self.restarts = 0
+        self.dispatched = 0
+        self._stopping = False
+
+    def _spawn(self, index):
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, reader, self.setup, self.teardown, self.lanes),
+            name=f'bot-worker-{index}',
+            daemon=True,
+        )
+        process.start()
+        reader.close()
+        old = self.connections[index]
+        if old is not None:
+            old.close()
+        self.processes[index] = process
+        self.connections[index] = writer
+        logging.info(f"Started worker {index} (pid {process.pid})")
+
+    async def _sender(self, index):
+        """Передача очереди процессу; при обрыве канала ждёт перезапуска и повторяет.
+
+        После stop() процессы не перезапускаются, поэтому обновления для
+        умершего процесса отбрасываются, а не повторяются бесконечно.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self.queues[index]
+        while True:
+            update = await queue.get()
+            while True:
+                connection = self.connections[index]
+                try:
+                    await loop.run_in_executor(None, connection.send, update)
+                    break
+                except (OSError, ValueError):
+                    if self._stopping:
+                        if update is not _STOP:
+                            logging.warning(f"Worker {index} is gone, dropping update")
+                        break
+                    await asyncio.sleep(WORKER_RESTART_DELAY)
+            queue.task_done()
+
+    def start(self):
+        """Запуск всех процессов-обработчиков и передачи очередей."""
+        loop = asyncio.get_running_loop()
+        for index in range(len(self.processes)):
+            self._spawn(index)
+        self._senders = [loop.create_task(self._sender(index)) for index in range(len(self.queues))]
+        set_gauge('bot_update_queue_depth', 'Обновления, ожидающие обработки', self.depth)
+
+    async def watch(self, interval=WORKER_RESTART_DELAY):
+        """Перезапуск умерших процессов; работает до остановки супервизора."""
+        while not self._stopping:
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    logging.error(f"Worker {index} (pid {process.pid}) died with code {process.exitcode}, restarting")
+                    self.restarts += 1
+                    self._spawn(index)
+            await asyncio.sleep(interval)
+
+    async def dispatch(self, update):
+        """Передача обновления (словарь JSON) процессу его чата; ждёт, если очередь полна."""
+        await self.queues[update_chat_id(update) % len(self.queues)].put(update)
+        self.dispatched += 1
+
+    async def run_polling(self, bot, timeout=20):
+        """Получение обновлений long polling и раздача их процессам.
+
+        Смещение подтверждается после постановки в очередь супервизора.
+        """
+        offset = None
+        while not self._stopping:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=timeout)
+            except Exception as e:
+                logging.error(f"Error fetching updates: {e}")
+                await asyncio.sleep(WORKER_RESTART_DELAY)
+                continue
+            for update in updates:
+                await self.dispatch(update.to_python())
+                offset = update.update_id + 1
+
+    def depth(self):
+        """Число обновлений, ожидающих передачи процессам."""
+        return sum(queue.qsize() for queue in self.queues)
+
+    async def _drain(self):
+        for queue in self.queues:
+            await queue.put(_STOP)
+        for queue in self.queues:
+            await queue.join()
+
+    async def stop(self, timeout=30):
+        """Дообработка очередей и завершение процессов.
+
+        На передачу очередей и на завершение процессов отводится по timeout секунд;
+        процессы, не успевшие завершиться, останавливаются принудительно.
+        """
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Update queues were not drained in {timeout}s, {self.depth()} updates dropped")
+        for task in self._senders:
+            task.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+
+        loop = asyncio.get_running_loop()
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logging.warning(f"Worker {index} did not stop in {timeout}s, terminating")
+                process.terminate()
+            self.connections[index].close()
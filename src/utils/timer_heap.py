@@ -0,0 +1,126 @@
+"""
+Лёгкий планировщик на min-куче с одной спящей задачей
+"""
+
+import heapq
+import asyncio
+import logging
+import itertools
+from time import time as now
+
+class TimerHeap:
+    """Планировщик отложенных событий вида (due_time, key).
+
+    Все события лежат в одной min-куче, их ждёт одна фоновая задача.
+    Вставка — O(log n); отмена и перенос помечают старую запись недействительной
+    (O(1)), а такие записи выбрасываются, когда доходят до вершины кучи.
+    Когда наступает срок, on_due получает список всех созревших ключей сразу;
+    он запускается отдельной задачей, чтобы долгая обработка (например,
+    догоняние с паузами между пачками) не задерживала следующие события.
+    """
+
+    def __init__(self, on_due):
+        self.on_due = on_due
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._handlers = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def running(self):
+        """Запущена ли спящая задача."""
+        return self._task is not None
+
+    def due_times(self):
+        """Запланированные события: словарь key -> due_time."""
+        return {key: entry[0] for key, entry in self._entries.items()}
+
+    def schedule(self, key, due_time):
+        """Постановка или перенос события key на due_time (unix time)."""
+        self.cancel(key)
+        entry = [due_time, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        # Будим спящую задачу, только если новое событие стало ближайшим
+        if self._heap[0] is entry:
+            self._wakeup.set()
+
+    def cancel(self, key):
+        """Отмена события. Возвращает True, если событие было запланировано."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        self._cancelled += 1
+        # Если отменённых записей больше половины, перестраиваем кучу без них
+        if self._cancelled > 1024 and self._cancelled * 2 > len(self._heap):
+            self._heap = [item for item in self._heap if item[3]]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def start(self):
+        """Запуск спящей задачи."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Остановка спящей задачи и незавершённых обработчиков; запланированные события остаются в куче."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        handlers = list(self._handlers)
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    def _pop_due(self, moment):
+        """Извлечение всех созревших действительных ключей."""
+        due = []
+        while self._heap and (self._heap[0][0] <= moment or not self._heap[0][3]):
+            _, _, key, valid = heapq.heappop(self._heap)
+            if valid:
+                del self._entries[key]
+                due.append(key)
+            else:
+                self._cancelled -= 1
+        return due
+
+    async def _handle(self, due):
+        try:
+            await self.on_due(due)
+        except Exception as e:
+            logging.error(f"Ошибка обработки отложенных событий: {e}")
+
+    async def _run(self):
+        while True:
+            due = self._pop_due(now())
+            if due:
+                task = asyncio.get_running_loop().create_task(self._handle(due))
+                self._handlers.add(task)
+                task.add_done_callback(self._handlers.discard)
+                continue
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now() if self._heap else None
+            # asyncio.wait, а не wait_for: в Python 3.11 wait_for теряет отмену, пришедшую
+            # одновременно с пробуждением, и stop() ждал бы следующего события
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=timeout)
+            finally:
+                waiter.cancel()
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Очереди обновлений по чатам: обновления одного чата по порядку, разных чатов — параллельно
+"""
+
+import asyncio
+import logging
+from aiogram import Bot, Dispatcher, types
+
+# Разделы обновления, в которых чат лежит в message.chat
+_MESSAGE_KEYS = ('message', 'edited_message', 'channel_post', 'edited_channel_post')
+
+def update_chat_id(update):
+    """ID чата обновления (словарь JSON от Telegram) для сохранения порядка внутри чата.
+
+    Для обновлений без чата возвращается ID пользователя, иначе 0.
+    """
+    for key in _MESSAGE_KEYS:
+        if key in update:
+            return update[key]['chat']['id']
+    callback = update.get('callback_query')
+    if callback is not None:
+        message = callback.get('message')
+        return message['chat']['id'] if message else callback['from']['id']
+    for value in update.values():
+        if isinstance(value, dict) and 'from' in value:
+            return value['from']['id']
+    return 0
+
+class UpdateShards:
+    """Пул из workers асинхронных обработчиков с ограниченными очередями.
+
+    Обновление (словарь JSON от Telegram) попадает в очередь по ID чата,
+    каждую очередь разбирает один обработчик через dp.process_update.
+    """
+
+    def __init__(self, dp, workers, queue_size):
+        self.dp = dp
+        self.queues = [asyncio.Queue(queue_size) for _ in range(workers)]
+        self._tasks = []
+
+    def depth(self):
+        """Суммарное число необработанных обновлений."""
+        return sum(queue.qsize() for queue in self.queues)
+
+    def _queue(self, update):
+        return self.queues[update_chat_id(update) % len(self.queues)]
+
+    def put_nowait(self, update):
+        """Постановка без ожидания; при переполнении — asyncio.QueueFull."""
+        self._queue(update).put_nowait(update)
+
+    async def put(self, update):
+        """Постановка с ожиданием места в очереди."""
+        await self._queue(update).put(update)
+
+    async def _worker(self, queue):
+        Bot.set_current(self.dp.bot)
+        Dispatcher.set_current(self.dp)
+        while True:
+            data = await queue.get()
+            try:
+                await self.dp.process_update(types.Update(**data))
+            except Exception as e:
+                logging.error(f"Error processing update {data.get('update_id')}: {e}")
+            finally:
+                queue.task_done()
+
+    def start(self):
+        """Запуск обработчиков очередей."""
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker(queue)) for queue in self.queues]
+
+    async def stop(self):
+        """Дообработка принятых обновлений и остановка обработчиков."""
+        for queue in self.queues:
+            await queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
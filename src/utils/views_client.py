@@ -0,0 +1,128 @@
+"""
+Клиенты получения просмотров рекламных постов
+"""
+
+import re
+import random
+import asyncio
+import logging
+import aiohttp
+from datetime import datetime
+from src.config.config import VIEWS_SOURCE
+
+class ViewsClient:
+    """Интерфейс источника просмотров поста.
+
+    Реализация получает запись рекламы и возвращает число просмотров
+    или None, если пост не найден.
+    """
+
+    async def get_views(self, ad):
+        raise NotImplementedError
+
+    async def close(self):
+        """Освобождение ресурсов клиента (сессий и т.п.)."""
+
+class FakeViewsClient(ViewsClient):
+    """Локальный клиент для тестов и бенчмарков: детерминированные просмотры без сети.
+
+    views — просмотры по ID записи; None в значении означает «пост не найден».
+    """
+
+    def __init__(self, latency=0.0, views=None):
+        self.latency = latency
+        self.views = views or {}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_views(self, ad):
+        self.calls.append(ad['id'])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if ad['id'] in self.views:
+                return self.views[ad['id']]
+            return random.Random(ad['id']).randint(1000, 50000)
+        finally:
+            self.in_flight -= 1
+
+# Разметка t.me/s/<канал>: начало поста, дата публикации и счётчик просмотров
+_POST = re.compile(r'data-post="[^"/]+/(\d+)"')
+_DATE = re.compile(r'<time[^>]*datetime="([^"]+)"')
+_VIEWS = re.compile(r'class="tgme_widget_message_views">([\d.,]+)([KM]?)<')
+_POST_LINK = re.compile(r'(?:https?://)?(?:t\.me/|@)?([A-Za-z][A-Za-z0-9_]{3,31})/(\d+)/?')
+_MULTIPLIERS = {'': 1, 'K': 1000, 'M': 1000000}
+
+def parse_preview(html):
+    """Посты страницы t.me/s/<канал>: список (id, дата публикации, просмотры) по возрастанию id."""
+    starts = [(match.start(), int(match.group(1))) for match in _POST.finditer(html)]
+    posts = []
+    for number, (start, post_id) in enumerate(starts):
+        end = starts[number + 1][0] if number + 1 < len(starts) else len(html)
+        chunk = html[start:end]
+        date, views = _DATE.search(chunk), _VIEWS.search(chunk)
+        if date is None or views is None:
+            continue
+        count = float(views.group(1).replace(',', '.')) * _MULTIPLIERS[views.group(2)]
+        posts.append((post_id, datetime.fromisoformat(date.group(1)), int(count)))
+    posts.sort()
+    return posts
+
+def parse_post_link(link):
+    """Ссылка на пост (https://t.me/канал/123, t.me/канал/123, @канал/123) -> (канал, номер) или None."""
+    match = _POST_LINK.fullmatch((link or '').strip())
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2))
+
+def format_post_link(channel, post_id):
+    """Каноническая ссылка на пост, в таком виде она хранится в ads.post_link."""
+    return f"https://t.me/{channel}/{post_id}"
+
+class PreviewViewsClient(ViewsClient):
+    """Просмотры из публичной веб-версии канала t.me/s/<канал>, без MTProto и авторизации.
+
+    Пост рекламы задаётся явно ссылкой post_link (https://t.me/<канал>/<номер>);
+    без ссылки просмотры не запрашиваются. Читается одна страница постов,
+    заканчивающаяся нужным. Работает только для публичных каналов.
+    """
+
+    URL = 'https://t.me/s/{channel}'
+
+    def __init__(self):
+        self._session = None
+
+    async def _fetch(self, channel, before=None):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        params = {'before': before} if before else None
+        async with self._session.get(self.URL.format(channel=channel), params=params) as response:
+            if response.status != 200:
+                return ''
+            return await response.text()
+
+    async def get_views(self, ad):
+        link = parse_post_link(ad['post_link'])
+        if link is None:
+            return None
+        channel, post_id = link
+        for found_id, _, views in parse_preview(await self._fetch(channel, post_id + 1)):
+            if found_id == post_id:
+                return views
+        return None
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+def create_views_client(source=VIEWS_SOURCE):
+    """Клиент по настройке VIEWS_SOURCE: 'preview' или '' (охват не собирается)."""
+    if source == 'preview':
+        return PreviewViewsClient()
+    if source:
+        logging.warning(f"Unknown VIEWS_SOURCE {source!r}, post reach will not be collected")
+    return None
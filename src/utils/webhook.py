@@ -0,0 +1,84 @@
+"""
+Приём обновлений через вебхук: aiohttp-сервер, ограниченные очереди и пул обработчиков
+"""
+
+import hmac
+import json
+import asyncio
+import logging
+from aiohttp import web
+from src.config.config import (
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBAPP_HOST, WEBAPP_PORT,
+    WEBHOOK_QUEUE_SIZE, WEBHOOK_WORKERS,
+)
+from src.utils.update_shards import UpdateShards
+from src.utils.metrics import set_gauge
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookServer:
+    """Приёмник вебхука.
+
+    HTTP-запрос проверяется по секретному токену и сразу подтверждается,
+    обновление кладётся в одну из workers очередей по ID чата: обновления
+    одного чата обрабатываются строго по порядку, разные чаты — параллельно.
+    Очереди ограничены queue_size; при переполнении Telegram получает 503
+    и повторит доставку сам. Без секрета сервер не создаётся: иначе
+    обновления от имени любого пользователя мог бы прислать кто угодно.
+    """
+
+    def __init__(self, dp, path=WEBHOOK_PATH, secret=WEBHOOK_SECRET,
+                 workers=WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE):
+        if not secret:
+            raise ValueError("WEBHOOK_SECRET must be set in webhook mode")
+        self.dp = dp
+        self.path = path
+        self.secret = secret
+        self.shards = UpdateShards(dp, workers, queue_size)
+        self.received = 0
+        self.rejected = 0
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle)
+
+    def queue_depth(self):
+        """Суммарное число необработанных обновлений."""
+        return self.shards.depth()
+
+    async def handle(self, request):
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret):
+            return web.Response(status=401)
+        try:
+            update = await request.json(loads=json.loads)
+        except ValueError:
+            return web.Response(status=400)
+
+        try:
+            self.shards.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logging.warning(f"Webhook queue is full, update {update.get('update_id')} rejected")
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response()
+
+async def start_webhook(dp, host=WEBAPP_HOST, port=WEBAPP_PORT, url=WEBHOOK_URL, **kwargs):
+    """Запуск сервера вебхука; возвращает (server, runner) для последующей остановки.
+
+    Если url пустой, вебхук в Telegram не регистрируется — так сервер удобно
+    запускать локально и отправлять ему записанные обновления через curl.
+    """
+    server = WebhookServer(dp, **kwargs)
+    server.shards.start()
+    set_gauge('bot_update_queue_depth', 'Обновления, ожидающие обработки', server.queue_depth)
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    if url:
+        await dp.bot.set_webhook(url + server.path, secret_token=server.secret)
+    logging.info(f"Webhook server listening on {host}:{port}{server.path}")
+    return server, runner
+
+async def stop_webhook(server, runner):
+    """Остановка приёма: сервер закрывается, принятые обновления дообрабатываются."""
+    await runner.cleanup()
+    await server.shards.stop()
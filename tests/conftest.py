@@ -0,0 +1,59 @@
+"""
+Общие фикстуры тестов
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import aiosqlite
+import pytest
+from src.database import database
+from src.utils import jobs, post_processing
+from src.utils.date_utils import format_scheduled_at
+
+@pytest.fixture
+def run(tmp_path):
+    """Запуск корутины с открытой временной базой; client подключается как источник просмотров."""
+    def runner(test, client=None):
+        async def wrapper():
+            await database.init_db(str(tmp_path / 'test.db'))
+            post_processing.set_views_client(client)
+            try:
+                return await test()
+            finally:
+                post_processing.set_views_client(None)
+                await jobs.stop_jobs()
+                for key in list(jobs.timers.due_times()):
+                    jobs.timers.cancel(key)
+                await database.close_db()
+        return asyncio.run(wrapper())
+    return runner
+
+@pytest.fixture
+def add_cpm_ads():
+    """Добавление count записей CPM, по умолчанию вышедших сутки назад; возвращает их ID."""
+    async def add(count, scheduled_at=None):
+        scheduled_at = scheduled_at or format_scheduled_at(datetime.now() - timedelta(hours=24))
+        return [
+            await database.add_advertisement('CPM', '01.01.2025', f'@channel_{i}', '12:00', '24ч', 2.0,
+                                             scheduled_at=scheduled_at)
+            for i in range(count)
+        ]
+    return add
+
+@pytest.fixture
+def pending():
+    """Задачи job_type из базы: словарь ad_id -> run_at."""
+    async def jobs_of(job_type='parse_post'):
+        return {row['ad_id']: row['run_at'] for row in await database.get_pending_jobs() if row['job_type'] == job_type}
+    return jobs_of
+
+@pytest.fixture
+def open_connections():
+    """Потоки соединений aiosqlite, не завершившиеся за секунду."""
+    def check():
+        threads = [thread for thread in threading.enumerate() if isinstance(thread, aiosqlite.Connection)]
+        for thread in threads:
+            thread.join(1)
+        return [thread for thread in threads if thread.is_alive()]
+    return check
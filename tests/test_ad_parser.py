@@ -0,0 +1,54 @@
+"""
+Разбор строк рекламы и файлов массового импорта
+"""
+
+from src.database import database
+from src.handlers.ad_handlers import process_bulk_import
+from src.utils.ad_parser import import_line, is_header, parse_ad
+
+class FakeMessage:
+    """Сообщение, запоминающее ответы бота."""
+
+    def __init__(self):
+        self.replies = []
+
+    async def reply(self, text, **kwargs):
+        self.replies.append(text)
+
+def test_import_line_keeps_decimal_comma_in_value():
+    ad, errors = parse_ad(import_line('01.02.2025;@user;12:00;24ч;2,5;;'))
+    assert errors == []
+    assert (ad['ad_type'], ad['value']) == ('CPM', '2.5')
+
+def test_import_line_leaves_comma_lines():
+    line = '01.02.2025, @user, 12:00, 24ч, ФИКС, 2500'
+    assert import_line(line) == line
+
+def test_is_header():
+    assert is_header('Дата;Юзер;Время;Условия;CPM')
+    assert is_header('"date",user,time')
+    assert not is_header('32.01.2025;@user;12:00;24ч;1,5')
+    assert not is_header('@user, 12:00, 24ч, 1.5')
+
+def test_bulk_import_reports_malformed_first_row(run):
+    message = FakeMessage()
+    text = '\n'.join([
+        'Дата;Юзер;Время;Условия;CPM',
+        '01.02.2025;@first;12:00;24ч;2,5',
+        '@broken;12:00;24ч;1,5',
+    ])
+
+    async def test():
+        await process_bulk_import(message, text)
+        first = FakeMessage()
+        # Без заголовка неверная первая строка — ошибка, а не пропуск
+        await process_bulk_import(first, '@broken, 12:00, 24ч, 1.5\n01.02.2025, @second, 12:00, 24ч, 100')
+        ads, _ = await database.get_ads_page()
+        return first.replies[0], sorted(ad['username'] for ad in ads)
+
+    first_reply, usernames = run(test)
+    assert 'добавлено 1, с ошибками 1' in message.replies[0]
+    assert 'Строка 3' in message.replies[0]
+    assert 'добавлено 1, с ошибками 1' in first_reply
+    assert 'Строка 1' in first_reply
+    assert usernames == ['@first', '@second']
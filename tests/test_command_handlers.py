@@ -0,0 +1,25 @@
+"""
+Вывод записей: страница БД и результаты поиска
+"""
+
+from src.config.config import NOTES_MAX_LENGTH, NOTES_PREVIEW_LENGTH, VIEW_PAGE_SIZE
+from src.handlers.command_handlers import format_ad, render_db_page
+
+def make_ad(ad_id, notes):
+    return {
+        'id': ad_id, 'ad_type': 'CPM', 'date': '01.02.2025', 'time': '12:00', 'username': '@channel_name',
+        'conditions': '24ч', 'cpm': 2.5, 'reach': 150000, 'profit': 375.0, 'payment_status': 'Не оплачено',
+        'notes': notes,
+    }
+
+def test_db_page_with_long_notes_fits_message():
+    ads = [make_ad(ad_id, 'заметка ' * (NOTES_MAX_LENGTH // 8)) for ad_id in range(1, VIEW_PAGE_SIZE + 1)]
+    text, _ = render_db_page(ads, has_prev=True, has_next=True)
+    assert len(text) <= 4096
+    assert text.count('…') == VIEW_PAGE_SIZE
+
+def test_format_ad_notes_length():
+    notes = 'x' * (NOTES_PREVIEW_LENGTH + 1)
+    assert 'x' * NOTES_PREVIEW_LENGTH + '…' in format_ad(make_ad(1, notes))
+    assert notes + '\n' in format_ad(make_ad(1, notes), notes_length=None)
+    assert 'Заметки' not in format_ad(make_ad(1, ''))
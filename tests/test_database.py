@@ -0,0 +1,53 @@
+"""
+База данных: инициализация и миграции на временном файле
+"""
+
+import asyncio
+import multiprocessing
+import sqlite3
+import pytest
+from src.database import database
+
+def test_failed_init_closes_pool(tmp_path, open_connections):
+    # Старая база без created_at: миграция 2 не может создать индекс
+    path = str(tmp_path / 'legacy.db')
+    with sqlite3.connect(path) as db:
+        db.execute('CREATE TABLE ads (id INTEGER PRIMARY KEY, ad_type TEXT, date TEXT, username TEXT, '
+                   'time TEXT, conditions TEXT, cpm REAL, reach INTEGER, profit REAL, payment_status TEXT)')
+
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(database.init_db(path))
+    assert database._pool is None
+    assert database._write_queue is None
+    assert open_connections() == []
+
+def _rename_in_other_process(path, ad_id):
+    async def rename():
+        await database.init_db(path, cache=False)
+        try:
+            await database.update_ad_field(ad_id, 'username', '@renamed')
+        finally:
+            await database.close_db()
+    asyncio.run(rename())
+
+def test_processes_without_cache_see_each_other_writes(tmp_path):
+    # Как в многопроцессном режиме: запись меняет другой процесс той же базы
+    path = str(tmp_path / 'shared.db')
+
+    async def test():
+        await database.init_db(path, cache=False)
+        try:
+            ad_id = await database.add_advertisement('ФИКС', '01.02.2025', '@original', '12:00', '24ч', 100)
+            before = (await database.get_ad_by_id(ad_id))['username'], len(await database.search_ads('original'))
+            process = multiprocessing.get_context('spawn').Process(target=_rename_in_other_process, args=(path, ad_id))
+            process.start()
+            await asyncio.get_running_loop().run_in_executor(None, process.join, 30)
+            after = (await database.get_ad_by_id(ad_id))['username'], len(await database.search_ads('original'))
+            return before, after, process.exitcode
+        finally:
+            await database.close_db()
+
+    before, after, exitcode = asyncio.run(test())
+    assert exitcode == 0
+    assert before == ('@original', 1)
+    assert after == ('@renamed', 0)
@@ -0,0 +1,22 @@
+"""
+Хранилище состояний FSM: кэш и загрузка записей из базы
+"""
+
+import asyncio
+from src.database.fsm_storage import SQLiteStorage
+
+def test_concurrent_first_access_keeps_both_writes():
+    # Обе корутины не находят запись в кэше и читают её из базы одновременно
+    async def test():
+        storage = SQLiteStorage(':memory:')
+        await storage.open()
+        try:
+            await asyncio.gather(
+                storage.set_state(chat=1, user=1, state='Form:name'),
+                storage.update_data(chat=1, user=1, data={'name': 'test'}),
+            )
+            return await storage.get_state(chat=1, user=1), await storage.get_data(chat=1, user=1)
+        finally:
+            await storage.close()
+
+    assert asyncio.run(test()) == ('Form:name', {'name': 'test'})
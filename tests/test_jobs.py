@@ -0,0 +1,50 @@
+"""
+Отложенные задачи: таймер в одном процессе, база — источник истины
+"""
+
+from datetime import datetime, timedelta
+from src.database import database
+from src.utils import jobs
+from src.utils.views_client import FakeViewsClient
+
+def test_schedule_without_timer_only_persists(run, pending):
+    # Процесс без таймера: задача сохраняется в базу, таймер её не получает
+    async def test():
+        await jobs.schedule_jobs([(1, 'parse_post', datetime.now() + timedelta(hours=1))])
+        return await pending(), len(jobs.timers)
+
+    jobs_left, timers = run(test)
+    assert list(jobs_left) == [1]
+    assert timers == 0
+
+def test_sync_jobs_follows_database(run):
+    async def test():
+        jobs.start_jobs()
+        later = datetime.now() + timedelta(hours=1)
+        await jobs.schedule_jobs([(1, 'parse_post', later), (2, 'parse_post', later)])
+        # Другой процесс удалил задачу 1, перенёс задачу 2 и добавил задачу 3
+        await database.delete_job(1, 'parse_post')
+        await database.save_jobs([(2, 'parse_post', later + timedelta(hours=1)), (3, 'parse_post', later)])
+        await jobs.sync_jobs()
+        return jobs.timers.due_times()
+
+    due = run(test)
+    assert sorted(due) == [(2, 'parse_post'), (3, 'parse_post')]
+    assert due[(2, 'parse_post')] - due[(3, 'parse_post')] >= 3600 - 60
+
+def test_run_due_jobs_checks_database(run, add_cpm_ads, pending):
+    client = FakeViewsClient()
+
+    async def test():
+        ad_ids = await add_cpm_ads(3)
+        now = datetime.now() - timedelta(minutes=1)
+        await database.save_jobs([(1, 'parse_post', now), (3, 'parse_post', now + timedelta(hours=2))])
+        jobs.start_jobs()
+        # Задача 2 отменена, задача 3 перенесена: выполняется только задача 1
+        await jobs.run_due_jobs([(ad_id, 'parse_post') for ad_id in ad_ids])
+        return await pending(), (3, 'parse_post') in jobs.timers
+
+    jobs_left, rescheduled = run(test, client)
+    assert client.calls == [1]
+    assert list(jobs_left) == [3]
+    assert rescheduled
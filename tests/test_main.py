@@ -0,0 +1,22 @@
+"""
+Точка входа: запуск и остановка приложения
+"""
+
+import asyncio
+import pytest
+from src import main
+from src.config import config
+from src.utils import metrics
+
+def test_failed_setup_stops_started_parts(tmp_path, monkeypatch, open_connections):
+    # База и хранилище FSM открываются по относительному DB_PATH
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'API_TOKEN', '123456:test')
+
+    async def broken_metrics(**kwargs):
+        raise RuntimeError('metrics failed')
+
+    monkeypatch.setattr(metrics, 'start_metrics_server', broken_metrics)
+    with pytest.raises(RuntimeError, match='metrics failed'):
+        asyncio.run(main.setup(0))
+    assert open_connections() == []
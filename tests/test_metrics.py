@@ -0,0 +1,20 @@
+"""
+Метрики: HTTP-сервер /metrics
+"""
+
+import socket
+import asyncio
+from src.utils.metrics import start_metrics_server, stop_metrics_server
+
+def test_busy_port_disables_metrics_server():
+    with socket.socket() as busy:
+        busy.bind(('127.0.0.1', 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+
+        async def test():
+            runner = await start_metrics_server('127.0.0.1', port)
+            await stop_metrics_server(runner)
+            return runner
+
+        assert asyncio.run(test()) is None
@@ -0,0 +1,113 @@
+"""
+Сбор охвата: process_posts и run_jobs с FakeViewsClient на временной базе
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from src.database import database
+from src.utils import jobs, post_processing
+from src.utils.date_utils import format_scheduled_at
+from src.utils.views_client import FakeViewsClient, PreviewViewsClient, parse_post_link, parse_preview
+
+def test_process_posts_saves_reach_and_profit(run, add_cpm_ads):
+    client = FakeViewsClient(views={1: 1500, 2: 30000})
+
+    async def test():
+        ad_ids = await add_cpm_ads(2)
+        done = await post_processing.process_posts(ad_ids, client)
+        return done, [await database.get_ad_by_id(ad_id) for ad_id in ad_ids]
+
+    done, ads = run(test)
+    assert sorted(done) == [1, 2]
+    assert [(ad['reach'], ad['profit']) for ad in ads] == [(1500, 3.0), (30000, 60.0)]
+
+def test_process_posts_bounds_concurrency(run, add_cpm_ads):
+    client = FakeViewsClient(latency=0.01)
+
+    async def test():
+        ad_ids = await add_cpm_ads(10)
+        return await post_processing.process_posts(ad_ids, client, concurrency=3)
+
+    assert len(run(test)) == 10
+    assert sorted(client.calls) == list(range(1, 11))
+    assert client.max_in_flight == 3
+
+def test_run_jobs_keeps_jobs_without_views(run, add_cpm_ads, pending):
+    # Пост 2 не найден: его задача переносится, задачи 1 и 3 выполнены и удалены
+    client = FakeViewsClient(views={2: None})
+
+    async def test():
+        ad_ids = await add_cpm_ads(3)
+        await jobs.schedule_jobs([(ad_id, 'parse_post', datetime.now()) for ad_id in ad_ids])
+        await jobs.run_jobs('parse_post', ad_ids)
+        return await pending(), await database.get_ad_by_id(2)
+
+    started = datetime.now()
+    jobs_left, ad = run(test, client)
+    assert list(jobs_left) == [2]
+    assert datetime.strptime(jobs_left[2], '%Y-%m-%d %H:%M') > started + timedelta(minutes=30)
+    assert ad['reach'] is None
+
+def test_run_jobs_gives_up_on_old_posts(run, add_cpm_ads, pending):
+    client = FakeViewsClient(views={1: None})
+
+    async def test():
+        old = format_scheduled_at(datetime.now() - timedelta(days=30))
+        ad_ids = await add_cpm_ads(1, scheduled_at=old)
+        await jobs.schedule_jobs([(ad_ids[0], 'parse_post', datetime.now())])
+        await jobs.run_jobs('parse_post', ad_ids)
+        return await pending()
+
+    assert run(test, client) == {}
+
+def test_run_jobs_drops_jobs_of_deleted_ads(run, pending):
+    client = FakeViewsClient()
+
+    async def test():
+        await jobs.schedule_jobs([(42, 'parse_post', datetime.now())])
+        await jobs.run_jobs('parse_post', [42])
+        return await pending()
+
+    assert run(test, client) == {}
+    assert client.calls == []
+
+PREVIEW = '''
+<div class="tgme_widget_message js-widget_message" data-post="news/100">
+  <span class="tgme_widget_message_views">950</span>
+  <a class="tgme_widget_message_date"><time datetime="2025-01-01T08:55:00+00:00" class="time">08:55</time></a>
+</div>
+<div class="tgme_widget_message js-widget_message" data-post="news/101">
+  <span class="tgme_widget_message_views">12.4K</span>
+  <a class="tgme_widget_message_date"><time datetime="2025-01-01T09:02:00+00:00" class="time">09:02</time></a>
+</div>
+<div class="tgme_widget_message js-widget_message" data-post="news/102">
+  <span class="tgme_widget_message_views">1.1M</span>
+  <a class="tgme_widget_message_date"><time datetime="2025-01-01T15:00:00+00:00" class="time">15:00</time></a>
+</div>
+'''
+
+def test_parse_preview():
+    posts = parse_preview(PREVIEW)
+    assert [(post_id, views) for post_id, _, views in posts] == [(100, 950), (101, 12400), (102, 1100000)]
+
+def test_parse_post_link():
+    assert parse_post_link('https://t.me/news/101') == ('news', 101)
+    assert parse_post_link('@news/101') == ('news', 101)
+    assert parse_post_link('@news') is None
+    assert parse_post_link('') is None
+
+def test_preview_client_reads_linked_post_only():
+    client = PreviewViewsClient()
+    fetched = []
+
+    async def fetch(channel, before=None):
+        fetched.append((channel, before))
+        return PREVIEW
+
+    client._fetch = fetch
+    ad = {'id': 1, 'username': '@news', 'post_link': 'https://t.me/news/101'}
+    assert asyncio.run(client.get_views(ad)) == 12400
+    assert fetched == [('news', 102)]
+    # Без ссылки пост не угадывается по времени выхода и сеть не используется
+    assert asyncio.run(client.get_views({**ad, 'post_link': ''})) is None
+    assert fetched == [('news', 102)]
@@ -0,0 +1,74 @@
+"""
+Очередь отправки: порядок запросов чата, слияние правок и освобождение памяти
+"""
+
+import asyncio
+from aiogram.utils.exceptions import RetryAfter
+from src.utils.send_queue import SendQueue
+
+class FakeApi:
+    """Замена bot.request: запоминает запросы, первые flood ответов — RetryAfter."""
+
+    def __init__(self, flood=0):
+        self.flood = flood
+        self.calls = []
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        self.calls.append((method, data['chat_id'], data.get('text')))
+        await asyncio.sleep(0.01)
+        if self.flood:
+            self.flood -= 1
+            raise RetryAfter(0.05)
+        return True
+
+def run_queue(test, api):
+    async def wrapper():
+        queue = SendQueue(api.request, global_rate=100, chat_rate=100, chat_burst=1)
+        queue.start()
+        try:
+            return await test(queue)
+        finally:
+            await queue.stop()
+    return asyncio.run(asyncio.wait_for(wrapper(), 5))
+
+def test_edit_does_not_overtake_earlier_send_to_same_chat():
+    api = FakeApi()
+
+    async def test(queue):
+        await asyncio.gather(
+            queue.request('sendMessage', {'chat_id': 1, 'text': 'a'}),
+            queue.request('editMessageText', {'chat_id': 1, 'message_id': 5, 'text': 'b'}),
+            queue.request('sendMessage', {'chat_id': 2, 'text': 'c'}),
+        )
+
+    run_queue(test, api)
+    chat_1 = [text for _, chat_id, text in api.calls if chat_id == 1]
+    assert chat_1 == ['a', 'b']
+
+def test_edits_coalesce_after_retry_after():
+    api = FakeApi(flood=1)
+
+    async def test(queue):
+        edit = {'chat_id': 1, 'message_id': 5}
+        first = asyncio.ensure_future(queue.request('editMessageText', {**edit, 'text': 'v1'}))
+        await asyncio.sleep(0.02)
+        # v1 получил RetryAfter и вернулся в очередь: v2 и v3 сливаются с ним
+        second = asyncio.ensure_future(queue.request('editMessageText', {**edit, 'text': 'v2'}))
+        third = asyncio.ensure_future(queue.request('editMessageText', {**edit, 'text': 'v3'}))
+        return await asyncio.gather(first, second, third), queue.coalesced
+
+    results, coalesced = run_queue(test, api)
+    assert results == [True, True, True]
+    assert coalesced == 2
+    assert [text for _, _, text in api.calls] == ['v1', 'v3']
+
+def test_idle_chats_are_pruned():
+    api = FakeApi()
+
+    async def test(queue):
+        await asyncio.gather(*(queue.request('sendMessage', {'chat_id': chat_id, 'text': 'x'}) for chat_id in range(5)))
+        tracked = len(queue._chats)
+        queue._prune(queue._pruned + queue.PRUNE_INTERVAL)
+        return tracked, len(queue._chats), len(queue._chat_queues)
+
+    assert run_queue(test, api) == (5, 0, 0)
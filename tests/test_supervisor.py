@@ -0,0 +1,29 @@
+"""
+Многопроцессный режим: остановка супервизора
+"""
+
+import asyncio
+from time import monotonic
+from src.utils.supervisor import Supervisor
+
+async def failing_setup(index):
+    raise RuntimeError('setup failed')
+
+async def noop_teardown(dp, index):
+    pass
+
+def test_stop_drops_updates_of_dead_worker():
+    async def test():
+        supervisor = Supervisor(failing_setup, noop_teardown, workers=1, queue_size=10, lanes=1)
+        supervisor.start()
+        process = supervisor.processes[0]
+        await asyncio.get_running_loop().run_in_executor(None, process.join, 30)
+        for chat_id in range(3):
+            await supervisor.dispatch({'update_id': chat_id, 'message': {'chat': {'id': chat_id}}})
+        started = monotonic()
+        await supervisor.stop(timeout=5)
+        return monotonic() - started, supervisor.depth()
+
+    elapsed, depth = asyncio.run(asyncio.wait_for(test(), 20))
+    assert elapsed < 5
+    assert depth == 0
@@ -0,0 +1,29 @@
+"""
+Планировщик TimerHeap: события на min-куче с одной спящей задачей
+"""
+
+import asyncio
+from time import time
+from src.utils.timer_heap import TimerHeap
+
+def test_slow_handler_does_not_block_other_events():
+    async def test():
+        fired = []
+        release = asyncio.Event()
+
+        async def on_due(keys):
+            fired.extend(keys)
+            if 'slow' in keys:
+                await release.wait()
+
+        timers = TimerHeap(on_due)
+        timers.start()
+        timers.schedule('slow', time())
+        timers.schedule('fast', time() + 0.05)
+        await asyncio.sleep(0.2)
+        # Обработчик 'slow' ещё ждёт, а 'fast' уже сработал
+        result = list(fired)
+        await timers.stop()
+        return result
+
+    assert asyncio.run(asyncio.wait_for(test(), 5)) == ['slow', 'fast']